@@ -1,33 +1,66 @@
 import os
-import logging
 
+import click
 from flask import Flask
+from flask.cli import with_appcontext
 from flask_sqlalchemy import SQLAlchemy
 from sqlalchemy.orm import DeclarativeBase
 from werkzeug.middleware.proxy_fix import ProxyFix
-
-logging.basicConfig(level=logging.DEBUG)
 from dotenv import load_dotenv
+
+# before any project module is imported: several read their settings from os.environ at import time
 load_dotenv()
 
+from replica import RoutingSession, configure_replica, init_replica_routing  # noqa: E402
+
+
 class Base(DeclarativeBase):
     pass
 
 
-db = SQLAlchemy(model_class=Base)
+db = SQLAlchemy(model_class=Base, session_options={"class_": RoutingSession})
+
+
+def create_app(config=None):
+    """Build the Flask app without touching the database or graph backends.
 
-app = Flask(__name__)
-app.secret_key = os.environ.get("SESSION_SECRET")
-app.wsgi_app = ProxyFix(app.wsgi_app, x_proto=1, x_host=1)
+    Schema changes run through `flask migrate` and the Neo4j connection is
+    opened in the background by routes.init_app(), so importing and creating
+    the app stays cheap for workers and CLI commands.
+    """
+    app = Flask(__name__)
+    app.secret_key = os.environ.get("SESSION_SECRET")
+    app.wsgi_app = ProxyFix(app.wsgi_app, x_proto=1, x_host=1)
+
+    app.config["SQLALCHEMY_DATABASE_URI"] = os.environ.get("DATABASE_URL")
+    app.config["SQLALCHEMY_ENGINE_OPTIONS"] = {
+        "pool_recycle": 300,
+        "pool_pre_ping": True,
+    }
+    configure_replica(app)
+    if config:
+        app.config.update(config)
+
+    db.init_app(app)
+
+    from instrumentation import init_instrumentation
+    from query_detector import init_query_detector
+    init_instrumentation(app)
+    init_query_detector(app)
+    init_replica_routing(app)
+
+    import models  # noqa: F401
+    from routes import bp
+    app.register_blueprint(bp)
+    app.cli.add_command(migrate_command)
 
-app.config["SQLALCHEMY_DATABASE_URI"] = os.environ.get("DATABASE_URL")
-app.config["SQLALCHEMY_ENGINE_OPTIONS"] = {
-    "pool_recycle": 300,
-    "pool_pre_ping": True,
-}
+    return app
 
-db.init_app(app)
 
-with app.app_context():
+@click.command('migrate')
+@with_appcontext
+def migrate_command():
+    """Create any missing tables."""
     import models  # noqa: F401
     db.create_all()
+    print("Database schema is up to date")
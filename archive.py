@@ -0,0 +1,132 @@
+"""Cold archive of expired job postings.
+
+Postings whose application_deadline has passed are moved from jobs to the
+jobs_archive table, so the dashboard's scans and in-memory structures only
+cover active postings. archive_expired() moves them in batches of
+ARCHIVE_BATCH_SIZE, one transaction each: a DELETE ... RETURNING on jobs,
+then an insert of the returned rows into the archive. Two workers archiving
+at once therefore never copy a posting twice, since the second DELETE finds
+the rows gone. Postings without a posting_date stay in jobs. Archiving runs
+from `flask archive-expired` (e.g. nightly from cron) or, when
+ARCHIVE_INTERVAL_SECONDS is set, on a background thread in every worker.
+Either way each batch bumps the jobs version (see data_versions), so the
+running workers rebuild their in-memory structures without the moved
+postings.
+
+On PostgreSQL jobs_archive is range partitioned by posting_date month
+(declarative partitioning). Before moving rows, archive_expired() creates
+the partitions for their months, so a historical query with a date range
+reads only those months. Other databases get one plain table.
+job_source(include_archived=True) is jobs UNION ALL jobs_archive, for the
+views that take include_archived=1.
+"""
+import logging
+import os
+import threading
+import time
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import delete, insert, select, text, union_all
+
+from app import db
+from models import ArchivedJob, Job
+from projections import row_class
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_BATCH_SIZE = int(os.environ.get("ARCHIVE_BATCH_SIZE", 1000))
+ARCHIVE_INTERVAL_SECONDS = float(os.environ.get("ARCHIVE_INTERVAL_SECONDS", 0))
+
+
+def job_source(include_archived=False):
+    """The jobs table, or jobs and jobs_archive as one subquery; read columns from `.c`."""
+    jobs = Job.__table__
+    if not include_archived:
+        return jobs
+    archive = ArchivedJob.__table__
+    names = jobs.c.keys()
+    return union_all(select(*(jobs.c[name] for name in names)),
+                     select(*(archive.c[name] for name in names))).subquery("all_jobs")
+
+
+def month_partitions(days):
+    """(name, first day, first day of the next month) for each month in `days`."""
+    months = sorted({day.replace(day=1) for day in days})
+    return [(f"{ArchivedJob.__tablename__}_{month:%Y_%m}", month, (month + timedelta(days=32)).replace(day=1))
+            for month in months]
+
+
+def ensure_partitions(days):
+    """Create the archive partitions for the months of `days` (PostgreSQL only)."""
+    if db.engine.dialect.name != "postgresql":
+        return
+    for name, start, end in month_partitions(days):
+        db.session.execute(text(
+            f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF {ArchivedJob.__tablename__} "
+            f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"))
+
+
+def archive_expired(before=None, batch_size=ARCHIVE_BATCH_SIZE, on_archived=None):
+    """Move postings whose application_deadline is before `before` (default today) to the archive.
+
+    on_archived(rows) is called after each committed batch with the moved
+    postings as projection rows. Returns the number moved.
+    """
+    jobs = Job.__table__
+    expired = (select(jobs.c.id)
+               .where(jobs.c.application_deadline < (before or date.today()), jobs.c.posting_date.isnot(None))
+               .order_by(jobs.c.id).limit(batch_size))
+    row_type = row_class(tuple(jobs.c.keys()))
+    total = 0
+    while True:
+        rows = db.session.execute(delete(jobs).where(jobs.c.id.in_(expired)).returning(*jobs.c)).all()
+        if not rows:
+            db.session.rollback()
+            return total
+        ensure_partitions(row.posting_date for row in rows)
+        archived_at = datetime.utcnow()
+        db.session.execute(insert(ArchivedJob.__table__),
+                           [dict(row._mapping, archived_at=archived_at) for row in rows])
+        db.session.commit()
+        total += len(rows)
+        if on_archived is not None:
+            on_archived([row_type(row) for row in rows])
+
+
+class ArchiveScheduler:
+    """Runs an archive step now and then every ARCHIVE_INTERVAL_SECONDS on a background thread."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def start(self, app, archive):
+        if self._thread is not None or ARCHIVE_INTERVAL_SECONDS <= 0:
+            return
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._run, args=(app, archive), name="archive", daemon=True)
+            self._thread.start()
+
+    def _run(self, app, archive):
+        while True:
+            with app.app_context():
+                try:
+                    moved = archive()
+                    if moved:
+                        logger.info(f"Archived {moved} expired postings")
+                except Exception as e:
+                    db.session.rollback()
+                    logger.error(f"Error archiving expired postings: {e}")
+                finally:
+                    db.session.remove()
+            time.sleep(ARCHIVE_INTERVAL_SECONDS)
+
+
+archive_scheduler = ArchiveScheduler()
+
+
+def init_archiving(app, archive):
+    """Start the scheduled archive step with the app's first request, if ARCHIVE_INTERVAL_SECONDS is set."""
+    app.before_request(lambda: archive_scheduler.start(app, archive))
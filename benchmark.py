@@ -0,0 +1,610 @@
+"""Endpoint and skill graph benchmarks.
+
+Usage:
+    python benchmark.py run --sizes 10000 100000 1000000 --output bench.json
+    python benchmark.py compare baseline.json bench.json --threshold 0.2
+    python benchmark.py startup
+    python benchmark.py neo4j --jobs 2000 --wipe
+    python benchmark.py projections --size 100000
+    python benchmark.py approx --size 100000 --sample-sizes 250 1000 4000
+
+``run`` populates one database per size (SQLite files by default, or any
+``--database-url`` containing ``{size}``) from the synthetic generator, then measures p50/p95/p99 latency
+and RSS growth (peak over the RSS at fork) for every route plus the InMemorySkillGraph methods. Each size
+runs in its own subprocess because the app reads DATABASE_URL at import.
+The harness builds the app with create_app() rather than importing main,
+so no warm-up, archive or version-polling threads run beside the timed
+requests or exist when measurements fork. Streaming, health and metrics
+endpoints are not timed.
+``compare`` exits non-zero when any route regresses past the threshold.
+``neo4j`` ingests synthetic jobs into the configured Neo4j instance and
+times get_related_skills, first without and then with the schema that
+Neo4jService.connect() creates. ``projections`` compares the job scan of
+each analytics route as full ORM instances and as projection rows: time and
+tracemalloc peak. ``approx`` times each route with approx=1 against the
+exact route for several per-industry sample sizes, and reports the error of
+the estimates and how often their confidence intervals cover the exact
+values.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import resource
+import subprocess
+import sys
+import time
+
+DEFAULT_SIZES = [10000, 100000, 1000000]
+DEFAULT_DATABASE_URL = "sqlite:////tmp/ds_jobs_bench_{size}.db"
+BATCH_SIZE = 5000
+# background work that would compete with timed requests
+HARNESS_ENV = {"WARMUP": "0", "ARCHIVE_INTERVAL_SECONDS": "0"}
+# endpoints that stream, or report on the process rather than do request work
+SKIPPED_ROUTES = {"/api/analytics-stream", "/api/skill-graph/consistency", "/health/live", "/health/ready", "/metrics"}
+
+_app = None
+
+# Query strings for routes that need parameters to do representative work.
+ROUTE_PARAMS = {
+    "/api/skill-frequency": "industry=Technology",
+    "/api/salary-distribution": "group_by=location",
+    "/api/skill-recommender": "skills=Python,SQL",
+    "/api/relationship-graph": "types=Skill,Role,Industry,Location",
+}
+
+
+def percentile(samples, pct):
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100 * (len(ordered) - 1)))))
+    return ordered[index]
+
+
+def summarize(samples_ms, rss_growth_kb):
+    return {
+        "iterations": len(samples_ms),
+        "p50_ms": round(percentile(samples_ms, 50), 3),
+        "p95_ms": round(percentile(samples_ms, 95), 3),
+        "p99_ms": round(percentile(samples_ms, 99), 3),
+        "rss_growth_mb": round(rss_growth_kb / 1024, 1),
+    }
+
+
+def iter_csv_jobs(count):
+    """Yield job dicts for the bulk loader by cycling the bundled CSV."""
+    from sample_data import load_jobs_from_csv
+    rows = load_jobs_from_csv()
+    if not rows:
+        raise SystemExit("No CSV rows available to populate the benchmark database")
+    for i in range(count):
+        job = dict(rows[i % len(rows)])
+        job["job_id"] = f"BENCH-{i:07d}"
+        yield job
+
+
+def populate(size, source="synthetic"):
+    from app import db
+    from models import Job, Skill
+    from sample_data import bulk_load_jobs, get_all_skills
+    from synthetic_data import generate_synthetic_jobs
+
+    db.create_all()
+    existing = Job.query.count()
+    if existing == size:
+        return 0.0
+    start = time.perf_counter()
+    Job.query.delete()
+    Skill.query.delete()
+    db.session.commit()
+    for skill_data in get_all_skills():
+        db.session.add(Skill(name=skill_data["name"], category=skill_data["category"]))
+    db.session.commit()
+    if source == "csv":
+        jobs = iter_csv_jobs(size)
+    else:
+        jobs = generate_synthetic_jobs(size, seed=size, job_id_prefix="BENCH")
+    bulk_load_jobs(jobs, batch_size=BATCH_SIZE)
+    return time.perf_counter() - start
+
+
+def harness_app():
+    """The app under test, without main's start-up threads; built once, before any fork."""
+    global _app
+    if _app is None:
+        from app import create_app
+        from neo4j_service import init_skill_graph
+        _app = create_app()
+        init_skill_graph()
+    return _app
+
+
+def discover_routes(app, sample_job_id):
+    """Every GET route in the app, with converters filled in and params applied."""
+    urls = []
+    for rule in app.url_map.iter_rules():
+        if "GET" not in rule.methods or rule.endpoint == "static" or rule.rule in SKIPPED_ROUTES:
+            continue
+        path = rule.rule
+        for argument in rule.arguments:
+            path = path.replace(f"<int:{argument}>", str(sample_job_id))
+        query = ROUTE_PARAMS.get(rule.rule)
+        urls.append(f"{path}?{query}" if query else path)
+    if "/api/role-similarity" in urls:
+        urls.append(f"/api/role-similarity?job_id={sample_job_id}")
+    return sorted(urls)
+
+
+def current_rss_kb():
+    """Resident set size now; falls back to the peak so far where /proc is missing."""
+    try:
+        with open("/proc/self/statm") as handle:
+            return int(handle.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") // 1024
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def _measure_child(conn, fn, iterations, warmup):
+    from app import db
+    app = harness_app()
+    with app.app_context():
+        db.engine.dispose(close=False)
+    # a forked child's ru_maxrss starts at the parent's RSS, so only the growth above it is fn's
+    baseline_kb = current_rss_kb()
+    samples = []
+    try:
+        for _ in range(warmup):
+            fn()
+        for _ in range(iterations):
+            start = time.perf_counter()
+            fn()
+            samples.append((time.perf_counter() - start) * 1000)
+        conn.send((samples, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - baseline_kb, None))
+    except Exception as e:
+        conn.send((samples, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - baseline_kb, repr(e)))
+    conn.close()
+
+
+def measure(fn, iterations, warmup=1):
+    """Time fn in a forked child and report how far fn pushed its RSS above the RSS at fork."""
+    ctx = multiprocessing.get_context("fork")
+    parent_conn, child_conn = ctx.Pipe(duplex=False)
+    process = ctx.Process(target=_measure_child, args=(child_conn, fn, iterations, warmup))
+    process.start()
+    samples, rss_growth_kb, error = parent_conn.recv()
+    process.join()
+    result = summarize(samples, rss_growth_kb)
+    if error:
+        result["error"] = error
+    return result
+
+
+def benchmark_graph(iterations):
+    from neo4j_service import InMemorySkillGraph
+    from models import Job
+    from routes import apply_skill_graph_delta, job_state
+
+    graph = InMemorySkillGraph()
+    jobs = Job.query.all()
+    start = time.perf_counter()
+    for job in jobs:
+        apply_skill_graph_delta(None, job_state(job), graph=graph)
+    build_seconds = time.perf_counter() - start
+
+    top_skill = max(graph.skills, key=lambda s: graph.skills[s]["connections"], default="Python")
+    top_role = next(iter(graph.roles), "")
+    methods = {
+        "get_skill_nodes": lambda: graph.get_skill_nodes(),
+        "get_skill_cooccurrences": lambda: graph.get_skill_cooccurrences(min_count=1),
+        "get_related_skills": lambda: graph.get_related_skills(top_skill, limit=10),
+        "get_full_graph": lambda: graph.get_full_graph(limit_per_type=20),
+        "get_skills_for_role": lambda: graph.get_skills_for_role(top_role),
+        "get_roles_for_skill": lambda: graph.get_roles_for_skill(top_skill),
+    }
+    results = {name: measure(fn, iterations) for name, fn in methods.items()}
+    results["build"] = {
+        "jobs": len(jobs),
+        "seconds": round(build_seconds, 3),
+        "jobs_per_second": round(len(jobs) / build_seconds, 1) if build_seconds else None,
+    }
+    return results
+
+
+def benchmark_neo4j(args):
+    """Ingest throughput and get_related_skills latency on Neo4j without, then with, the schema.
+
+    Wipes the target database; point NEO4J_URI at a scratch instance, e.g.
+    docker run -p 7687:7687 -e NEO4J_AUTH=neo4j/benchmark neo4j:5
+    """
+    if not args.wipe:
+        raise SystemExit("This benchmark deletes every node in the target Neo4j database; pass --wipe to proceed")
+    from app import create_app
+    from models import Job
+    from neo4j_service import Neo4jService
+    from routes import apply_skill_graph_delta, job_state
+    from synthetic_data import generate_synthetic_jobs
+
+    service = Neo4jService()
+    service.connect()
+    if not service.is_connected():
+        raise SystemExit("Set NEO4J_URI, NEO4J_USER and NEO4J_PASSWORD for a reachable Neo4j instance")
+
+    with create_app().app_context():
+        states = [job_state(Job(**row)) for row in generate_synthetic_jobs(args.jobs, seed=args.seed)]
+    skills = sorted({skill for state in states for skill in state["skills"]})
+
+    report = {"jobs": len(states)}
+    for phase in ("without_schema", "with_schema"):
+        service.clear_all()
+        if phase == "with_schema":
+            service.ensure_schema()
+        else:
+            service.drop_schema()
+
+        chunk_rates = []
+        start = time.perf_counter()
+        for offset in range(0, len(states), args.chunk):
+            chunk_start = time.perf_counter()
+            chunk = states[offset:offset + args.chunk]
+            for state in chunk:
+                apply_skill_graph_delta(None, state, graph=service)
+            chunk_rates.append(len(chunk) / (time.perf_counter() - chunk_start))
+        ingest_seconds = time.perf_counter() - start
+
+        samples = []
+        for i in range(args.iterations):
+            query_start = time.perf_counter()
+            service.get_related_skills(skills[i % len(skills)], limit=10)
+            samples.append((time.perf_counter() - query_start) * 1000)
+
+        report[phase] = {
+            "ingest_seconds": round(ingest_seconds, 2),
+            "jobs_per_second": round(len(states) / ingest_seconds, 1),
+            # a falling rate from first to last chunk is the label-scan slowdown
+            "first_chunk_jobs_per_second": round(chunk_rates[0], 1),
+            "last_chunk_jobs_per_second": round(chunk_rates[-1], 1),
+            "get_related_skills": summarize(samples, 0),
+        }
+        report[phase]["get_related_skills"].pop("rss_growth_mb")
+    service.close()
+    print(json.dumps(report, indent=2))
+
+
+# columns each analytics route reads, and whether it keeps every row in memory
+PROJECTION_SCANS = {
+    "/api/skill-graph": (("required_skills",), False),
+    "/api/skill-frequency": (("required_skills",), False),
+    "/api/role-similarity?job_id": (("id", "job_title", "job_category", "company_location",
+                                     "salary_usd", "required_skills"), False),
+    "/api/industry-comparison": (("industry", "required_skills"), True),
+}
+
+
+def benchmark_projections(args):
+    """Time and peak traced memory of each route's job scan, ORM instances vs projection rows."""
+    import tracemalloc
+    os.environ.setdefault("SESSION_SECRET", "benchmark")
+    for name, value in HARNESS_ENV.items():
+        os.environ.setdefault(name, value)
+    os.environ["DATABASE_URL"] = args.database_url.format(size=args.size)
+    from app import create_app, db
+    from models import Job
+    from projections import project
+
+    def orm_scan(columns, keep):
+        jobs = Job.query.all()
+        for job in jobs:
+            job.get_skills_list()
+            if keep:
+                job.get_skills_list()
+
+    def projection_scan(columns, keep):
+        rows = project(*(getattr(Job, name) for name in columns))
+        if keep:
+            rows = list(rows)
+        for row in rows:
+            row.skills
+        if keep:
+            for row in rows:
+                row.skills
+
+    report = {"size": args.size}
+    with create_app().app_context():
+        populate(args.size)
+        for route, (columns, keep) in PROJECTION_SCANS.items():
+            result = {}
+            for name, scan in (("orm", orm_scan), ("projection", projection_scan)):
+                samples = []
+                for _ in range(args.iterations):
+                    db.session.remove()
+                    start = time.perf_counter()
+                    scan(columns, keep)
+                    samples.append((time.perf_counter() - start) * 1000)
+                # traced separately: tracemalloc slows allocation-heavy code several fold
+                db.session.remove()
+                tracemalloc.start()
+                scan(columns, keep)
+                peak = tracemalloc.get_traced_memory()[1]
+                tracemalloc.stop()
+                result[name] = {"p50_ms": round(percentile(samples, 50), 1),
+                                "peak_traced_mb": round(peak / 2 ** 20, 1)}
+            result["speedup"] = round(result["orm"]["p50_ms"] / result["projection"]["p50_ms"], 1)
+            result["memory_ratio"] = round(result["orm"]["peak_traced_mb"] / result["projection"]["peak_traced_mb"], 1)
+            report[route] = result
+    print(json.dumps(report, indent=2))
+
+
+APPROX_ROUTES = {
+    "/api/skill-frequency": "",
+    "/api/skill-frequency?industry=Finance": "",
+    "/api/salary-distribution?group_by=location": "",
+    "/api/industry-skills": "",
+}
+
+
+def approx_pairs(path, exact, approx):
+    """(exact value, estimate, (low, high)) for every value both responses report."""
+    if path.startswith("/api/skill-frequency"):
+        truth = dict(zip(exact["labels"], exact["data"]))
+        return [(truth[label], value, ci) for label, value, ci in zip(approx["labels"], approx["data"], approx["data_ci"])
+                if label in truth]
+    if path.startswith("/api/salary-distribution"):
+        truth = {group["label"]: group["avg"] for group in exact}
+        return [(truth[group["label"]], group["avg"], group["avg_ci"]) for group in approx if group["label"] in truth]
+    truth = {(item["industry"], skill["name"]): skill["count"] for item in exact for skill in item["skills"]}
+    return [(truth[key], skill["count"], skill["count_ci"]) for item in approx for skill in item["skills"]
+            if (key := (item["industry"], skill["name"])) in truth]
+
+
+def benchmark_approx(args):
+    """Latency of approx=1 against exact per route, with the accuracy given up, per sample size."""
+    import logging
+    logging.disable(logging.WARNING)
+    os.environ.setdefault("SESSION_SECRET", "benchmark")
+    for name, value in HARNESS_ENV.items():
+        os.environ.setdefault(name, value)
+    os.environ["DATABASE_URL"] = args.database_url.format(size=args.size)
+    from app import create_app
+    from sampling import job_sample
+
+    app = create_app()
+    with app.app_context():
+        populate(args.size)
+    client = app.test_client()
+
+    def timed(path):
+        samples = []
+        for _ in range(args.iterations):
+            start = time.perf_counter()
+            response = client.get(path)
+            samples.append((time.perf_counter() - start) * 1000)
+        return response.get_json(), percentile(samples, 50)
+
+    exact = {path: timed(path) for path in APPROX_ROUTES}
+    report = {"size": args.size, "sample_sizes": {}}
+    for sample_size in args.sample_sizes:
+        job_sample.size = sample_size
+        job_sample.invalidate()
+        start = time.perf_counter()
+        client.get("/api/industry-skills?approx=1")
+        result = {"build_seconds": round(time.perf_counter() - start, 2)}
+        for path in APPROX_ROUTES:
+            exact_body, exact_ms = exact[path]
+            approx_body, approx_ms = timed(path + ("&" if "?" in path else "?") + "approx=1")
+            pairs = approx_pairs(path, exact_body, approx_body)
+            errors = [abs(estimate - truth) / truth for truth, estimate, _ in pairs if truth]
+            result[path] = {
+                "exact_p50_ms": round(exact_ms, 1),
+                "approx_p50_ms": round(approx_ms, 1),
+                "speedup": round(exact_ms / approx_ms, 1),
+                "mean_relative_error": round(sum(errors) / len(errors), 4) if errors else None,
+                "max_relative_error": round(max(errors), 4) if errors else None,
+                "ci_coverage": round(sum(low <= truth <= high for truth, _, (low, high) in pairs) / len(pairs), 3)
+                if pairs else None,
+            }
+        report["sample_sizes"][sample_size] = result
+    print(json.dumps(report, indent=2))
+
+
+def run_size(size, iterations, init_iterations, source="synthetic"):
+    """Benchmark one database size; must run in a process whose DATABASE_URL is set."""
+    import logging
+    logging.disable(logging.INFO)
+    for name, value in HARNESS_ENV.items():
+        os.environ.setdefault(name, value)
+    app = harness_app()
+    from app import db
+    from models import Job
+    from graph_rebuild import count_rows, graph_columns, load_counts
+    from neo4j_service import get_skill_graph
+
+    results = {"size": size}
+    with app.app_context():
+        results["populate_seconds"] = round(populate(size, source), 3)
+        get_skill_graph().clear_all()
+        rows = db.session.query(*graph_columns()).order_by(Job.id).yield_per(BATCH_SIZE)
+        load_counts(get_skill_graph(), count_rows(rows))
+        ids = [row[0] for row in Job.query.with_entities(Job.id).limit(1000)]
+        results["graph"] = benchmark_graph(iterations)
+
+    sample_job_id = random.Random(size).choice(ids) if ids else 1
+    client = app.test_client()
+    routes = {}
+    for url in discover_routes(app, sample_job_id):
+        routes[f"GET {url}"] = measure(lambda url=url: client.get(url).close(), iterations)
+    # /init-data replaces the table contents, so it always runs last.
+    routes["POST /init-data"] = measure(lambda: client.post("/init-data").close(), init_iterations, warmup=0)
+    results["routes"] = routes
+    return results
+
+
+def run(args):
+    report = {
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": sys.version.split()[0],
+        "iterations": args.iterations,
+        "sizes": {},
+    }
+    for size in args.sizes:
+        env = dict(HARNESS_ENV, **os.environ)
+        env["DATABASE_URL"] = args.database_url.format(size=size)
+        env.setdefault("SESSION_SECRET", "benchmark")
+        print(f"Benchmarking {size} postings on {env['DATABASE_URL']}", file=sys.stderr)
+        completed = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "size", str(size),
+             "--iterations", str(args.iterations), "--init-iterations", str(args.init_iterations),
+             "--source", args.source],
+            env=env, stdout=subprocess.PIPE, check=True,
+        )
+        report["sizes"][str(size)] = json.loads(completed.stdout)
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Wrote {args.output}", file=sys.stderr)
+
+
+STARTUP_SNIPPET = """
+import time
+start = time.perf_counter()
+import main
+imported = time.perf_counter()
+client = main.app.test_client()
+client.get('/visualizations')
+print(imported - start, time.perf_counter() - start)
+"""
+
+
+def startup(args):
+    """Time `import main` and the first request in fresh interpreters."""
+    env = dict(HARNESS_ENV, **os.environ)
+    env.setdefault("DATABASE_URL", DEFAULT_DATABASE_URL.format(size="startup"))
+    env.setdefault("SESSION_SECRET", "benchmark")
+    env.setdefault("LOG_LEVEL", "WARNING")
+    import_times, first_request_times = [], []
+    for _ in range(args.runs):
+        completed = subprocess.run([sys.executable, "-c", STARTUP_SNIPPET], env=env,
+                                   stdout=subprocess.PIPE, check=True, text=True)
+        imported, first_request = map(float, completed.stdout.split())
+        import_times.append(imported * 1000)
+        first_request_times.append(first_request * 1000)
+
+    completed = subprocess.run([sys.executable, "-X", "importtime", "-c", "import main"], env=env,
+                               stderr=subprocess.PIPE, stdout=subprocess.DEVNULL, check=True, text=True)
+    modules = []
+    for line in completed.stderr.splitlines():
+        parts = line.split("|")
+        if line.startswith("import time:") and len(parts) == 3 and parts[1].strip().isdigit():
+            modules.append((int(parts[1]), parts[2].strip()))
+    report = {
+        "import_main": summarize(import_times, 0),
+        "import_and_first_request": summarize(first_request_times, 0),
+        "slowest_imports_ms": {name: round(us / 1000, 1)
+                               for us, name in sorted(modules, reverse=True)[:args.top]},
+    }
+    for key in ("import_main", "import_and_first_request"):
+        report[key].pop("rss_growth_mb")
+    print(json.dumps(report, indent=2))
+
+
+def compare(args):
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.current) as f:
+        current = json.load(f)
+
+    regressions = []
+    for size, current_size in current["sizes"].items():
+        baseline_size = baseline["sizes"].get(size)
+        if not baseline_size:
+            continue
+        for section in ("routes", "graph"):
+            for name, result in current_size.get(section, {}).items():
+                before = baseline_size.get(section, {}).get(name, {}).get(args.metric)
+                after = result.get(args.metric)
+                if not before or after is None:
+                    continue
+                change = (after - before) / before
+                flag = "REGRESSION" if change > args.threshold else "ok"
+                print(f"{flag:10} {size:>8} {name:60} {before:10.2f} -> {after:10.2f} ({change:+.1%})")
+                if change > args.threshold:
+                    regressions.append((size, name, change))
+
+    if regressions:
+        print(f"{len(regressions)} regressions past {args.threshold:.0%} on {args.metric}")
+        sys.exit(1)
+    print(f"No regressions past {args.threshold:.0%} on {args.metric}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = subparsers.add_parser("run", help="Populate databases and benchmark every route")
+    run_parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    run_parser.add_argument("--database-url", default=DEFAULT_DATABASE_URL,
+                            help="SQLAlchemy URL; {size} is replaced with the posting count")
+    run_parser.add_argument("--iterations", type=int, default=50)
+    run_parser.add_argument("--init-iterations", type=int, default=3)
+    run_parser.add_argument("--output", default="bench.json")
+    run_parser.add_argument("--source", choices=["synthetic", "csv"], default="synthetic",
+                            help="Fill databases from the fitted generator or by cycling the CSV")
+
+    size_parser = subparsers.add_parser("size", help=argparse.SUPPRESS)
+    size_parser.add_argument("size", type=int)
+    size_parser.add_argument("--iterations", type=int, default=50)
+    size_parser.add_argument("--init-iterations", type=int, default=3)
+    size_parser.add_argument("--source", choices=["synthetic", "csv"], default="synthetic")
+
+    startup_parser = subparsers.add_parser("startup", help="Measure import and first-request time")
+    startup_parser.add_argument("--runs", type=int, default=5)
+    startup_parser.add_argument("--top", type=int, default=15, help="Number of slowest imports to list")
+
+    neo4j_parser = subparsers.add_parser("neo4j", help="Ingest and query Neo4j without and with its schema")
+    neo4j_parser.add_argument("--jobs", type=int, default=2000)
+    neo4j_parser.add_argument("--seed", type=int, default=0)
+    neo4j_parser.add_argument("--chunk", type=int, default=200, help="Jobs per ingest throughput sample")
+    neo4j_parser.add_argument("--iterations", type=int, default=200)
+    neo4j_parser.add_argument("--wipe", action="store_true", help="Confirm that the target database may be cleared")
+
+    projections_parser = subparsers.add_parser("projections", help="Compare ORM and projection row scans per route")
+    projections_parser.add_argument("--size", type=int, default=100000)
+    projections_parser.add_argument("--database-url", default=DEFAULT_DATABASE_URL,
+                                    help="SQLAlchemy URL; {size} is replaced with the posting count")
+    projections_parser.add_argument("--iterations", type=int, default=3)
+
+    approx_parser = subparsers.add_parser("approx", help="Compare approx=1 sampling against exact analytics")
+    approx_parser.add_argument("--size", type=int, default=100000)
+    approx_parser.add_argument("--database-url", default=DEFAULT_DATABASE_URL,
+                               help="SQLAlchemy URL; {size} is replaced with the posting count")
+    approx_parser.add_argument("--sample-sizes", type=int, nargs="+", default=[250, 1000, 4000],
+                               help="Jobs sampled per industry")
+    approx_parser.add_argument("--iterations", type=int, default=5)
+
+    compare_parser = subparsers.add_parser("compare", help="Fail when results regress against a baseline")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("current")
+    compare_parser.add_argument("--threshold", type=float, default=0.2,
+                                help="Allowed relative increase, e.g. 0.2 for 20%%")
+    compare_parser.add_argument("--metric", default="p95_ms",
+                                choices=["p50_ms", "p95_ms", "p99_ms", "rss_growth_mb"])
+
+    args = parser.parse_args()
+    if args.command == "run":
+        run(args)
+    elif args.command == "startup":
+        startup(args)
+    elif args.command == "neo4j":
+        benchmark_neo4j(args)
+    elif args.command == "projections":
+        benchmark_projections(args)
+    elif args.command == "approx":
+        benchmark_approx(args)
+    elif args.command == "size":
+        json.dump(run_size(args.size, args.iterations, args.init_iterations, args.source), sys.stdout)
+    else:
+        compare(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,234 @@
+"""Single-flight coalescing and a concurrency cap for expensive views.
+
+When a dashboard with many viewers reloads, identical analytics requests
+arrive together. A view decorated with @coalesced computes each distinct
+request (endpoint plus sorted query args, for this app's databases) once:
+concurrent identical requests in the same process wait for the first one
+and get a copy of its response, or its error status if the view raised. Across workers the first request also takes an flock on a key
+file under COALESCE_DIR and writes its response there; a request in
+another worker that finds the key locked waits for the lock and reuses
+that response if it was finished after the request arrived.
+
+A request that does compute first takes one of MAX_EXPENSIVE_COMPUTATIONS
+slots, which are lock files shared by every worker on the host. It waits
+up to EXPENSIVE_QUEUE_SECONDS for a free slot and is then answered with
+503 and Retry-After. Without fcntl (e.g. on Windows) both the coalescing
+and the cap stay within one process.
+"""
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from functools import wraps
+
+from flask import Response, current_app, g, jsonify, request
+from werkzeug.exceptions import HTTPException, InternalServerError
+
+from instrumentation import record_coalesce
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+COALESCE_DIR = os.environ.get("COALESCE_DIR", os.path.join(tempfile.gettempdir(), "ds_jobs_coalesce"))
+MAX_EXPENSIVE_COMPUTATIONS = int(os.environ.get("MAX_EXPENSIVE_COMPUTATIONS", 4))
+EXPENSIVE_QUEUE_SECONDS = float(os.environ.get("EXPENSIVE_QUEUE_SECONDS", 5))
+COALESCE_WAIT_SECONDS = float(os.environ.get("COALESCE_WAIT_SECONDS", 30))
+RETRY_AFTER_SECONDS = 2
+POLL_SECONDS = 0.01
+
+_flights = {}
+_flights_lock = threading.Lock()
+_local_slots = threading.BoundedSemaphore(MAX_EXPENSIVE_COMPUTATIONS)
+
+
+class Flight:
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        # the HTTPException joiners raise when the leader's view raised
+        self.error = None
+
+
+class FileLock:
+    """An exclusive flock on a file, held by this object until release()."""
+
+    def __init__(self, path):
+        self.path = path
+        self._file = None
+
+    def acquire(self, timeout):
+        """True once locked; False if still held elsewhere after `timeout` seconds."""
+        handle = open(self.path, "a+b")
+        deadline = time.monotonic() + timeout
+        while True:
+            try:
+                fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                self._file = handle
+                return True
+            except BlockingIOError:
+                if time.monotonic() >= deadline:
+                    handle.close()
+                    return False
+                time.sleep(POLL_SECONDS)
+
+    def release(self):
+        if self._file is not None:
+            fcntl.flock(self._file, fcntl.LOCK_UN)
+            self._file.close()
+            self._file = None
+
+
+def request_key():
+    """The app's databases, the endpoint and its query args, sorted, with empty values dropped."""
+    args = sorted((name, value.strip()) for name, value in request.args.items(multi=True) if value.strip())
+    # apps sharing COALESCE_DIR (e.g. staging next to production) must not serve each other's results
+    config = current_app.config
+    databases = [str(config.get("SQLALCHEMY_DATABASE_URI")),
+                 sorted((name, str(url)) for name, url in (config.get("SQLALCHEMY_BINDS") or {}).items())]
+    # replica and primary reads can differ right after a write, so they never share a result
+    return json.dumps([databases, request.endpoint, bool(g.get("use_replica")), args])
+
+
+def snapshot(response):
+    return response.status_code, [(k, v) for k, v in response.headers if k != "Content-Length"], response.get_data()
+
+
+def replay(result, outcome):
+    status, headers, body = result
+    response = Response(body, status=status, headers=headers)
+    response.headers["X-Coalesced"] = outcome
+    return response
+
+
+def too_busy():
+    response = jsonify({"error": "Too many expensive requests in progress; try again shortly"})
+    response.status_code = 503
+    response.headers["Retry-After"] = str(RETRY_AFTER_SECONDS)
+    return response
+
+
+def _result_path(digest):
+    return os.path.join(COALESCE_DIR, f"{digest}.result")
+
+
+def _read_result(digest, since):
+    """The response another worker stored for this key, if finished at or after `since`."""
+    try:
+        with open(_result_path(digest), "rb") as handle:
+            header, body = handle.read().split(b"\n", 1)
+    except (OSError, ValueError):
+        return None
+    meta = json.loads(header)
+    if meta["finished"] < since:
+        return None
+    return meta["status"], meta["headers"], body
+
+
+def _write_result(digest, result):
+    status, headers, body = result
+    header = json.dumps({"finished": time.time(), "status": status, "headers": headers}).encode()
+    fd, temp_path = tempfile.mkstemp(dir=COALESCE_DIR)
+    with os.fdopen(fd, "wb") as handle:
+        handle.write(header + b"\n" + body)
+    os.replace(temp_path, _result_path(digest))
+
+
+def _take_slot():
+    """A slot token, or None after waiting EXPENSIVE_QUEUE_SECONDS."""
+    if fcntl is None:
+        return _local_slots if _local_slots.acquire(timeout=EXPENSIVE_QUEUE_SECONDS) else None
+    deadline = time.monotonic() + EXPENSIVE_QUEUE_SECONDS
+    while True:
+        for slot in range(MAX_EXPENSIVE_COMPUTATIONS):
+            lock = FileLock(os.path.join(COALESCE_DIR, f"slot-{slot}.lock"))
+            if lock.acquire(0):
+                return lock
+        if time.monotonic() >= deadline:
+            return None
+        time.sleep(POLL_SECONDS)
+
+
+def _compute(fn, args, kwargs):
+    """Run the view in a slot; returns a snapshot, or None when no slot freed up."""
+    slot = _take_slot()
+    if slot is None:
+        return None
+    try:
+        return snapshot(current_app.make_response(fn(*args, **kwargs)))
+    finally:
+        slot.release()
+
+
+def _lead(fn, args, kwargs, key):
+    """Produce the response for `key` in this process, reusing another worker's if possible."""
+    if fcntl is None:
+        return _compute(fn, args, kwargs), "computed"
+    os.makedirs(COALESCE_DIR, exist_ok=True)
+    digest = hashlib.sha1(key.encode()).hexdigest()
+    arrived = time.time()
+    lock = FileLock(os.path.join(COALESCE_DIR, f"{digest}.lock"))
+    if not lock.acquire(0):
+        if not lock.acquire(COALESCE_WAIT_SECONDS):
+            return None, "rejected"
+        shared = _read_result(digest, arrived)
+        if shared is not None:
+            lock.release()
+            return shared, "shared"
+    try:
+        result = _compute(fn, args, kwargs)
+        if result is not None:
+            _write_result(digest, result)
+        return result, "computed"
+    finally:
+        lock.release()
+
+
+def coalesced(fn):
+    """Compute concurrent identical requests to this view once, within the expensive-work cap."""
+    @wraps(fn)
+    def wrapper(*args, **kwargs):
+        key = request_key()
+        with _flights_lock:
+            flight = _flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = _flights[key] = Flight()
+        if not leader:
+            if flight.done.wait(COALESCE_WAIT_SECONDS) and flight.error is not None:
+                record_coalesce("joined")
+                raise flight.error
+            if flight.result is None:
+                record_coalesce("rejected")
+                return too_busy()
+            record_coalesce("joined")
+            return replay(flight.result, "joined")
+
+        try:
+            flight.result, outcome = _lead(fn, args, kwargs, key)
+        except HTTPException as e:
+            flight.error = e
+            raise
+        except Exception as e:
+            # the leader's traceback is logged by Flask once; joiners just get the 500
+            flight.error = InternalServerError(original_exception=e)
+            raise
+        finally:
+            with _flights_lock:
+                del _flights[key]
+            flight.done.set()
+        if flight.result is None:
+            logger.warning(f"Rejected {request.endpoint}: no expensive-work slot within {EXPENSIVE_QUEUE_SECONDS}s")
+            record_coalesce("rejected")
+            return too_busy()
+        record_coalesce(outcome)
+        return replay(flight.result, outcome)
+    return wrapper
@@ -0,0 +1,150 @@
+"""Dashboard panels computed together from one scan of the jobs table.
+
+Each panel is an accumulator: it sees every job row once through add() and
+builds its response in result(). compute_bundle() reads one projection of
+the columns the requested panels need, splits each row's skills once, and
+feeds the row to every panel. Graph backend reads (the co-occurrence links
+for the skill graph) don't touch the jobs table, so they run on a worker
+thread while the scan runs. Panel responses match the standalone
+/api/industry-skills, /api/skill-graph, /api/skill-frequency and
+/api/salary-distribution endpoints.
+"""
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+
+from sample_data import skill_category
+
+_executor = None
+
+
+def _background(fn, *args):
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="dashboard")
+    # copy the context so request instrumentation still sees the graph call
+    return _executor.submit(contextvars.copy_context().run, fn, *args)
+
+
+def top_counts(counts, limit):
+    return sorted(counts.items(), key=lambda x: x[1], reverse=True)[:limit]
+
+
+class IndustrySkillsPanel:
+    def __init__(self, params):
+        self.industry_skills = {}
+
+    def add(self, row, skills):
+        if row.industry is None or row.required_skills is None:
+            return
+        counts = self.industry_skills.setdefault(row.industry, {})
+        for skill in skills:
+            counts[skill] = counts.get(skill, 0) + 1
+
+    def result(self, links=None):
+        formatted = [{
+            "industry": industry,
+            "skills": [{"name": s[0], "count": s[1]} for s in top_counts(skills, 5)]
+        } for industry, skills in self.industry_skills.items()]
+        return sorted(formatted, key=lambda x: x['industry'])
+
+
+class SkillGraphPanel:
+    needs_links = True
+
+    def __init__(self, params):
+        self.skill_counts = {}
+
+    def add(self, row, skills):
+        for skill in skills:
+            self.skill_counts[skill] = self.skill_counts.get(skill, 0) + 1
+
+    def result(self, links=None):
+        return {
+            "nodes": [{
+                "id": skill_name,
+                "name": skill_name,
+                "category": skill_category(skill_name),
+                "count": count
+            } for skill_name, count in self.skill_counts.items()],
+            "links": links or []
+        }
+
+
+class SkillFrequencyPanel:
+    def __init__(self, params):
+        self.industry = params.get('industry', '')
+        self.experience = params.get('experience', '')
+        self.skill_counts = {}
+
+    def add(self, row, skills):
+        if self.industry and row.industry != self.industry:
+            return
+        if self.experience and row.experience_level != self.experience:
+            return
+        for skill in skills:
+            self.skill_counts[skill] = self.skill_counts.get(skill, 0) + 1
+
+    def result(self, links=None):
+        sorted_skills = top_counts(self.skill_counts, 20)
+        return {
+            "labels": [s[0] for s in sorted_skills],
+            "data": [s[1] for s in sorted_skills]
+        }
+
+
+class SalaryDistributionPanel:
+    def __init__(self, params):
+        self.column = 'company_location' if params.get('group_by', 'location') == 'location' else 'job_category'
+        self.groups = {}
+
+    def add(self, row, skills):
+        label = getattr(row, self.column)
+        if row.salary_usd is None or not label:
+            return
+        group = self.groups.get(label)
+        if group is None:
+            self.groups[label] = [row.salary_usd, row.salary_usd, row.salary_usd, 1]
+        else:
+            group[0] += row.salary_usd
+            group[1] = min(group[1], row.salary_usd)
+            group[2] = max(group[2], row.salary_usd)
+            group[3] += 1
+
+    def result(self, links=None):
+        data = [{
+            "label": label,
+            "avg": round(total / count),
+            "min": low,
+            "max": high,
+            "count": count
+        } for label, (total, low, high, count) in self.groups.items()]
+        return sorted(data, key=lambda x: x['avg'], reverse=True)
+
+
+PANELS = {
+    "industry-skills": IndustrySkillsPanel,
+    "skill-graph": SkillGraphPanel,
+    "skill-frequency": SkillFrequencyPanel,
+    "salary-distribution": SalaryDistributionPanel,
+}
+
+
+def compute_bundle(panel_params, load_rows, load_links):
+    """Compute {panel name: response} for {panel name: params}.
+
+    load_rows() returns job rows with industry, experience_level,
+    company_location, job_category, required_skills and salary_usd
+    attributes; load_links() returns the skill co-occurrence links.
+    """
+    panels = {name: PANELS[name](params) for name, params in panel_params.items()}
+    links = None
+    if any(getattr(panel, "needs_links", False) for panel in panels.values()):
+        links = _background(load_links)
+
+    for row in load_rows():
+        skills = [s.strip() for s in row.required_skills.split(',')] if row.required_skills else []
+        for panel in panels.values():
+            panel.add(row, skills)
+
+    links = links.result() if links is not None else None
+    return {name: panel.result(links) for name, panel in panels.items()}
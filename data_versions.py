@@ -0,0 +1,105 @@
+"""Cross-worker invalidation of the per-process derived structures.
+
+The facet index, trend cubes, approx sample, recommender, PageRank, graph
+layout, similar-jobs vectors and in-memory skill graph live in each worker
+and are kept current by that worker's own job_written() calls. Writes
+handled anywhere else, such as another worker, `flask archive-expired` or
+`load-synthetic`, would go unnoticed. So every path that writes jobs bumps
+the "jobs" row of the data_versions table after committing. A worker that
+sees the version move further than its own bumps explain calls its
+on_change hook, which drops its structures so they rebuild from the
+database on next use.
+
+Each worker checks on a background thread every JOBS_VERSION_POLL_SECONDS,
+and views can call check() to validate before serving (one primary-key
+read).
+"""
+import logging
+import os
+import threading
+import time
+
+from sqlalchemy import insert, select, update
+from sqlalchemy.exc import IntegrityError
+
+from app import db
+from models import DataVersion
+from replica import primary
+
+logger = logging.getLogger(__name__)
+
+JOBS_VERSION_POLL_SECONDS = float(os.environ.get("JOBS_VERSION_POLL_SECONDS", 1))
+
+
+class VersionWatch:
+    """This process's view of one data_versions row."""
+
+    def __init__(self, name):
+        self.name = name
+        self.on_change = None
+        self._seen = None
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def _advance(self, version, own_write=False):
+        with self._lock:
+            seen, self._seen = self._seen, max(version, self._seen or 0)
+        # an own bump is expected to move the version by exactly one
+        expected = seen + 1 if own_write and seen is not None else seen
+        if seen is not None and version > expected and self.on_change is not None:
+            logger.info(f"{self.name} changed outside this process (version {seen} -> {version}); invalidating")
+            self.on_change()
+
+    def bump(self):
+        """Record a committed write to the data; returns the new version."""
+        statement = (update(DataVersion).where(DataVersion.name == self.name)
+                     .values(version=DataVersion.version + 1).returning(DataVersion.version))
+        version = db.session.execute(statement).scalar()
+        if version is None:
+            try:
+                db.session.execute(insert(DataVersion).values(name=self.name, version=1))
+                version = 1
+            except IntegrityError:
+                db.session.rollback()
+                version = db.session.execute(statement).scalar()
+        db.session.commit()
+        self._advance(version, own_write=True)
+        return version
+
+    def check(self):
+        """Read the stored version and invalidate if another process moved it."""
+        with primary():
+            version = db.session.execute(
+                select(DataVersion.version).where(DataVersion.name == self.name)).scalar() or 0
+        self._advance(version)
+
+    def start(self, app, on_change):
+        """Take the current version as this process's baseline and poll it from now on."""
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is not None:
+                return
+            self.on_change = on_change
+            self._thread = threading.Thread(target=self._run, args=(app,), name=f"{self.name}-version", daemon=True)
+            self._thread.start()
+
+    def _run(self, app):
+        while True:
+            with app.app_context():
+                try:
+                    self.check()
+                except Exception as e:
+                    db.session.rollback()
+                    logger.error(f"Error checking the {self.name} version: {e}")
+                finally:
+                    db.session.remove()
+            time.sleep(JOBS_VERSION_POLL_SECONDS)
+
+
+jobs_version = VersionWatch("jobs")
+
+
+def init_version_polling(app, on_change):
+    """Start polling the jobs version with the app's first request."""
+    app.before_request(lambda: jobs_version.start(app, on_change))
@@ -0,0 +1,241 @@
+"""Bitmap index over the dashboard filters.
+
+Every categorical filter value (industry, location, experience level,
+category, remote ratio, company size) and every SALARY_BUCKET-wide salary
+bucket gets a bitmap with one bit per job, at the job's primary key.
+Bitmaps are Python ints, so AND/OR run in C over whole machine words and
+int.bit_count() is the popcount. A filter combination is the AND of the
+selected values' bitmaps. Salary ranges OR the covered buckets and check
+exact salaries only in the two edge buckets. Facet counts follow the usual
+disjunctive rule: a dimension's counts apply every other selected filter
+but not its own, so the dropdowns show what each choice would return.
+
+The index is built with one projection scan of the jobs table and kept
+current from job_written(), like the in-memory skill graph (per process).
+"""
+import threading
+
+from flask_sqlalchemy.pagination import Pagination
+
+from models import Job
+
+SALARY_BUCKET = 10000
+
+# request argument -> (job_state key, Job column)
+FACETS = {
+    "industry": ("industry", "industry"),
+    "location": ("location", "company_location"),
+    "experience": ("experience_level", "experience_level"),
+    "job_category": ("job_category", "job_category"),
+    "remote_ratio": ("remote_ratio", "remote_ratio"),
+    "company_size": ("company_size", "company_size"),
+}
+
+
+def to_bitmap(positions):
+    import numpy as np
+    positions = np.asarray(positions, dtype=np.int64)
+    if not len(positions):
+        return 0
+    bits = np.zeros(int(positions.max()) + 1, dtype=bool)
+    bits[positions] = True
+    return int.from_bytes(np.packbits(bits, bitorder="little").tobytes(), "little")
+
+
+def to_positions(bitmap):
+    import numpy as np
+    if not bitmap:
+        return np.zeros(0, dtype=np.int64)
+    raw = np.frombuffer(bitmap.to_bytes((bitmap.bit_length() + 7) // 8, "little"), dtype=np.uint8)
+    return np.flatnonzero(np.unpackbits(raw, bitorder="little"))
+
+
+def facet_value(value):
+    # request arguments are strings, so remote_ratio 50 is stored as "50"
+    return "" if value is None else str(value)
+
+
+class FacetIndex:
+    def __init__(self):
+        self._built = False
+        self._lock = threading.RLock()
+        self.all = 0
+        self.values = {facet: {} for facet in FACETS}
+        self.salary_buckets = {}
+        self.salaries = self.dates = None
+        self.salary_sum = self.salary_count = 0
+
+    def _reset(self):
+        import numpy as np
+        self.all = 0
+        self.values = {facet: {} for facet in FACETS}
+        self.salary_buckets = {}
+        self.salaries = np.full(0, np.nan)
+        self.dates = np.full(0, -1, dtype=np.int64)
+        self.salary_sum = 0
+        self.salary_count = 0
+
+    def _grow(self, position):
+        import numpy as np
+        if position < len(self.salaries):
+            return
+        size = max(position + 1, len(self.salaries) * 2, 1024)
+        self.salaries = np.concatenate([self.salaries, np.full(size - len(self.salaries), np.nan)])
+        self.dates = np.concatenate([self.dates, np.full(size - len(self.dates), -1, dtype=np.int64)])
+
+    def build(self, rows):
+        """Build from (id, posting_date, salary_usd, *FACETS columns) rows."""
+        import numpy as np
+        with self._lock:
+            self._reset()
+            positions = {facet: {} for facet in FACETS}
+            buckets = {}
+            ids = []
+            for job_id, posting_date, salary, *facet_values in rows:
+                ids.append(job_id)
+                for facet, value in zip(FACETS, facet_values):
+                    positions[facet].setdefault(facet_value(value), []).append(job_id)
+                if salary is not None:
+                    buckets.setdefault(salary // SALARY_BUCKET, []).append(job_id)
+                self._grow(job_id)
+                self.salaries[job_id] = np.nan if salary is None else salary
+                self.dates[job_id] = posting_date.toordinal() if posting_date else -1
+                if salary is not None:
+                    self.salary_sum += salary
+                    self.salary_count += 1
+            self.all = to_bitmap(ids)
+            self.values = {facet: {value: to_bitmap(p) for value, p in by_value.items()}
+                           for facet, by_value in positions.items()}
+            self.salary_buckets = {bucket: to_bitmap(p) for bucket, p in buckets.items()}
+            self._built = True
+
+    def invalidate(self):
+        self._built = False
+
+    def ensure_built(self, load_rows):
+        if self._built:
+            return
+        with self._lock:
+            if not self._built:
+                self.build(load_rows())
+
+    def _set(self, bitmaps, key, bit, on):
+        bitmap = bitmaps.get(key, 0)
+        bitmap = bitmap | bit if on else bitmap & ~bit
+        if bitmap:
+            bitmaps[key] = bitmap
+        else:
+            bitmaps.pop(key, None)
+
+    def record(self, old_state, new_state):
+        """Apply one job write; skipped until the index is first built."""
+        import numpy as np
+        with self._lock:
+            if not self._built:
+                return
+            for state, on in ((old_state, False), (new_state, True)):
+                if state is None:
+                    continue
+                position = state["id"]
+                bit = 1 << position
+                self.all = self.all | bit if on else self.all & ~bit
+                for facet, (key, _) in FACETS.items():
+                    self._set(self.values[facet], facet_value(state[key]), bit, on)
+                salary = state["salary_usd"]
+                if salary is not None:
+                    self._set(self.salary_buckets, salary // SALARY_BUCKET, bit, on)
+                    self.salary_sum += salary if on else -salary
+                    self.salary_count += 1 if on else -1
+                self._grow(position)
+                posting_date = state["posting_date"]
+                self.salaries[position] = salary if on and salary is not None else np.nan
+                self.dates[position] = posting_date.toordinal() if on and posting_date else -1
+
+    def salary_bitmap(self, low=None, high=None):
+        """Jobs with low <= salary_usd <= high; edge buckets are checked exactly."""
+        import numpy as np
+        low_bucket = None if low is None else low // SALARY_BUCKET
+        high_bucket = None if high is None else high // SALARY_BUCKET
+        result = 0
+        for bucket, bitmap in self.salary_buckets.items():
+            if (low_bucket is not None and bucket < low_bucket) or (high_bucket is not None and bucket > high_bucket):
+                continue
+            if bucket == low_bucket or bucket == high_bucket:
+                positions = to_positions(bitmap)
+                values = self.salaries[positions]
+                keep = np.ones(len(positions), dtype=bool)
+                if low is not None:
+                    keep &= values >= low
+                if high is not None:
+                    keep &= values <= high
+                bitmap = to_bitmap(positions[keep])
+            result |= bitmap
+        return result
+
+    def query(self, filters, salary_min=None, salary_max=None, restrict=None):
+        """Return (matching bitmap, {facet: {value: count}}) for the selected filters.
+
+        restrict is an extra bitmap (e.g. text search matches) applied to
+        the result and to every facet count.
+        """
+        with self._lock:
+            base = self.all if restrict is None else self.all & restrict
+            if salary_min is not None or salary_max is not None:
+                base &= self.salary_bitmap(salary_min, salary_max)
+            selected = {facet: self.values[facet].get(value, 0)
+                        for facet, value in filters.items() if value}
+            match = base
+            for bitmap in selected.values():
+                match &= bitmap
+            counts = {}
+            for facet, by_value in self.values.items():
+                others = base
+                for other, bitmap in selected.items():
+                    if other != facet:
+                        others &= bitmap
+                counts[facet] = {value: (bitmap & others).bit_count() for value, bitmap in by_value.items()}
+            return match, counts
+
+    def page_ids(self, bitmap, page, per_page):
+        """Job ids on one page, ordered by posting date (newest first, undated last), then id."""
+        import numpy as np
+        positions = to_positions(bitmap)
+        offset = (page - 1) * per_page
+        if offset >= len(positions):
+            return []
+        # dates fit in 20 bits and ids in 32, so one int64 key orders both
+        keys = (self.dates[positions] + 1) * (1 << 32) + positions
+        wanted = min(offset + per_page, len(positions))
+        top = np.argpartition(-keys, wanted - 1)[:wanted]
+        top = top[np.argsort(-keys[top])]
+        return positions[top[offset:wanted]].tolist()
+
+    def stats(self):
+        """Totals the dashboard header shows, over all jobs."""
+        import numpy as np
+        with self._lock:
+            has_salary = bool(self.salary_count)
+            return {
+                "total_jobs": self.all.bit_count(),
+                "avg_salary": self.salary_sum / self.salary_count if has_salary else 0,
+                "min_salary": int(np.nanmin(self.salaries)) if has_salary else None,
+                "max_salary": int(np.nanmax(self.salaries)) if has_salary else None,
+                "values": {facet: sorted(v for v in by_value if v) for facet, by_value in self.values.items()},
+            }
+
+
+class BitmapPagination(Pagination):
+    """Pagination over a FacetIndex match; only the page's rows are loaded."""
+
+    def _query_items(self):
+        ids = self._query_args["index"].page_ids(self._query_args["bitmap"], self.page, self.per_page)
+        if not ids:
+            return []
+        jobs = {job.id: job for job in Job.query.filter(Job.id.in_(ids))}
+        return [jobs[i] for i in ids if i in jobs]
+
+    def _query_count(self):
+        return self._query_args["bitmap"].bit_count()
+
+
+facet_index = FacetIndex()
@@ -0,0 +1,224 @@
+"""Server-side layout and communities for the skill co-occurrence graph.
+
+The layout is a Fruchterman-Reingold force simulation over the skill nodes
+(edge attraction scaled by log co-occurrence count, plus a weak pull to the
+centre so isolated skills stay on screen), run with numpy and normalized to
+the unit square. Communities come from Louvain modularity optimization over
+the same weights. Both are cached; after a job write the rebuild runs in
+the background and warm-starts from the previous positions, so it needs a
+fraction of the iterations and existing nodes barely move. New nodes start
+at the mean of their already-placed neighbours. The browser only scales
+the coordinates and draws.
+"""
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+COLD_ITERATIONS = 300
+WARM_ITERATIONS = 60
+GRAVITY = 0.05
+RESOLUTION = 1.0
+
+
+def force_layout(names, edges, previous=None, iterations=None, seed=0):
+    """Positions for names as {name: (x, y)}, roughly within the unit square.
+
+    edges is {(a, b): weight}; previous is an earlier result to start from.
+    Positions are left unscaled so a warm start resumes the same
+    equilibrium; normalize() fits them to [0, 1] for display.
+    """
+    import numpy as np
+    n = len(names)
+    if n == 0:
+        return {}
+    if n == 1:
+        return {names[0]: (0.5, 0.5)}
+    index = {name: i for i, name in enumerate(names)}
+    weights = np.zeros((n, n))
+    for (a, b), weight in edges.items():
+        if a in index and b in index and a != b:
+            weights[index[a], index[b]] = weights[index[b], index[a]] = np.log1p(weight)
+    if weights.max() > 0:
+        weights /= weights.max()
+
+    rng = np.random.default_rng(seed)
+    positions = rng.random((n, 2))
+    placed = np.zeros(n, dtype=bool)
+    for name, xy in (previous or {}).items():
+        if name in index:
+            positions[index[name]] = xy
+            placed[index[name]] = True
+    for i in np.flatnonzero(~placed):
+        neighbours = (weights[i] > 0) & placed
+        if neighbours.any():
+            positions[i] = positions[neighbours].mean(axis=0) + rng.normal(0, 0.02, 2)
+
+    warm = placed.sum() > n // 2
+    if iterations is None:
+        iterations = WARM_ITERATIONS if warm else COLD_ITERATIONS
+    k = np.sqrt(1.0 / n)
+    temperature = 0.02 if warm else 0.1
+    cooling = temperature / (iterations + 1)
+    for _ in range(iterations):
+        delta = positions[:, None, :] - positions[None, :, :]
+        distance = np.maximum(np.linalg.norm(delta, axis=-1), 1e-6)
+        magnitude = k * k / distance - weights * distance * distance / k
+        np.fill_diagonal(magnitude, 0)
+        force = (delta / distance[..., None] * magnitude[..., None]).sum(axis=1)
+        force -= GRAVITY * n * k * (positions - 0.5)
+        length = np.maximum(np.linalg.norm(force, axis=1), 1e-9)
+        positions += force / length[:, None] * np.minimum(length, temperature)[:, None]
+        temperature -= cooling
+
+    return {name: (float(x), float(y)) for name, (x, y) in zip(names, positions)}
+
+
+def normalize(positions):
+    """Fit positions to [0, 1]^2 around their centroid, rounded for the response.
+
+    The scale comes from the 95th percentile distance rather than the
+    bounding box, so one new outlying node does not rescale the whole
+    picture; the few nodes beyond it are clamped to the edge.
+    """
+    import numpy as np
+    if not positions:
+        return {}
+    names = list(positions)
+    points = np.array([positions[name] for name in names])
+    centre = points.mean(axis=0)
+    radius = np.percentile(np.abs(points - centre).max(axis=1), 95) or 1.0
+    points = np.clip(0.5 + (points - centre) / (2 * radius), 0, 1)
+    return {name: (round(float(x), 4), round(float(y), 4)) for name, (x, y) in zip(names, points)}
+
+
+def louvain(names, edges, resolution=RESOLUTION):
+    """Louvain communities as {name: community id}.
+
+    Ids are numbered by community size (largest first), ties by the
+    alphabetically first member, so colours stay put across rebuilds when
+    the partition does not change.
+    """
+    adjacency = {name: {} for name in names}
+    for (a, b), weight in edges.items():
+        if a in adjacency and b in adjacency and a != b:
+            adjacency[a][b] = adjacency[a].get(b, 0) + weight
+            adjacency[b][a] = adjacency[b].get(a, 0) + weight
+    membership = {name: name for name in names}
+
+    while True:
+        degree = {node: sum(targets.values()) for node, targets in adjacency.items()}
+        total = sum(degree.values())
+        if not total:
+            break
+        community = {node: node for node in adjacency}
+        community_degree = dict(degree)
+        settled = improved = True
+        while improved:
+            improved = False
+            for node in sorted(adjacency):
+                current = community[node]
+                community_degree[current] -= degree[node]
+                links = {}
+                for neighbour, weight in adjacency[node].items():
+                    if neighbour != node:
+                        links[community[neighbour]] = links.get(community[neighbour], 0) + weight
+                best = current
+                best_gain = links.get(current, 0) - resolution * community_degree[current] * degree[node] / total
+                for candidate, weight in sorted(links.items()):
+                    gain = weight - resolution * community_degree[candidate] * degree[node] / total
+                    if gain > best_gain + 1e-12:
+                        best, best_gain = candidate, gain
+                community_degree[best] += degree[node]
+                if best != current:
+                    community[node] = best
+                    improved = True
+                    settled = False
+        if settled:
+            break
+        # aggregate each community into one node (self-loops keep its internal weight)
+        aggregated = {c: {} for c in set(community.values())}
+        for node, targets in adjacency.items():
+            for neighbour, weight in targets.items():
+                a, b = community[node], community[neighbour]
+                aggregated[a][b] = aggregated[a].get(b, 0) + weight
+        adjacency = aggregated
+        membership = {name: community[node] for name, node in membership.items()}
+
+    groups = {}
+    for name, node in membership.items():
+        groups.setdefault(node, []).append(name)
+    ordered = sorted(groups.values(), key=lambda members: (-len(members), min(members)))
+    return {name: cluster for cluster, members in enumerate(ordered) for name in members}
+
+
+class SkillGraphLayout:
+    def __init__(self):
+        self._state = None
+        self._dirty = True
+        self._lock = threading.Lock()
+        self._rebuild_thread = None
+
+    def build(self, graph):
+        """Build from (skill names, co-occurrence links as {source, target, weight} dicts)."""
+        names, links = graph
+        names = sorted(set(names) | {l["source"] for l in links} | {l["target"] for l in links})
+        edges = {(l["source"], l["target"]): l["weight"] for l in links}
+        previous = self._state["raw"] if self._state else None
+        raw = force_layout(names, edges, previous)
+        self._state = {
+            "raw": raw,
+            "positions": normalize(raw),
+            "clusters": louvain(names, edges),
+        }
+
+    def invalidate(self, load_graph=None):
+        """Mark the layout stale and, if a loader is given, rebuild in the background."""
+        self._dirty = True
+        if load_graph is None:
+            return
+        with self._lock:
+            if self._rebuild_thread and self._rebuild_thread.is_alive():
+                return
+            self._rebuild_thread = threading.Thread(target=self._rebuild, args=(load_graph,), daemon=True)
+            self._rebuild_thread.start()
+
+    def _rebuild(self, load_graph):
+        while self._dirty:
+            self._dirty = False
+            try:
+                self.build(load_graph())
+            except Exception as e:
+                # stay dirty so the next ensure_built() retries
+                self._dirty = True
+                logger.error(f"Error rebuilding skill graph layout: {e}")
+                return
+
+    def ensure_built(self, load_graph):
+        """Build if nothing is built, or if stale and no background rebuild is running (e.g. one failed)."""
+        if self._state is not None and not self._dirty:
+            return
+        with self._lock:
+            rebuilding = self._rebuild_thread is not None and self._rebuild_thread.is_alive()
+            if self._state is None or (self._dirty and not rebuilding):
+                self._dirty = False
+                try:
+                    self.build(load_graph())
+                except Exception:
+                    self._dirty = True
+                    raise
+
+    def annotate(self, nodes):
+        """Add x, y and cluster to skill graph nodes (keyed by "id"); unknown nodes are left as is."""
+        state = self._state
+        if state is None:
+            return nodes
+        for node in nodes:
+            position = state["positions"].get(node["id"])
+            if position is not None:
+                node["x"], node["y"] = position
+                node["cluster"] = state["clusters"][node["id"]]
+        return nodes
+
+
+skill_layout = SkillGraphLayout()
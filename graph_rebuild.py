@@ -0,0 +1,146 @@
+"""Map-reduce rebuild of the skill graph from the jobs table.
+
+The job id range is split into chunks. Each chunk is read and counted in a
+separate process, giving partial tables of edge counts (REQUIRES, USES,
+OFFERS, COOCCURS_WITH), node names and the job ids behind every
+co-occurrence. The partials are summed in chunk order, so job id lists come
+out in id order just as a serial rebuild would produce them, and the totals
+are handed to the backend's bulk_load() in one step instead of one call per
+edge increment. count_rows() is the same counting step run in process, for
+callers that already have the rows (e.g. /init-data).
+"""
+import os
+import time
+from collections import Counter
+from itertools import combinations
+
+from sample_data import skill_category
+
+CHUNKS_PER_WORKER = 4
+NODE_LABELS = ("Skill", "Role", "Industry", "Location")
+
+
+def graph_edges_for_state(state):
+    edges = Counter()
+    if not state:
+        return edges
+    role, industry, location, skills = state["role"], state["industry"], state["location"], state["skills"]
+    for skill in skills:
+        if role:
+            edges[("REQUIRES", role, skill)] += 1
+        if industry:
+            edges[("USES", industry, skill)] += 1
+    if location and role:
+        edges[("OFFERS", location, role)] += 1
+    for skill1, skill2 in combinations(skills, 2):
+        if skill1 != skill2:
+            edges[("COOCCURS_WITH",) + tuple(sorted([skill1, skill2]))] += 1
+    return edges
+
+
+class GraphCounts:
+    """Partial or merged count tables for a range of jobs."""
+    __slots__ = ("jobs", "nodes", "edges", "cooccurrence_jobs")
+
+    def __init__(self):
+        self.jobs = 0
+        self.nodes = {label: {} for label in NODE_LABELS}
+        self.edges = Counter()
+        self.cooccurrence_jobs = {}
+
+    def add_state(self, state):
+        self.jobs += 1
+        for label, name in (("Role", state["role"]), ("Industry", state["industry"]),
+                            ("Location", state["location"])):
+            if name:
+                self.nodes[label][name] = None
+        for skill in state["skills"]:
+            self.nodes["Skill"][skill] = skill_category(skill)
+        edges = graph_edges_for_state(state)
+        self.edges.update(edges)
+        for (relationship, source, target), count in edges.items():
+            if relationship == "COOCCURS_WITH":
+                self.cooccurrence_jobs.setdefault((source, target), []).extend([state["job_id"]] * count)
+
+    def merge(self, other):
+        self.jobs += other.jobs
+        for label, names in other.nodes.items():
+            self.nodes[label].update(names)
+        self.edges.update(other.edges)
+        for pair, job_ids in other.cooccurrence_jobs.items():
+            self.cooccurrence_jobs.setdefault(pair, []).extend(job_ids)
+        return self
+
+
+def row_state(job_id, job_title, job_category, industry, location, required_skills):
+    """The graph fields of routes.job_state() from a projected row."""
+    skills = [s.strip() for s in required_skills.split(',')] if required_skills else []
+    return {
+        "job_id": job_id,
+        "role": job_category or job_title,
+        "industry": industry,
+        "location": location,
+        "skills": tuple(s for s in skills if s),
+    }
+
+
+def graph_columns():
+    from models import Job
+    return (Job.job_id, Job.job_title, Job.job_category, Job.industry,
+            Job.company_location, Job.required_skills)
+
+
+def count_rows(rows):
+    """Count rows shaped like graph_columns()."""
+    counts = GraphCounts()
+    for row in rows:
+        counts.add_state(row_state(*row))
+    return counts
+
+
+def count_id_range(database_url, low, high):
+    """Worker: count jobs with low <= id < high over a private connection."""
+    from sqlalchemy import create_engine, select
+    from models import Job
+    engine = create_engine(database_url)
+    try:
+        with engine.connect() as connection:
+            rows = connection.execution_options(yield_per=5000).execute(
+                select(*graph_columns()).where(Job.id >= low, Job.id < high).order_by(Job.id))
+            return count_rows(rows)
+    finally:
+        engine.dispose()
+
+
+def id_ranges(low, high, parts):
+    """Split [low, high] into up to `parts` contiguous half-open ranges."""
+    step = max(-(-(high - low + 1) // parts), 1)
+    return [(start, min(start + step, high + 1)) for start in range(low, high + 1, step)]
+
+
+def parallel_counts(database_url, low, high, workers=None, chunks_per_worker=CHUNKS_PER_WORKER):
+    """Count jobs with ids in [low, high] in a process pool; returns (counts, timings)."""
+    from concurrent.futures import ProcessPoolExecutor
+    workers = workers or os.cpu_count() or 1
+    ranges = id_ranges(low, high, workers * chunks_per_worker)
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        partials = list(pool.map(count_id_range, [database_url] * len(ranges),
+                                 [r[0] for r in ranges], [r[1] for r in ranges]))
+    counted = time.perf_counter()
+    counts = GraphCounts()
+    for partial in partials:
+        counts.merge(partial)
+    return counts, {
+        "workers": workers,
+        "chunks": len(ranges),
+        "count_seconds": counted - start,
+        "merge_seconds": time.perf_counter() - counted,
+    }
+
+
+def load_counts(graph, counts):
+    """Replace the graph's edges with the counted totals; returns seconds taken."""
+    start = time.perf_counter()
+    graph.bulk_load(counts.nodes, counts.edges, counts.cooccurrence_jobs)
+    return time.perf_counter() - start
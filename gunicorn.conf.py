@@ -0,0 +1,7 @@
+"""Gunicorn settings read from the working directory, e.g. `gunicorn main:app`."""
+
+
+def post_fork(server, worker):
+    # only serving workers warm their caches; see warmup.py
+    from warmup import enable_warmup
+    enable_warmup()
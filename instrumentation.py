@@ -0,0 +1,263 @@
+"""Per-request timing, SQL counts and Prometheus metrics.
+
+init_instrumentation() hooks a Flask app so that every request records wall
+time, time and statement count in SQLAlchemy (via engine events), rows
+fetched, time spent in skill graph backend calls and JSON serialization
+time. Each response gets a Server-Timing header, and the same numbers are
+aggregated into per-route histograms rendered by render_metrics() in the
+Prometheus text format, along with a counter of coalesced requests
+(see coalesce.py). Metrics are per process; scrape every worker.
+"""
+import os
+import threading
+import time
+from bisect import bisect_left
+from collections import Counter
+from contextvars import ContextVar
+from functools import wraps
+
+from flask import request
+from flask.json.provider import DefaultJSONProvider
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+SECONDS_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000)
+ROW_BUCKETS = (10, 100, 1000, 10000, 100000, 1000000)
+
+_current = ContextVar("request_stats", default=None)
+
+
+class RequestStats:
+    __slots__ = ("start", "db_time", "db_queries", "db_rows", "graph_time", "graph_depth", "json_time")
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.db_time = 0.0
+        self.db_queries = 0
+        self.db_rows = 0
+        self.graph_time = 0.0
+        self.graph_depth = 0
+        self.json_time = 0.0
+
+
+def current_stats():
+    return _current.get()
+
+
+class Histogram:
+    def __init__(self, name, help_text, buckets):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = buckets
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, labels, value):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = {labels: ([*counts], total, count) for labels, (counts, total, count) in self._series.items()}
+        for labels, (counts, total, count) in sorted(series.items()):
+            label_str = ",".join(f'{k}="{v}"' for k, v in labels)
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(f'{self.name}_bucket{{{label_str},le="{le}"}} {cumulative}')
+            lines.append(f"{self.name}_sum{{{label_str}}} {total}")
+            lines.append(f"{self.name}_count{{{label_str}}} {count}")
+        return "\n".join(lines)
+
+
+class CounterMetric:
+    def __init__(self, name, help_text):
+        self.name = name
+        self.help_text = help_text
+        self._series = Counter()
+        self._lock = threading.Lock()
+
+    def inc(self, labels):
+        with self._lock:
+            self._series[labels] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            series = dict(self._series)
+        for labels, count in sorted(series.items()):
+            label_str = ",".join(f'{k}="{v}"' for k, v in labels)
+            lines.append(f"{self.name}_total{{{label_str}}} {count}")
+        return "\n".join(lines)
+
+
+HISTOGRAMS = {
+    "total": Histogram("http_request_duration_seconds", "Total request wall time.", SECONDS_BUCKETS),
+    "db": Histogram("http_request_db_seconds", "Time spent executing SQL statements.", SECONDS_BUCKETS),
+    "queries": Histogram("http_request_db_queries", "SQL statements executed per request.", QUERY_BUCKETS),
+    "rows": Histogram("http_request_db_rows", "Rows fetched from the database per request.", ROW_BUCKETS),
+    "graph": Histogram("http_request_graph_seconds", "Time spent in skill graph backend calls.", SECONDS_BUCKETS),
+    "json": Histogram("http_request_json_seconds", "Time spent serializing JSON responses.", SECONDS_BUCKETS),
+}
+
+
+COALESCED = CounterMetric("http_coalesced_requests", "Coalesced view requests by outcome "
+                          "(computed, joined in process, shared across workers, rejected with 503).")
+
+
+def record_coalesce(outcome):
+    rule = request.url_rule.rule if request.url_rule else "unmatched"
+    COALESCED.inc((("outcome", outcome), ("route", rule)))
+
+
+def render_metrics():
+    return "\n".join([*(h.render() for h in HISTOGRAMS.values()), COALESCED.render()]) + "\n"
+
+
+class _CountingCursor:
+    """DBAPI cursor proxy that counts fetched rows for the current request."""
+
+    def __init__(self, cursor, stats):
+        self._cursor = cursor
+        self._stats = stats
+
+    def fetchone(self):
+        row = self._cursor.fetchone()
+        if row is not None:
+            self._stats.db_rows += 1
+        return row
+
+    def fetchmany(self, *args):
+        rows = self._cursor.fetchmany(*args)
+        self._stats.db_rows += len(rows)
+        return rows
+
+    def fetchall(self):
+        rows = self._cursor.fetchall()
+        self._stats.db_rows += len(rows)
+        return rows
+
+    def __iter__(self):
+        for row in self._cursor:
+            self._stats.db_rows += 1
+            yield row
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = _current.get()
+    if stats is not None:
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = _current.get()
+    if stats is None or not conn.info.get("query_start"):
+        return
+    stats.db_time += time.perf_counter() - conn.info["query_start"].pop()
+    stats.db_queries += 1
+    if context is not None and cursor.description is not None:
+        context.cursor = _CountingCursor(cursor, stats)
+
+
+def _handle_error(exception_context):
+    starts = exception_context.connection.info.get("query_start") if exception_context.connection else None
+    if starts:
+        starts.pop()
+
+
+def timed_graph_call(fn):
+    @wraps(fn)
+    def wrapper(*args, **kwargs):
+        stats = _current.get()
+        if stats is None or stats.graph_depth:
+            return fn(*args, **kwargs)
+        stats.graph_depth += 1
+        start = time.perf_counter()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            stats.graph_time += time.perf_counter() - start
+            stats.graph_depth -= 1
+    return wrapper
+
+
+def instrument_graph_backend(cls):
+    if cls.__dict__.get("_instrumented"):
+        return cls
+    cls._instrumented = True
+    for name, attr in list(vars(cls).items()):
+        if callable(attr) and not name.startswith("__"):
+            setattr(cls, name, timed_graph_call(attr))
+    return cls
+
+
+class TimedJSONProvider(DefaultJSONProvider):
+    def dumps(self, obj, **kwargs):
+        stats = _current.get()
+        if stats is None:
+            return super().dumps(obj, **kwargs)
+        start = time.perf_counter()
+        try:
+            return super().dumps(obj, **kwargs)
+        finally:
+            stats.json_time += time.perf_counter() - start
+
+
+def _before_request():
+    request.environ["request_stats.token"] = _current.set(RequestStats())
+
+
+def _after_request(response):
+    stats = _current.get()
+    if stats is None:
+        return response
+    total = time.perf_counter() - stats.start
+    response.headers["Server-Timing"] = (
+        f'total;dur={total * 1000:.2f}, '
+        f'db;dur={stats.db_time * 1000:.2f};desc="{stats.db_queries} queries, {stats.db_rows} rows", '
+        f'graph;dur={stats.graph_time * 1000:.2f}, '
+        f'json;dur={stats.json_time * 1000:.2f}'
+    )
+    rule = request.url_rule.rule if request.url_rule else "unmatched"
+    labels = (("method", request.method), ("route", rule))
+    HISTOGRAMS["total"].observe(labels, total)
+    HISTOGRAMS["db"].observe(labels, stats.db_time)
+    HISTOGRAMS["queries"].observe(labels, stats.db_queries)
+    HISTOGRAMS["rows"].observe(labels, stats.db_rows)
+    HISTOGRAMS["graph"].observe(labels, stats.graph_time)
+    HISTOGRAMS["json"].observe(labels, stats.json_time)
+    return response
+
+
+def _teardown_request(exc):
+    token = request.environ.pop("request_stats.token", None)
+    if token is not None:
+        _current.reset(token)
+
+
+def init_instrumentation(app):
+    if os.environ.get("REQUEST_METRICS", "1") == "0":
+        return
+    from neo4j_service import InMemorySkillGraph, Neo4jService
+    instrument_graph_backend(InMemorySkillGraph)
+    instrument_graph_backend(Neo4jService)
+    if not event.contains(Engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+        event.listen(Engine, "handle_error", _handle_error)
+    app.json = TimedJSONProvider(app)
+    app.before_request(_before_request)
+    app.after_request(_after_request)
+    app.teardown_request(_teardown_request)
@@ -0,0 +1,150 @@
+"""Server-Sent Events fan-out of analytics deltas.
+
+job_written() publishes one compact event per committed job write. The
+event lists each removed or added job side (its skills and the dimensions
+the charts filter on), the net skill count changes and the co-occurrence
+edge weight changes. The updated salary aggregates for the touched groups
+follow in a "salary" event, published by the salary sketch thread once it
+has rebuilt their cells, so the write request runs no salary SQL. Open
+dashboards patch their charts from these instead of refetching.
+
+Every subscriber gets its own deque capped at SSE_BUFFER_SIZE events. If a
+client falls that far behind, its oldest events are dropped and it is sent
+a "resync" event telling it to reload once. A short shared history lets a
+reconnecting EventSource resume from Last-Event-ID. Streams close after
+SSE_MAX_SECONDS (browsers reconnect on their own) and each process accepts
+at most SSE_MAX_CLIENTS streams. An open stream holds one of the worker's
+WORKER_THREADS threads for its whole life, so by default streams may take
+half of them, and never all of them: the rest keep serving other requests.
+Events are per process: a dashboard gets deltas only for writes handled by
+the worker it is connected to, and a "resync" when that worker notices
+writes made elsewhere (see routes.reset_derived_structures).
+"""
+import json
+import os
+import threading
+import time
+from collections import Counter, deque
+from itertools import combinations
+
+from sample_data import skill_category
+
+SSE_BUFFER_SIZE = int(os.environ.get("SSE_BUFFER_SIZE", 100))
+# keep in step with the threads per worker (gunicorn --threads)
+WORKER_THREADS = int(os.environ.get("WORKER_THREADS", 8))
+SSE_MAX_CLIENTS = max(0, min(int(os.environ.get("SSE_MAX_CLIENTS", WORKER_THREADS // 2)), WORKER_THREADS - 1))
+SSE_MAX_SECONDS = float(os.environ.get("SSE_MAX_SECONDS", 300))
+HEARTBEAT_SECONDS = 15
+
+
+class Subscriber:
+    __slots__ = ("events", "overflowed")
+
+    def __init__(self, buffer_size):
+        self.events = deque(maxlen=buffer_size)
+        self.overflowed = False
+
+
+class DeltaBroadcaster:
+    def __init__(self, buffer_size=SSE_BUFFER_SIZE, max_clients=SSE_MAX_CLIENTS):
+        self.buffer_size = buffer_size
+        self.max_clients = max_clients
+        self.subscribers = set()
+        self.history = deque(maxlen=buffer_size)
+        self.last_id = 0
+        self._condition = threading.Condition()
+
+    def has_subscribers(self):
+        return bool(self.subscribers)
+
+    def subscribe(self, last_event_id=None):
+        """Register a client; returns None when the process is at max_clients."""
+        with self._condition:
+            if len(self.subscribers) >= self.max_clients:
+                return None
+            subscriber = Subscriber(self.buffer_size)
+            if last_event_id is not None and last_event_id != self.last_id:
+                missed = [event for event in self.history if event[0] > last_event_id]
+                if last_event_id > self.last_id or not missed or missed[0][0] != last_event_id + 1:
+                    # ids from before a restart, or older than the history
+                    subscriber.overflowed = True
+                else:
+                    subscriber.events.extend(missed)
+            self.subscribers.add(subscriber)
+            return subscriber
+
+    def unsubscribe(self, subscriber):
+        with self._condition:
+            self.subscribers.discard(subscriber)
+
+    def publish(self, event_type, payload):
+        with self._condition:
+            self.last_id += 1
+            event = (self.last_id, event_type, json.dumps(payload, separators=(",", ":")))
+            self.history.append(event)
+            for subscriber in self.subscribers:
+                if len(subscriber.events) == subscriber.events.maxlen:
+                    subscriber.overflowed = True
+                subscriber.events.append(event)
+            self._condition.notify_all()
+
+    def stream(self, subscriber, max_seconds=SSE_MAX_SECONDS):
+        """Yield SSE frames for one subscriber until max_seconds pass."""
+        deadline = time.monotonic() + max_seconds
+        try:
+            yield "retry: 3000\n\n"
+            while time.monotonic() < deadline:
+                with self._condition:
+                    if not subscriber.events and not subscriber.overflowed:
+                        self._condition.wait(min(HEARTBEAT_SECONDS, max(deadline - time.monotonic(), 0)))
+                    overflowed, subscriber.overflowed = subscriber.overflowed, False
+                    events = list(subscriber.events)
+                    subscriber.events.clear()
+                if overflowed:
+                    # the client missed events; it reloads once instead of patching
+                    yield f"id: {self.last_id}\nevent: resync\ndata: {{}}\n\n"
+                    continue
+                if not events:
+                    yield ": keepalive\n\n"
+                for event_id, event_type, data in events:
+                    yield f"id: {event_id}\nevent: {event_type}\ndata: {data}\n\n"
+        finally:
+            self.unsubscribe(subscriber)
+
+
+def job_side(state, sign):
+    return {
+        "sign": sign,
+        "industry": state["industry"],
+        "experience": state["experience_level"],
+        "location": state["location"],
+        "category": state["job_category"],
+        "salary": state["salary_usd"],
+        "month": state["posting_date"].strftime('%Y-%m') if state.get("posting_date") else None,
+        "skills": list(state["skills"]),
+    }
+
+
+def job_delta(old_state, new_state):
+    """Chart-level changes from one job write (salary aggregates are published separately)."""
+    sides = []
+    skills = Counter()
+    edges = Counter()
+    for state, sign in ((old_state, -1), (new_state, 1)):
+        if state is None:
+            continue
+        sides.append(job_side(state, sign))
+        for skill in state["skills"]:
+            skills[skill] += sign
+        for skill1, skill2 in combinations(state["skills"], 2):
+            if skill1 != skill2:
+                edges[tuple(sorted([skill1, skill2]))] += sign
+    return {
+        "jobs": sides,
+        "skills": {skill: n for skill, n in skills.items() if n},
+        "categories": {skill: skill_category(skill) for skill, n in skills.items() if n},
+        "edges": [{"source": a, "target": b, "delta": n} for (a, b), n in edges.items() if n],
+    }
+
+
+analytics_events = DeltaBroadcaster()
@@ -1,11 +1,15 @@
-from app import app
+import logging
+import os
+
+from app import create_app
 from routes import init_app
-from dotenv import load_dotenv
 
-init_app()
+logging.basicConfig(level=os.environ.get("LOG_LEVEL", "INFO"))
 
-# Load variables from .env file
-load_dotenv()
+app = create_app()
+init_app(app)
 
 if __name__ == "__main__":
+    from warmup import enable_warmup
+    enable_warmup()
     app.run(host="0.0.0.0", port=5050, debug=True)
@@ -74,3 +74,76 @@ class Skill(db.Model):
             'name': self.name,
             'category': self.category
         }
+
+
+class SimilarJob(db.Model):
+    __tablename__ = 'similar_jobs'
+    __table_args__ = (
+        db.Index('ix_similar_jobs_job_rank', 'job_id', 'rank'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    job_id = db.Column(db.Integer, nullable=False)
+    neighbor_id = db.Column(db.Integer, nullable=False, index=True)
+    rank = db.Column(db.Integer, nullable=False)
+    score = db.Column(db.Float, nullable=False)
+
+
+class SalarySketch(db.Model):
+    __tablename__ = 'salary_sketches'
+    __table_args__ = (
+        db.UniqueConstraint('company_location', 'job_category', 'experience_level', 'industry'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    company_location = db.Column(db.String(100), nullable=False, default='')
+    job_category = db.Column(db.String(100), nullable=False, default='')
+    experience_level = db.Column(db.String(10), nullable=False, default='')
+    industry = db.Column(db.String(100), nullable=False, default='')
+    data = db.Column(db.Text, nullable=False)
+    stale = db.Column(db.Boolean, default=False)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+
+
+class DataVersion(db.Model):
+    """A counter bumped after every write to a dataset, so workers can spot writes they did not make."""
+    __tablename__ = 'data_versions'
+    
+    name = db.Column(db.String(50), primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+
+
+class ArchivedJob(db.Model):
+    """A posting moved out of jobs after its application deadline (see archive.py).
+
+    On PostgreSQL the table is range partitioned by posting_date month, and a
+    partitioned table's primary key must include the partition key, so
+    job_id is not unique here either.
+    """
+    __tablename__ = 'jobs_archive'
+    __table_args__ = {'postgresql_partition_by': 'RANGE (posting_date)'}
+    
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    posting_date = db.Column(db.Date, primary_key=True)
+    job_id = db.Column(db.String(50), nullable=False)
+    job_title = db.Column(db.String(200), nullable=False)
+    salary_usd = db.Column(db.Integer)
+    salary_currency = db.Column(db.String(10))
+    salary_local = db.Column(db.Float)
+    experience_level = db.Column(db.String(10))
+    employment_type = db.Column(db.String(10))
+    job_category = db.Column(db.String(100))
+    company_location = db.Column(db.String(100))
+    company_size = db.Column(db.String(10))
+    employee_residence = db.Column(db.String(100))
+    remote_ratio = db.Column(db.Integer)
+    required_skills = db.Column(db.Text)
+    education_required = db.Column(db.String(100))
+    years_experience = db.Column(db.Integer)
+    industry = db.Column(db.String(100))
+    application_deadline = db.Column(db.Date)
+    job_description_length = db.Column(db.Integer)
+    benefits_score = db.Column(db.Float)
+    created_at = db.Column(db.DateTime)
+    updated_at = db.Column(db.DateTime)
+    archived_at = db.Column(db.DateTime, default=datetime.utcnow)
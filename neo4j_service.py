@@ -1,10 +1,156 @@
 import os
 import logging
+import threading
+import time
+from bisect import bisect_left, insort
 from collections import defaultdict
-from neo4j import GraphDatabase
+from functools import wraps
 
 logger = logging.getLogger(__name__)
 
+# Applied by connect(); every statement is idempotent. The uniqueness
+# constraints also create the name indexes that MERGE/MATCH on {name: ...}
+# use, so node lookups stop being label scans.
+SCHEMA_CONSTRAINTS = {
+    "skill_name": "CREATE CONSTRAINT skill_name IF NOT EXISTS FOR (n:Skill) REQUIRE n.name IS UNIQUE",
+    "role_name": "CREATE CONSTRAINT role_name IF NOT EXISTS FOR (n:Role) REQUIRE n.name IS UNIQUE",
+    "industry_name": "CREATE CONSTRAINT industry_name IF NOT EXISTS FOR (n:Industry) REQUIRE n.name IS UNIQUE",
+    "location_name": "CREATE CONSTRAINT location_name IF NOT EXISTS FOR (n:Location) REQUIRE n.name IS UNIQUE",
+}
+SCHEMA_INDEXES = {
+    # get_skill_cooccurrences filters and orders on the co-occurrence count
+    "cooccurs_with_count": "CREATE INDEX cooccurs_with_count IF NOT EXISTS FOR ()-[r:COOCCURS_WITH]-() ON (r.count)",
+}
+
+GRAPH_CACHE_TTL = float(os.environ.get("GRAPH_CACHE_TTL", 30))
+
+# One round trip for /api/relationship-graph. Each label's nodes are ranked
+# by weighted degree and cut to $limit inside the database; roles,
+# industries and locations without edges rank last with count 0, skills
+# need a REQUIRES edge. The edge subqueries then only expand from the
+# selected nodes. A label missing from
+# $types yields an empty list.
+FULL_GRAPH_QUERY = """
+CALL {
+    MATCH (n:Role)
+    WHERE 'Role' IN $types
+    OPTIONAL MATCH (n)-[r:REQUIRES]->(:Skill)
+    WITH n, coalesce(sum(r.count), 0) AS total
+    ORDER BY total DESC, n.name
+    LIMIT $limit
+    RETURN collect({name: n.name, count: total}) AS roles
+}
+CALL {
+    MATCH (n:Industry)
+    WHERE 'Industry' IN $types
+    OPTIONAL MATCH (n)-[r:USES]->(:Skill)
+    WITH n, coalesce(sum(r.count), 0) AS total
+    ORDER BY total DESC, n.name
+    LIMIT $limit
+    RETURN collect({name: n.name, count: total}) AS industries
+}
+CALL {
+    MATCH (n:Location)
+    WHERE 'Location' IN $types
+    OPTIONAL MATCH (n)-[r:OFFERS]->(:Role)
+    WITH n, coalesce(sum(r.count), 0) AS total
+    ORDER BY total DESC, n.name
+    LIMIT $limit
+    RETURN collect({name: n.name, count: total}) AS locations
+}
+CALL {
+    MATCH (:Role)-[r:REQUIRES]->(n:Skill)
+    WHERE 'Skill' IN $types
+    WITH n, sum(r.count) AS total
+    WHERE total > 0
+    ORDER BY total DESC, n.name
+    LIMIT $limit
+    RETURN collect({name: n.name, count: total, category: coalesce(n.category, 'Other')}) AS skills
+}
+WITH roles, industries, locations, skills,
+     [x IN roles | x.name] AS role_names, [x IN skills | x.name] AS skill_names,
+     [x IN industries | x.name] AS industry_names, [x IN locations | x.name] AS location_names
+CALL {
+    WITH role_names, skill_names
+    MATCH (a:Role)-[r:REQUIRES]->(b:Skill)
+    WHERE a.name IN role_names AND b.name IN skill_names AND r.count >= $min_weight
+    RETURN collect([a.name, b.name, r.count]) AS requires
+}
+CALL {
+    WITH industry_names, skill_names
+    MATCH (a:Industry)-[r:USES]->(b:Skill)
+    WHERE a.name IN industry_names AND b.name IN skill_names AND r.count >= $min_weight
+    RETURN collect([a.name, b.name, r.count]) AS uses
+}
+CALL {
+    WITH location_names, role_names
+    MATCH (a:Location)-[r:OFFERS]->(b:Role)
+    WHERE a.name IN location_names AND b.name IN role_names AND r.count >= $min_weight
+    RETURN collect([a.name, b.name, r.count]) AS offers
+}
+RETURN roles, industries, locations, skills, requires, uses, offers
+"""
+
+# bulk_load() statements; labels cannot be parameters, so there is one per type
+BULK_BATCH_SIZE = 5000
+BULK_DELETE_EDGES_QUERY = """
+MATCH ()-[r:REQUIRES|USES|OFFERS|COOCCURS_WITH]->()
+CALL { WITH r DELETE r } IN TRANSACTIONS OF 10000 ROWS
+"""
+BULK_NODE_QUERIES = {
+    "Skill": "UNWIND $rows AS row MERGE (n:Skill {name: row.name}) SET n.category = row.category",
+    "Role": "UNWIND $rows AS row MERGE (:Role {name: row.name})",
+    "Industry": "UNWIND $rows AS row MERGE (:Industry {name: row.name})",
+    "Location": "UNWIND $rows AS row MERGE (:Location {name: row.name})",
+}
+BULK_EDGE_QUERIES = {
+    "REQUIRES": """
+        UNWIND $rows AS row
+        MATCH (a:Role {name: row.source}) MATCH (b:Skill {name: row.target})
+        CREATE (a)-[:REQUIRES {count: row.count}]->(b)
+    """,
+    "USES": """
+        UNWIND $rows AS row
+        MATCH (a:Industry {name: row.source}) MATCH (b:Skill {name: row.target})
+        CREATE (a)-[:USES {count: row.count}]->(b)
+    """,
+    "OFFERS": """
+        UNWIND $rows AS row
+        MATCH (a:Location {name: row.source}) MATCH (b:Role {name: row.target})
+        CREATE (a)-[:OFFERS {count: row.count}]->(b)
+    """,
+    "COOCCURS_WITH": """
+        UNWIND $rows AS row
+        MATCH (a:Skill {name: row.source}) MATCH (b:Skill {name: row.target})
+        CREATE (a)-[:COOCCURS_WITH {count: row.count, jobs: row.jobs}]->(b)
+    """,
+}
+
+
+def full_graph_response(record):
+    """Shape a FULL_GRAPH_QUERY record like InMemorySkillGraph.get_full_graph."""
+    nodes = []
+    for field, prefix, node_type in (("roles", "role", "Role"), ("industries", "industry", "Industry"),
+                                     ("locations", "location", "Location"), ("skills", "skill", "Skill")):
+        for node in record[field]:
+            entry = {"id": f"{prefix}_{node['name']}", "name": node["name"], "type": node_type}
+            if node_type == "Skill":
+                entry["category"] = node["category"]
+            entry["count"] = node["count"]
+            nodes.append(entry)
+
+    # order edges the way the in-memory graph walks them: source rank, then target rank
+    rank = {node["id"]: i for i, node in enumerate(nodes)}
+    links = []
+    for field, relationship, source_prefix, target_prefix in (("requires", "REQUIRES", "role", "skill"),
+                                                              ("uses", "USES", "industry", "skill"),
+                                                              ("offers", "OFFERS", "location", "role")):
+        edges = sorted(((f"{source_prefix}_{a}", f"{target_prefix}_{b}", count) for a, b, count in record[field]),
+                       key=lambda e: (rank[e[0]], rank[e[1]]))
+        links.extend({"source": source, "target": target, "relationship": relationship, "weight": count}
+                     for source, target, count in edges)
+    return {"nodes": nodes, "links": links}
+
 
 class Neo4jService:
     def __init__(self):
@@ -13,14 +159,18 @@ class Neo4jService:
         self.password = os.environ.get("NEO4J_PASSWORD", "")
         self.driver = None
         self._connected = False
+        self._graph_cache = {}
+        self._graph_cache_lock = threading.Lock()
         
     def connect(self):
         if self.uri and self.user and self.password:
             try:
+                from neo4j import GraphDatabase
                 self.driver = GraphDatabase.driver(self.uri, auth=(self.user, self.password))
                 self.driver.verify_connectivity()
                 self._connected = True
                 logger.info("Connected to Neo4j database")
+                self.ensure_schema()
             except Exception as e:
                 logger.warning(f"Could not connect to Neo4j: {e}")
                 self._connected = False
@@ -31,6 +181,24 @@ class Neo4jService:
     def is_connected(self):
         return self._connected
     
+    def ensure_schema(self):
+        """Create the uniqueness constraints and indexes if they are missing."""
+        with self.driver.session() as session:
+            for name, statement in {**SCHEMA_CONSTRAINTS, **SCHEMA_INDEXES}.items():
+                try:
+                    session.run(statement).consume()
+                except Exception as e:
+                    # e.g. duplicate names left by an older ingest block the constraint
+                    logger.warning(f"Could not create Neo4j schema object {name}: {e}")
+    
+    def drop_schema(self):
+        """Remove the objects ensure_schema() creates (used by the benchmark)."""
+        with self.driver.session() as session:
+            for name in SCHEMA_CONSTRAINTS:
+                session.run(f"DROP CONSTRAINT {name} IF EXISTS").consume()
+            for name in SCHEMA_INDEXES:
+                session.run(f"DROP INDEX {name} IF EXISTS").consume()
+    
     def close(self):
         if self.driver:
             self.driver.close()
@@ -164,6 +332,73 @@ class Neo4jService:
             result = session.run(query, skill1=skill1, skill2=skill2, job_id=job_id)
             return result.single()
     
+    def remove_role_skill(self, role_name, skill_name):
+        if not self._connected:
+            return None
+        with self.driver.session() as session:
+            query = """
+            MATCH (r:Role {name: $role_name})-[rel:REQUIRES]->(s:Skill {name: $skill_name})
+            SET rel.count = rel.count - 1
+            WITH rel WHERE rel.count <= 0
+            DELETE rel
+            """
+            session.run(query, role_name=role_name, skill_name=skill_name)
+    
+    def remove_industry_skill(self, industry_name, skill_name):
+        if not self._connected:
+            return None
+        with self.driver.session() as session:
+            query = """
+            MATCH (i:Industry {name: $industry_name})-[rel:USES]->(s:Skill {name: $skill_name})
+            SET rel.count = rel.count - 1
+            WITH rel WHERE rel.count <= 0
+            DELETE rel
+            """
+            session.run(query, industry_name=industry_name, skill_name=skill_name)
+    
+    def remove_location_role(self, location_name, role_name):
+        if not self._connected:
+            return None
+        with self.driver.session() as session:
+            query = """
+            MATCH (l:Location {name: $location_name})-[rel:OFFERS]->(r:Role {name: $role_name})
+            SET rel.count = rel.count - 1
+            WITH rel WHERE rel.count <= 0
+            DELETE rel
+            """
+            session.run(query, location_name=location_name, role_name=role_name)
+    
+    def remove_cooccurrence(self, skill1, skill2, job_id):
+        if not self._connected:
+            return None
+        with self.driver.session() as session:
+            query = """
+            MATCH (s1:Skill {name: $skill1})-[r:COOCCURS_WITH]-(s2:Skill {name: $skill2})
+            SET r.count = r.count - 1, r.jobs = [j IN r.jobs WHERE j <> $job_id]
+            WITH r WHERE r.count <= 0
+            DELETE r
+            """
+            session.run(query, skill1=skill1, skill2=skill2, job_id=job_id)
+    
+    def snapshot(self):
+        if not self._connected:
+            return {}
+        with self.driver.session() as session:
+            query = """
+            MATCH (a)-[r]->(b)
+            WHERE type(r) IN ['REQUIRES', 'USES', 'OFFERS', 'COOCCURS_WITH']
+            RETURN type(r) as relationship, a.name as source, b.name as target, r.count as count
+            """
+            result = session.run(query)
+            edges = {}
+            for record in result:
+                source, target = record["source"], record["target"]
+                if record["relationship"] == "COOCCURS_WITH":
+                    source, target = sorted([source, target])
+                key = (record["relationship"], source, target)
+                edges[key] = edges.get(key, 0) + record["count"]
+            return edges
+    
     def get_skill_cooccurrences(self, min_count=1):
         if not self._connected:
             return []
@@ -205,47 +440,138 @@ class Neo4jService:
             return [{"name": record["name"], "weight": record["weight"]} for record in result]
     
     def get_full_graph(self, node_types=None, min_weight=1, limit_per_type=20):
+        """Top limit_per_type nodes per label by weighted degree, with the edges between them.
+
+        Matches InMemorySkillGraph.get_full_graph: a node's count is the sum
+        of its REQUIRES (roles, skills), USES (industries) or OFFERS
+        (locations) weights, ties go by name, and only REQUIRES, USES and
+        OFFERS edges with both ends selected are returned. Results are cached
+        for GRAPH_CACHE_TTL seconds per parameter combination.
+        """
         if not self._connected:
             return {"nodes": [], "links": []}
         if node_types is None:
             node_types = ["Skill", "Role", "Industry", "Location"]
+        key = (tuple(sorted(set(node_types))), min_weight, limit_per_type)
+        now = time.monotonic()
+        with self._graph_cache_lock:
+            cached = self._graph_cache.get(key)
+            if cached and cached[0] > now:
+                return cached[1]
         with self.driver.session() as session:
-            type_filter = " OR ".join([f"n:{t}" for t in node_types])
-            nodes_query = f"""
-            MATCH (n)
-            WHERE {type_filter}
-            RETURN labels(n)[0] as type, n.name as name, n.category as category
-            LIMIT {limit_per_type * len(node_types)}
-            """
-            nodes_result = session.run(nodes_query)
-            nodes = [{"id": record["name"], "name": record["name"], 
-                     "type": record["type"], "category": record.get("category")} 
-                    for record in nodes_result]
-            
-            links_query = f"""
-            MATCH (a)-[r]->(b)
-            WHERE ({type_filter.replace('n:', 'a:')})
-            AND ({type_filter.replace('n:', 'b:')})
-            AND COALESCE(r.count, 1) >= {min_weight}
-            RETURN a.name as source, b.name as target, type(r) as relationship, 
-                   COALESCE(r.count, 1) as weight
-            """
-            links_result = session.run(links_query)
-            links = [{"source": record["source"], "target": record["target"],
-                     "relationship": record["relationship"], "weight": record["weight"]}
-                    for record in links_result]
-            
-            return {"nodes": nodes, "links": links}
+            record = session.run(FULL_GRAPH_QUERY, types=list(key[0]), limit=limit_per_type,
+                                 min_weight=min_weight).single()
+            data = full_graph_response(record)
+        with self._graph_cache_lock:
+            self._graph_cache = {k: v for k, v in self._graph_cache.items() if v[0] > now}
+            self._graph_cache[key] = (now + GRAPH_CACHE_TTL, data)
+        return data
+    
+    def bulk_load(self, nodes, edges, cooccurrence_jobs, batch_size=BULK_BATCH_SIZE):
+        """Replace every edge with precomputed totals (see graph_rebuild); nodes are merged."""
+        if not self._connected:
+            return
+        rows = {relationship: [] for relationship in BULK_EDGE_QUERIES}
+        for (relationship, source, target), count in edges.items():
+            if count > 0:
+                row = {"source": source, "target": target, "count": count}
+                if relationship == "COOCCURS_WITH":
+                    row["jobs"] = cooccurrence_jobs.get((source, target), [])
+                rows[relationship].append(row)
+        with self.driver.session() as session:
+            session.run(BULK_DELETE_EDGES_QUERY).consume()
+            for label, query in BULK_NODE_QUERIES.items():
+                names = [{"name": name, "category": category} for name, category in nodes[label].items()]
+                for i in range(0, len(names), batch_size):
+                    session.run(query, rows=names[i:i + batch_size]).consume()
+            for relationship, query in BULK_EDGE_QUERIES.items():
+                batch = rows[relationship]
+                for i in range(0, len(batch), batch_size):
+                    session.run(query, rows=batch[i:i + batch_size]).consume()
+        with self._graph_cache_lock:
+            self._graph_cache = {}
     
     def clear_all(self):
         if not self._connected:
             return
         with self.driver.session() as session:
             session.run("MATCH (n) DETACH DELETE n")
+        with self._graph_cache_lock:
+            self._graph_cache = {}
+
+
+class RankedCounter:
+    """Counts kept bucketed by value so the top k can be read without sorting.
+
+    Keys with the same count sit in one bucket, a list kept sorted by key;
+    the distinct counts are kept in a sorted list. Increments and decrements
+    cost O(log distinct counts) plus a list insert, and top(k) reads at most
+    k keys from the highest buckets. With keep_zero, keys whose count is zero
+    (see track()) stay in a bottom bucket instead of being dropped.
+    """
+    def __init__(self, keep_zero=False):
+        self.keep_zero = keep_zero
+        self.counts = {}
+        self._buckets = {}
+        self._levels = []
+    
+    def _move(self, key, old, new):
+        if key in self.counts:
+            bucket = self._buckets[old]
+            del bucket[bisect_left(bucket, key)]
+            if not bucket:
+                del self._buckets[old]
+                del self._levels[bisect_left(self._levels, old)]
+        if new > 0 or (new == 0 and self.keep_zero):
+            if new not in self._buckets:
+                self._buckets[new] = []
+                insort(self._levels, new)
+            insort(self._buckets[new], key)
+            self.counts[key] = new
+        else:
+            self.counts.pop(key, None)
+    
+    def add(self, key, amount=1):
+        old = self.counts.get(key, 0)
+        self._move(key, old, old + amount)
+    
+    def track(self, key):
+        """Include key in top() even while its count is zero (keep_zero counters)."""
+        if key not in self.counts:
+            self._move(key, 0, 0)
+    
+    def get(self, key, default=0):
+        return self.counts.get(key, default)
+    
+    def top(self, k):
+        """Up to k (key, count) pairs by descending count, ties by key."""
+        result = []
+        for level in reversed(self._levels):
+            if len(result) >= k:
+                break
+            result.extend((key, level) for key in self._buckets[level][:k - len(result)])
+        return result
+
+
+def locked(method):
+    """Run an InMemorySkillGraph method under the graph's lock."""
+    @wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self.lock:
+            return method(self, *args, **kwargs)
+    return wrapper
 
 
 class InMemorySkillGraph:
+    """Skill graph kept in process when Neo4j is not connected.
+
+    Request threads apply job deltas while background threads reload it or
+    snapshot it for PageRank and the layout, so every public method holds
+    `lock` (reentrant, since bulk_load calls the add methods).
+    """
+
     def __init__(self):
+        self.lock = threading.RLock()
         self.skills = {}
         self.roles = {}
         self.industries = {}
@@ -255,45 +581,182 @@ class InMemorySkillGraph:
         self.industry_skills = defaultdict(lambda: defaultdict(int))
         self.location_roles = defaultdict(lambda: defaultdict(int))
         self.skill_jobs = defaultdict(lambda: defaultdict(list))
-    
+        # nodes without edges still rank (last), as roles, industries and locations always have
+        self.role_totals = RankedCounter(keep_zero=True)
+        self.industry_totals = RankedCounter(keep_zero=True)
+        self.location_totals = RankedCounter(keep_zero=True)
+        self.skill_totals = RankedCounter()
+        self.degrees = defaultdict(int)
+    
+    @locked
     def add_skill(self, skill_name, category=None):
         if skill_name not in self.skills:
-            self.skills[skill_name] = {"name": skill_name, "category": category, "connections": 0, "type": "Skill"}
+            self.skills[skill_name] = {"name": skill_name, "category": category,
+                                       "connections": self.degrees.get(skill_name, 0), "type": "Skill"}
     
+    @locked
     def add_role(self, role_name):
         if role_name not in self.roles:
             self.roles[role_name] = {"name": role_name, "type": "Role"}
+            self.role_totals.track(role_name)
     
+    @locked
     def add_industry(self, industry_name):
         if industry_name not in self.industries:
             self.industries[industry_name] = {"name": industry_name, "type": "Industry"}
+            self.industry_totals.track(industry_name)
     
+    @locked
     def add_location(self, location_name):
         if location_name not in self.locations:
             self.locations[location_name] = {"name": location_name, "type": "Location"}
+            self.location_totals.track(location_name)
     
+    @locked
     def add_role_skill(self, role_name, skill_name):
         self.role_skills[role_name][skill_name] += 1
+        self.role_totals.add(role_name)
+        self.skill_totals.add(skill_name)
     
+    @locked
     def add_industry_skill(self, industry_name, skill_name):
         self.industry_skills[industry_name][skill_name] += 1
+        self.industry_totals.add(industry_name)
     
+    @locked
     def add_location_role(self, location_name, role_name):
         self.location_roles[location_name][role_name] += 1
+        self.location_totals.add(location_name)
     
+    @locked
     def add_cooccurrence(self, skill1, skill2, job_id):
         if skill1 != skill2:
             key = tuple(sorted([skill1, skill2]))
+            new_edge = key[1] not in self.cooccurrences.get(key[0], {})
             self.cooccurrences[key[0]][key[1]] += 1
             self.skill_jobs[key[0]][key[1]].append(job_id)
-            self.skills[skill1]["connections"] = len(self.cooccurrences.get(skill1, {})) + \
-                sum(1 for s in self.cooccurrences if skill1 in self.cooccurrences[s])
-            self.skills[skill2]["connections"] = len(self.cooccurrences.get(skill2, {})) + \
-                sum(1 for s in self.cooccurrences if skill2 in self.cooccurrences[s])
-    
+            if new_edge:
+                self._adjust_connections(key, 1)
+    
+    def _adjust_connections(self, key, delta):
+        # connections is the co-occurrence degree, kept as edges appear and disappear
+        for skill_name in key:
+            self.degrees[skill_name] += delta
+            if self.degrees[skill_name] <= 0:
+                del self.degrees[skill_name]
+            if skill_name in self.skills:
+                self.skills[skill_name]["connections"] = self.degrees.get(skill_name, 0)
+    
+    def _decrement(self, counters, outer, inner):
+        targets = counters.get(outer)
+        if not targets or inner not in targets:
+            return False
+        targets[inner] -= 1
+        if targets[inner] <= 0:
+            del targets[inner]
+        if not targets:
+            del counters[outer]
+        return True
+    
+    @locked
+    def remove_role_skill(self, role_name, skill_name):
+        if self._decrement(self.role_skills, role_name, skill_name):
+            self.role_totals.add(role_name, -1)
+            self.skill_totals.add(skill_name, -1)
+    
+    @locked
+    def remove_industry_skill(self, industry_name, skill_name):
+        if self._decrement(self.industry_skills, industry_name, skill_name):
+            self.industry_totals.add(industry_name, -1)
+    
+    @locked
+    def remove_location_role(self, location_name, role_name):
+        if self._decrement(self.location_roles, location_name, role_name):
+            self.location_totals.add(location_name, -1)
+    
+    @locked
+    def remove_cooccurrence(self, skill1, skill2, job_id):
+        if skill1 != skill2:
+            key = tuple(sorted([skill1, skill2]))
+            jobs = self.skill_jobs.get(key[0], {}).get(key[1])
+            if jobs and job_id in jobs:
+                jobs.remove(job_id)
+            if jobs is not None and not jobs:
+                del self.skill_jobs[key[0]][key[1]]
+                if not self.skill_jobs[key[0]]:
+                    del self.skill_jobs[key[0]]
+            if self._decrement(self.cooccurrences, key[0], key[1]) \
+                    and key[1] not in self.cooccurrences.get(key[0], {}):
+                self._adjust_connections(key, -1)
+    
+    @locked
+    def bulk_load(self, nodes, edges, cooccurrence_jobs):
+        """Replace every edge with precomputed totals (see graph_rebuild); nodes are merged."""
+        for skill_name, category in nodes["Skill"].items():
+            self.add_skill(skill_name, category)
+        for add, label in ((self.add_role, "Role"), (self.add_industry, "Industry"), (self.add_location, "Location")):
+            for name in nodes[label]:
+                add(name)
+        
+        self.cooccurrences = defaultdict(lambda: defaultdict(int))
+        self.role_skills = defaultdict(lambda: defaultdict(int))
+        self.industry_skills = defaultdict(lambda: defaultdict(int))
+        self.location_roles = defaultdict(lambda: defaultdict(int))
+        self.skill_jobs = defaultdict(lambda: defaultdict(list))
+        self.degrees = defaultdict(int)
+        counters = {"REQUIRES": self.role_skills, "USES": self.industry_skills,
+                    "OFFERS": self.location_roles, "COOCCURS_WITH": self.cooccurrences}
+        totals = {name: defaultdict(int) for name in ("role", "skill", "industry", "location")}
+        for (relationship, source, target), count in edges.items():
+            if count <= 0:
+                continue
+            counters[relationship][source][target] = count
+            if relationship == "REQUIRES":
+                totals["role"][source] += count
+                totals["skill"][target] += count
+            elif relationship == "USES":
+                totals["industry"][source] += count
+            elif relationship == "OFFERS":
+                totals["location"][source] += count
+            else:
+                self.skill_jobs[source][target] = list(cooccurrence_jobs.get((source, target), []))
+                self.degrees[source] += 1
+                self.degrees[target] += 1
+        
+        self.role_totals = RankedCounter(keep_zero=True)
+        self.skill_totals = RankedCounter()
+        self.industry_totals = RankedCounter(keep_zero=True)
+        self.location_totals = RankedCounter(keep_zero=True)
+        for counter, by_name in ((self.role_totals, totals["role"]), (self.skill_totals, totals["skill"]),
+                                 (self.industry_totals, totals["industry"]),
+                                 (self.location_totals, totals["location"])):
+            for name, total in by_name.items():
+                counter.add(name, total)
+        for counter, names in ((self.role_totals, self.roles), (self.industry_totals, self.industries),
+                               (self.location_totals, self.locations)):
+            for name in names:
+                counter.track(name)
+        for skill_name, info in self.skills.items():
+            info["connections"] = self.degrees.get(skill_name, 0)
+    
+    @locked
+    def snapshot(self):
+        edges = {}
+        for relationship, counters in (("REQUIRES", self.role_skills),
+                                       ("USES", self.industry_skills),
+                                       ("OFFERS", self.location_roles),
+                                       ("COOCCURS_WITH", self.cooccurrences)):
+            for source, targets in counters.items():
+                for target, count in targets.items():
+                    if count > 0:
+                        edges[(relationship, source, target)] = count
+        return edges
+    
+    @locked
     def get_skill_nodes(self):
         return list(self.skills.values())
     
+    @locked
     def get_skill_cooccurrences(self, min_count=1):
         edges = []
         for skill1, targets in self.cooccurrences.items():
@@ -302,6 +765,7 @@ class InMemorySkillGraph:
                     edges.append({"source": skill1, "target": skill2, "weight": count})
         return sorted(edges, key=lambda x: x["weight"], reverse=True)
     
+    @locked
     def get_related_skills(self, skill_name, limit=10):
         related = []
         for skill1, targets in self.cooccurrences.items():
@@ -312,96 +776,78 @@ class InMemorySkillGraph:
                 related.append({"name": skill1, "weight": targets[skill_name]})
         return sorted(related, key=lambda x: x["weight"], reverse=True)[:limit]
     
+    @locked
     def get_full_graph(self, node_types=None, min_weight=1, limit_per_type=20):
         if node_types is None:
             node_types = ["Skill", "Role", "Industry", "Location"]
         
         nodes = []
         links = []
-        node_ids = set()
-        
-        if "Role" in node_types:
-            top_roles = sorted(self.roles.keys(), 
-                             key=lambda r: sum(self.role_skills[r].values()), 
-                             reverse=True)[:limit_per_type]
-            for role in top_roles:
-                nodes.append({"id": f"role_{role}", "name": role, "type": "Role", 
-                            "count": sum(self.role_skills[role].values())})
-                node_ids.add(f"role_{role}")
+        top_roles = self.role_totals.top(limit_per_type) if "Role" in node_types else []
+        top_industries = self.industry_totals.top(limit_per_type) if "Industry" in node_types else []
+        top_locations = self.location_totals.top(limit_per_type) if "Location" in node_types else []
+        top_skills = self.skill_totals.top(limit_per_type) if "Skill" in node_types else []
         
-        if "Industry" in node_types:
-            top_industries = sorted(self.industries.keys(),
-                                  key=lambda i: sum(self.industry_skills[i].values()),
-                                  reverse=True)[:limit_per_type]
-            for industry in top_industries:
-                nodes.append({"id": f"industry_{industry}", "name": industry, "type": "Industry",
-                            "count": sum(self.industry_skills[industry].values())})
-                node_ids.add(f"industry_{industry}")
+        for role, count in top_roles:
+            nodes.append({"id": f"role_{role}", "name": role, "type": "Role", "count": count})
+        for industry, count in top_industries:
+            nodes.append({"id": f"industry_{industry}", "name": industry, "type": "Industry", "count": count})
+        for location, count in top_locations:
+            nodes.append({"id": f"location_{location}", "name": location, "type": "Location", "count": count})
+        for skill, count in top_skills:
+            skill_info = self.skills.get(skill, {"category": "Other"})
+            nodes.append({"id": f"skill_{skill}", "name": skill, "type": "Skill",
+                        "category": skill_info.get("category", "Other"),
+                        "count": count})
         
-        if "Location" in node_types:
-            top_locations = sorted(self.locations.keys(),
-                                 key=lambda l: sum(self.location_roles[l].values()),
-                                 reverse=True)[:limit_per_type]
-            for location in top_locations:
-                nodes.append({"id": f"location_{location}", "name": location, "type": "Location",
-                            "count": sum(self.location_roles[location].values())})
-                node_ids.add(f"location_{location}")
+        selected_skills = [skill for skill, _ in top_skills]
+        selected_roles = [role for role, _ in top_roles]
         
-        if "Skill" in node_types:
-            skill_counts = {}
-            for role, skills in self.role_skills.items():
-                for skill, count in skills.items():
-                    skill_counts[skill] = skill_counts.get(skill, 0) + count
-            top_skills = sorted(skill_counts.keys(), 
-                              key=lambda s: skill_counts[s], 
-                              reverse=True)[:limit_per_type]
-            for skill in top_skills:
-                skill_info = self.skills.get(skill, {"category": "Other"})
-                nodes.append({"id": f"skill_{skill}", "name": skill, "type": "Skill",
-                            "category": skill_info.get("category", "Other"),
-                            "count": skill_counts[skill]})
-                node_ids.add(f"skill_{skill}")
+        for role, _ in top_roles:
+            targets = self.role_skills.get(role, {})
+            for skill in selected_skills:
+                count = targets.get(skill, 0)
+                if count and count >= min_weight:
+                    links.append({
+                        "source": f"role_{role}",
+                        "target": f"skill_{skill}",
+                        "relationship": "REQUIRES",
+                        "weight": count
+                    })
         
-        if "Role" in node_types and "Skill" in node_types:
-            for role in top_roles if "Role" in node_types else []:
-                for skill, count in self.role_skills[role].items():
-                    if f"skill_{skill}" in node_ids and count >= min_weight:
-                        links.append({
-                            "source": f"role_{role}",
-                            "target": f"skill_{skill}",
-                            "relationship": "REQUIRES",
-                            "weight": count
-                        })
+        for industry, _ in top_industries:
+            targets = self.industry_skills.get(industry, {})
+            for skill in selected_skills:
+                count = targets.get(skill, 0)
+                if count and count >= min_weight:
+                    links.append({
+                        "source": f"industry_{industry}",
+                        "target": f"skill_{skill}",
+                        "relationship": "USES",
+                        "weight": count
+                    })
         
-        if "Industry" in node_types and "Skill" in node_types:
-            for industry in top_industries if "Industry" in node_types else []:
-                for skill, count in self.industry_skills[industry].items():
-                    if f"skill_{skill}" in node_ids and count >= min_weight:
-                        links.append({
-                            "source": f"industry_{industry}",
-                            "target": f"skill_{skill}",
-                            "relationship": "USES",
-                            "weight": count
-                        })
-        
-        if "Location" in node_types and "Role" in node_types:
-            for location in top_locations if "Location" in node_types else []:
-                for role, count in self.location_roles[location].items():
-                    if f"role_{role}" in node_ids and count >= min_weight:
-                        links.append({
-                            "source": f"location_{location}",
-                            "target": f"role_{role}",
-                            "relationship": "OFFERS",
-                            "weight": count
-                        })
+        for location, _ in top_locations:
+            targets = self.location_roles.get(location, {})
+            for role in selected_roles:
+                count = targets.get(role, 0)
+                if count and count >= min_weight:
+                    links.append({
+                        "source": f"location_{location}",
+                        "target": f"role_{role}",
+                        "relationship": "OFFERS",
+                        "weight": count
+                    })
         
         return {"nodes": nodes, "links": links}
     
+    @locked
     def get_skills_for_role(self, role_name, limit=10):
         skills = self.role_skills.get(role_name, {})
         sorted_skills = sorted(skills.items(), key=lambda x: x[1], reverse=True)[:limit]
         return [{"name": s, "count": c} for s, c in sorted_skills]
     
+    @locked
     def get_roles_for_skill(self, skill_name, limit=10):
         roles = []
         for role, skills in self.role_skills.items():
@@ -409,6 +855,7 @@ class InMemorySkillGraph:
                 roles.append({"name": role, "count": skills[skill_name]})
         return sorted(roles, key=lambda x: x["count"], reverse=True)[:limit]
     
+    @locked
     def clear_all(self):
         self.skills = {}
         self.roles = {}
@@ -419,6 +866,11 @@ class InMemorySkillGraph:
         self.industry_skills = defaultdict(lambda: defaultdict(int))
         self.location_roles = defaultdict(lambda: defaultdict(int))
         self.skill_jobs = defaultdict(lambda: defaultdict(list))
+        self.role_totals = RankedCounter(keep_zero=True)
+        self.industry_totals = RankedCounter(keep_zero=True)
+        self.location_totals = RankedCounter(keep_zero=True)
+        self.skill_totals = RankedCounter()
+        self.degrees = defaultdict(int)
 
 
 neo4j_service = Neo4jService()
@@ -431,6 +883,14 @@ def get_skill_graph():
     return in_memory_graph
 
 
-def init_skill_graph():
-    neo4j_service.connect()
+def init_skill_graph(block=True):
+    """Connect to Neo4j if configured.
+
+    With block=False the connection attempt runs in a background thread and
+    the in-memory graph serves requests until Neo4j is reachable.
+    """
+    if block:
+        neo4j_service.connect()
+    else:
+        threading.Thread(target=neo4j_service.connect, name="neo4j-connect", daemon=True).start()
     return get_skill_graph()
@@ -0,0 +1,160 @@
+"""Multi-hop skill suggestions with personalized PageRank.
+
+The walk runs over the skill co-occurrence edges and the Role->Skill
+REQUIRES edges (both treated as undirected, weighted by count), so a walk
+from Python can reach Kafka through Spark or through a role that requires
+both. One PPR vector is precomputed per seed skill by a batched power
+iteration; since PPR is linear in the personalization vector, a multi-skill
+query is a weighted sum of cached columns and no walk runs at request time.
+"""
+import logging
+import threading
+
+from sample_data import skill_category
+
+logger = logging.getLogger(__name__)
+
+DAMPING = 0.85
+TOLERANCE = 1e-8
+MAX_ITERATIONS = 100
+
+
+def personalized_pagerank(adjacency, seeds, damping=DAMPING, tol=TOLERANCE, max_iter=MAX_ITERATIONS):
+    """Power iteration for many seeds at once.
+
+    adjacency is a symmetric n x n weight matrix and seeds a list of node
+    indices; returns an n x len(seeds) matrix whose columns are PPR vectors.
+    Mass on dangling nodes teleports back to the seed.
+    """
+    import numpy as np
+    from scipy import sparse
+    n = adjacency.shape[0]
+    out_weight = np.asarray(adjacency.sum(axis=1)).ravel()
+    dangling = out_weight == 0
+    inv = np.divide(1.0, out_weight, out=np.zeros(n), where=~dangling)
+    transition_t = (sparse.diags(inv) @ adjacency).T.tocsr()
+
+    teleport = np.zeros((n, len(seeds)))
+    teleport[seeds, np.arange(len(seeds))] = 1.0
+    scores = teleport.copy()
+    for iteration in range(max_iter):
+        dangling_mass = scores[dangling].sum(axis=0)
+        updated = damping * (transition_t @ scores + teleport * dangling_mass) + (1 - damping) * teleport
+        delta = np.abs(updated - scores).sum(axis=0).max()
+        scores = updated
+        if delta < tol:
+            break
+    logger.debug(f"PPR converged after {iteration + 1} iterations for {len(seeds)} seeds")
+    return scores
+
+
+class SkillPageRank:
+    def __init__(self, damping=DAMPING):
+        self.damping = damping
+        self._state = None
+        self._dirty = True
+        self._lock = threading.Lock()
+        self._rebuild_thread = None
+
+    def build(self, edges):
+        """Build from a graph snapshot: {(relationship, source, target): count}."""
+        import numpy as np
+        from scipy import sparse
+        nodes = {}
+        rows, cols, weights = [], [], []
+        for (relationship, source, target), count in edges.items():
+            if relationship == "COOCCURS_WITH":
+                a, b = ("skill", source), ("skill", target)
+            elif relationship == "REQUIRES":
+                a, b = ("role", source), ("skill", target)
+            else:
+                continue
+            i = nodes.setdefault(a, len(nodes))
+            j = nodes.setdefault(b, len(nodes))
+            rows += [i, j]
+            cols += [j, i]
+            weights += [count, count]
+
+        n = len(nodes)
+        adjacency = sparse.csr_matrix((weights, (rows, cols)), shape=(n, n), dtype=float)
+        skill_nodes = [(name, i) for (kind, name), i in nodes.items() if kind == "skill"]
+        skill_names = [name for name, _ in skill_nodes]
+        skill_rows = np.array([i for _, i in skill_nodes], dtype=int)
+        vectors = personalized_pagerank(adjacency, skill_rows, self.damping) if n else np.zeros((0, 0))
+
+        neighbors = {}
+        cooccur = adjacency[skill_rows][:, skill_rows] if n else adjacency
+        for col, name in enumerate(skill_names):
+            neighbors[name] = set(np.array(skill_names)[cooccur[col].indices].tolist())
+
+        self._state = {
+            "skills": skill_names,
+            "column": {name: col for col, name in enumerate(skill_names)},
+            # keep only the rows for skill nodes; role nodes are walk intermediates
+            "vectors": vectors[skill_rows] if n else vectors,
+            "neighbors": neighbors,
+        }
+
+    def invalidate(self, load_edges=None):
+        """Mark cached vectors stale and, if a loader is given, rebuild in the background."""
+        self._dirty = True
+        if load_edges is None:
+            return
+        with self._lock:
+            if self._rebuild_thread and self._rebuild_thread.is_alive():
+                return
+            self._rebuild_thread = threading.Thread(target=self._rebuild, args=(load_edges,), daemon=True)
+            self._rebuild_thread.start()
+
+    def _rebuild(self, load_edges):
+        while self._dirty:
+            self._dirty = False
+            try:
+                self.build(load_edges())
+            except Exception as e:
+                # stay dirty so the next ensure_built() retries
+                self._dirty = True
+                logger.error(f"Error rebuilding skill PageRank: {e}")
+                return
+
+    def ensure_built(self, load_edges):
+        """Build if nothing is built, or if stale and no background rebuild is running (e.g. one failed)."""
+        if self._state is not None and not self._dirty:
+            return
+        with self._lock:
+            rebuilding = self._rebuild_thread is not None and self._rebuild_thread.is_alive()
+            if self._state is None or (self._dirty and not rebuilding):
+                self._dirty = False
+                try:
+                    self.build(load_edges())
+                except Exception:
+                    self._dirty = True
+                    raise
+
+    def recommend(self, skills, limit=10, weights=None):
+        state = self._state
+        if state is None:
+            return []
+        seeds = [(s, (weights or {}).get(s, 1.0)) for s in skills if s in state["column"]]
+        if not seeds:
+            return []
+        import numpy as np
+        total = sum(w for _, w in seeds)
+        combined = np.zeros(len(state["skills"]))
+        for skill, weight in seeds:
+            combined += (weight / total) * state["vectors"][:, state["column"][skill]]
+
+        seed_names = {s for s, _ in seeds}
+        direct = set().union(*(state["neighbors"].get(s, set()) for s in seed_names))
+        for skill in seed_names:
+            combined[state["column"][skill]] = -1
+        top = np.argsort(-combined)[:limit]
+        return [{
+            "skill": state["skills"][i],
+            "score": round(float(combined[i]), 5),
+            "direct": state["skills"][i] in direct,
+            "category": skill_category(state["skills"][i]),
+        } for i in top if combined[i] > 0]
+
+
+skill_pagerank = SkillPageRank()
@@ -0,0 +1,56 @@
+"""Read-only projection rows for analytics scans.
+
+Analytics views only read two or three columns of every job. Loading
+Job.query.all() for them builds a full ORM instance per row: all 25
+columns, an identity-map entry and attribute change tracking. project()
+selects only the requested columns, streams them in batches with
+yield_per, and wraps each row in a small __slots__ object. row.skills is
+the parsed required_skills tuple, split once per row and then cached.
+Rows are not attached to the session and cannot be written back.
+"""
+from functools import lru_cache
+
+from sqlalchemy import select
+
+from app import db
+
+PROJECTION_BATCH_SIZE = 1000
+
+
+class ProjectionRow:
+    __slots__ = ("_skills",)
+    fields = ()
+
+    def __init__(self, values):
+        for name, value in zip(self.fields, values):
+            setattr(self, name, value)
+        self._skills = None
+
+    @property
+    def skills(self):
+        """required_skills split like Job.get_skills_list(), as a cached tuple."""
+        if self._skills is None:
+            raw = self.required_skills
+            self._skills = tuple(s.strip() for s in raw.split(',')) if raw else ()
+        return self._skills
+
+    def get_skills_list(self):
+        return list(self.skills)
+
+    def __repr__(self):
+        values = ", ".join(f"{name}={getattr(self, name)!r}" for name in self.fields)
+        return f"{type(self).__name__}({values})"
+
+
+@lru_cache(maxsize=None)
+def row_class(fields):
+    """A ProjectionRow subclass with one slot per field name."""
+    return type("JobRow", (ProjectionRow,), {"__slots__": fields, "fields": fields})
+
+
+def project(*columns, where=(), order_by=(), batch_size=PROJECTION_BATCH_SIZE):
+    """Yield ProjectionRows holding only `columns` (Job attributes), fetched in batches."""
+    cls = row_class(tuple(column.key for column in columns))
+    statement = select(*columns).where(*where).order_by(*order_by)
+    for row in db.session.execute(statement).yield_per(batch_size):
+        yield cls(row)
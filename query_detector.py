@@ -0,0 +1,177 @@
+"""N+1 and slow-query detection with per-route query budgets.
+
+Enabled with QUERY_DETECTOR=warn (log and report) or QUERY_DETECTOR=strict
+(also fail the request, for CI). Every SQL statement is fingerprinted by
+stripping literals and collapsing IN lists; a request is flagged when one
+fingerprint repeats N_PLUS_ONE_THRESHOLD times or more, when a statement
+exceeds SLOW_QUERY_MS, or when it runs more statements than the budget
+declared on its view with @query_budget. Violations are logged and appended
+as JSON lines to QUERY_REPORT_PATH, once per request. Views with a budget
+are checked by the @query_budget wrapper as soon as they return, so strict
+mode fails a read (GET, HEAD, OPTIONS) with QueryBudgetExceeded before a
+response is built. A write has committed by then, so its violations are
+only reported, as are those of views without a budget, checked after the
+request.
+"""
+import json
+import logging
+import os
+import re
+import threading
+import time
+from collections import Counter, defaultdict
+from contextvars import ContextVar
+from functools import wraps
+
+from flask import current_app, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+N_PLUS_ONE_THRESHOLD = int(os.environ.get("N_PLUS_ONE_THRESHOLD", 3))
+SLOW_QUERY_MS = float(os.environ.get("SLOW_QUERY_MS", 100))
+QUERY_REPORT_PATH = os.environ.get("QUERY_REPORT_PATH", "query_report.jsonl")
+
+_STRING_LITERALS = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERALS = re.compile(r"\b\d+(?:\.\d+)?\b")
+_IN_LISTS = re.compile(r"\bIN\s*\(\s*(?:[^()]+?)\s*\)", re.IGNORECASE)
+
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+
+_current = ContextVar("query_log", default=None)
+_report_lock = threading.Lock()
+
+
+class QueryBudgetExceeded(RuntimeError):
+    pass
+
+
+def query_budget(max_queries):
+    """Declare the most SQL statements a view may run per request."""
+    def decorator(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            result = fn(*args, **kwargs)
+            # failing a write after its commit would report an error for a change that happened
+            strict = current_app.config.get("QUERY_DETECTOR") == "strict" and request.method in SAFE_METHODS
+            check_request(max_queries, strict=strict)
+            return result
+        wrapper.query_budget = max_queries
+        return wrapper
+    return decorator
+
+
+def fingerprint(statement):
+    normalized = _STRING_LITERALS.sub("?", statement)
+    normalized = _NUMBER_LITERALS.sub("?", normalized)
+    normalized = _IN_LISTS.sub("IN (...)", normalized)
+    return " ".join(normalized.split())
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _current.get() is not None:
+        conn.info.setdefault("detector_start", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    queries = _current.get()
+    if queries is None or not conn.info.get("detector_start"):
+        return
+    duration = time.perf_counter() - conn.info["detector_start"].pop()
+    queries.append((fingerprint(statement), repr(parameters), duration))
+
+
+def _handle_error(exception_context):
+    starts = exception_context.connection.info.get("detector_start") if exception_context.connection else None
+    if starts:
+        starts.pop()
+
+
+def analyze(queries, budget=None):
+    violations = []
+    counts = Counter(fp for fp, _, _ in queries)
+    params = defaultdict(set)
+    for fp, parameters, _ in queries:
+        params[fp].add(parameters)
+    for fp, count in counts.items():
+        if count >= N_PLUS_ONE_THRESHOLD:
+            violations.append({
+                "type": "n_plus_one",
+                "fingerprint": fp,
+                "count": count,
+                "distinct_parameters": len(params[fp]),
+            })
+    for fp, _, duration in queries:
+        if duration * 1000 > SLOW_QUERY_MS:
+            violations.append({
+                "type": "slow_query",
+                "fingerprint": fp,
+                "duration_ms": round(duration * 1000, 2),
+            })
+    if budget is not None and len(queries) > budget:
+        violations.append({
+            "type": "budget",
+            "query_count": len(queries),
+            "budget": budget,
+        })
+    return violations
+
+
+def write_report(entry):
+    with _report_lock:
+        with open(QUERY_REPORT_PATH, "a") as f:
+            f.write(json.dumps(entry) + "\n")
+
+
+def _before_request():
+    request.environ["query_detector.token"] = _current.set([])
+
+
+def check_request(budget=None, strict=False):
+    """Analyze the request's statements so far and report violations; runs once per request."""
+    queries = _current.get()
+    if queries is None or request.environ.get("query_detector.checked"):
+        return
+    request.environ["query_detector.checked"] = True
+    violations = analyze(queries, budget)
+    if violations:
+        entry = {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "method": request.method,
+            "route": request.url_rule.rule if request.url_rule else "unmatched",
+            "query_count": len(queries),
+            "budget": budget,
+            "violations": violations,
+        }
+        write_report(entry)
+        logger.warning(f"Query violations on {entry['method']} {entry['route']}: "
+                       f"{', '.join(v['type'] for v in violations)}")
+        if strict:
+            raise QueryBudgetExceeded(json.dumps(entry))
+
+
+def _after_request(response):
+    view = current_app.view_functions.get(request.endpoint)
+    check_request(getattr(view, "query_budget", None))
+    return response
+
+
+def _teardown_request(exc):
+    token = request.environ.pop("query_detector.token", None)
+    if token is not None:
+        _current.reset(token)
+
+
+def init_query_detector(app):
+    mode = os.environ.get("QUERY_DETECTOR", "off")
+    if mode not in ("warn", "strict"):
+        return
+    app.config["QUERY_DETECTOR"] = mode
+    if not event.contains(Engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+        event.listen(Engine, "handle_error", _handle_error)
+    app.before_request(_before_request)
+    app.after_request(_after_request)
+    app.teardown_request(_teardown_request)
@@ -0,0 +1,161 @@
+"""Skill recommendations over a sparse job x skill matrix.
+
+SkillRecommender holds a binary CSR matrix with one row per job and one
+column per skill. Rows are ordered by job_category so each category is a
+contiguous row slice, and column sums are precomputed for the whole matrix
+and for every slice. Scoring a skill set is two sparse products (jobs that
+have any current skill, then skill counts over those jobs) followed by a
+heap selection of the top k. NumPy and SciPy are imported on first build
+so app startup does not pay for them.
+
+A build produces one state dict that is swapped in with a single
+assignment, so recommend() never mixes arrays from two builds. Writes
+mark the state stale and rebuild it on a background thread, as
+SkillPageRank does, so requests keep using the previous state meanwhile.
+"""
+import heapq
+import logging
+import math
+import threading
+
+from sample_data import skill_category
+
+logger = logging.getLogger(__name__)
+
+SCORES = ("relevance", "conditional", "lift", "pmi")
+
+
+class SkillRecommender:
+    def __init__(self):
+        self._state = None
+        self._dirty = True
+        self._lock = threading.Lock()
+        self._rebuild_thread = None
+
+    def build(self, rows):
+        """Build from (job_category, required_skills) rows."""
+        import numpy as np
+        from scipy import sparse
+        rows = sorted(((cat or "", skills_str or "") for cat, skills_str in rows), key=lambda r: r[0])
+        skill_index = {}
+        indptr = [0]
+        indices = []
+        partitions = {}
+        for row_number, (cat, skills_str) in enumerate(rows):
+            start, _ = partitions.get(cat, (row_number, row_number))
+            partitions[cat] = (start, row_number + 1)
+            columns = set()
+            for skill in skills_str.split(","):
+                skill = skill.strip()
+                if skill:
+                    columns.add(skill_index.setdefault(skill, len(skill_index)))
+            indices.extend(sorted(columns))
+            indptr.append(len(indices))
+
+        data = np.ones(len(indices), dtype=np.int32)
+        matrix = sparse.csr_matrix((data, np.array(indices, dtype=np.int32), np.array(indptr)),
+                                   shape=(len(rows), len(skill_index)))
+        skills = sorted(skill_index, key=skill_index.get)
+        self._state = {
+            "skills": skills,
+            "skill_index": skill_index,
+            "categories": [skill_category(s) for s in skills],
+            "matrix": matrix,
+            "column_sums": np.asarray(matrix.sum(axis=0)).ravel(),
+            "partitions": {
+                cat: (start, end, np.asarray(matrix[start:end].sum(axis=0)).ravel())
+                for cat, (start, end) in partitions.items()
+            },
+        }
+
+    def invalidate(self, load_rows=None):
+        """Mark the state stale and, if a loader is given, rebuild in the background."""
+        self._dirty = True
+        if load_rows is None:
+            return
+        with self._lock:
+            if self._rebuild_thread and self._rebuild_thread.is_alive():
+                return
+            self._rebuild_thread = threading.Thread(target=self._rebuild, args=(load_rows,),
+                                                    name="recommender", daemon=True)
+            self._rebuild_thread.start()
+
+    def _rebuild(self, load_rows):
+        # an invalidate() during a build sets _dirty again, so the loop runs once more
+        while self._dirty:
+            self._dirty = False
+            try:
+                self.build(load_rows())
+            except Exception as e:
+                # stay dirty so the next ensure_built() retries
+                self._dirty = True
+                logger.error(f"Error rebuilding skill recommender: {e}")
+                return
+
+    def ensure_built(self, load_rows):
+        """Build if nothing is built, or if stale and no background rebuild is running (e.g. one failed)."""
+        if self._state is not None and not self._dirty:
+            return
+        with self._lock:
+            rebuilding = self._rebuild_thread is not None and self._rebuild_thread.is_alive()
+            if self._state is None or (self._dirty and not rebuilding):
+                self._dirty = False
+                try:
+                    self.build(load_rows())
+                except Exception:
+                    self._dirty = True
+                    raise
+
+    def recommend(self, current_skills, career_goal=None, k=10, score="relevance"):
+        if score not in SCORES:
+            raise ValueError(f"score must be one of {', '.join(SCORES)}")
+        state = self._state
+        if state is None:
+            return []
+        import numpy as np
+        if career_goal:
+            if career_goal not in state["partitions"]:
+                return []
+            start, end, column_sums = state["partitions"][career_goal]
+            matrix = state["matrix"][start:end]
+        else:
+            matrix, column_sums = state["matrix"], state["column_sums"]
+
+        skill_index = state["skill_index"]
+        seed_columns = [skill_index[s] for s in current_skills if s in skill_index]
+        if not seed_columns or matrix.shape[0] == 0:
+            return []
+        seed = np.zeros(len(state["skills"]), dtype=np.int32)
+        seed[seed_columns] = 1
+
+        has_current = (matrix @ seed) > 0
+        n_has = int(has_current.sum())
+        if not n_has:
+            return []
+        cooccur = np.asarray(matrix.T @ has_current.astype(np.int32)).ravel()
+        cooccur[seed_columns] = 0
+        candidates = np.flatnonzero(cooccur)
+        n_jobs = matrix.shape[0]
+
+        def score_of(j):
+            count, freq = cooccur[j], column_sums[j]
+            if score == "relevance":
+                # ranked on the displayed percentage so ties fall back to frequency
+                return round(count / max(freq, 1) * 100, 1)
+            if score == "conditional":
+                return count / n_has
+            lift = count * n_jobs / (n_has * max(freq, 1))
+            return lift if score == "lift" else math.log2(lift)
+
+        scored = ((score_of(j), int(cooccur[j]), j) for j in candidates)
+        top = heapq.nlargest(k, scored)
+        return [{
+            "skill": state["skills"][j],
+            "frequency": count,
+            "relevance": round(cooccur[j] / max(column_sums[j], 1) * 100, 1),
+            "score": round(value, 4),
+            "category": state["categories"][j],
+        } for value, count, j in top]
+
+
+skill_recommender = SkillRecommender()
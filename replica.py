@@ -0,0 +1,85 @@
+"""Read/write routing between the primary database and a read replica.
+
+Set DATABASE_REPLICA_URL to register a "replica" SQLAlchemy bind. Views
+decorated with @read_replica then send their SELECTs to the replica. Flushes,
+bulk UPDATE/INSERT/DELETE statements and code inside `with primary():` still go
+to the primary. After a request writes to the primary, the client's session
+is pinned to the primary for REPLICA_PIN_SECONDS (read-your-writes), so the
+listing shown after a create or edit is never behind a lagging replica.
+Without a replica URL, every query uses the primary as before.
+"""
+import logging
+import os
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from flask import current_app, g, has_request_context, request, session
+from flask_sqlalchemy.session import Session
+from sqlalchemy.sql import CompoundSelect, Select
+from sqlalchemy.sql.dml import UpdateBase
+
+logger = logging.getLogger(__name__)
+
+REPLICA_BIND = "replica"
+PIN_SESSION_KEY = "primary_until"
+
+_force_primary = ContextVar("force_primary", default=False)
+
+
+def read_replica(fn):
+    """Allow a read-only view to run its SELECTs against the replica."""
+    fn.read_replica = True
+    return fn
+
+
+@contextmanager
+def primary():
+    """Route every statement in the block to the primary, even in a replica view."""
+    token = _force_primary.set(True)
+    try:
+        yield
+    finally:
+        _force_primary.reset(token)
+
+
+class RoutingSession(Session):
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and has_request_context():
+            if self._flushing or isinstance(clause, UpdateBase):
+                g.wrote_primary = True
+            elif (g.get("use_replica") and not _force_primary.get()
+                    and isinstance(clause, (Select, CompoundSelect))):
+                return self._db.engines[REPLICA_BIND]
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+def _before_request():
+    view = current_app.view_functions.get(request.endpoint)
+    if not getattr(view, "read_replica", False):
+        return
+    if session.get(PIN_SESSION_KEY, 0) > time.time():
+        return
+    g.use_replica = True
+
+
+def _after_request(response):
+    if g.get("wrote_primary"):
+        session[PIN_SESSION_KEY] = time.time() + current_app.config["REPLICA_PIN_SECONDS"]
+    return response
+
+
+def configure_replica(app):
+    """Add the replica bind to the app config; call before db.init_app()."""
+    app.config["REPLICA_PIN_SECONDS"] = float(os.environ.get("REPLICA_PIN_SECONDS", 5))
+    url = os.environ.get("DATABASE_REPLICA_URL")
+    if url:
+        app.config.setdefault("SQLALCHEMY_BINDS", {})[REPLICA_BIND] = url
+
+
+def init_replica_routing(app):
+    if REPLICA_BIND not in app.config.get("SQLALCHEMY_BINDS", {}):
+        return
+    app.before_request(_before_request)
+    app.after_request(_after_request)
+    logger.info("Read-only views will use the replica database")
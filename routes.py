@@ -1,21 +1,64 @@
 import logging
+import os
+import threading
+import time
+from collections import Counter
 from datetime import datetime
-from itertools import combinations
-from flask import render_template, request, redirect, url_for, flash, jsonify
+import click
+from flask import Blueprint, current_app, render_template, request, redirect, url_for, flash, jsonify, Response
 from sqlalchemy import or_
-from app import app, db
-from models import Job, Skill
-from neo4j_service import get_skill_graph, init_skill_graph, in_memory_graph
-from sample_data import generate_sample_jobs, get_all_skills, SKILLS
+from app import db
+from models import ArchivedJob, Job, Skill, SimilarJob
+from instrumentation import render_metrics
+from query_detector import query_budget
+from replica import primary, read_replica
+from coalesce import coalesced
+from warmup import init_warmup, warmup
+from data_versions import init_version_polling, jobs_version
+from archive import archive_expired, init_archiving, job_source, ARCHIVE_BATCH_SIZE
+from projections import project
+from similar_jobs import similar_jobs, rebuild_all as rebuild_similar_jobs
+from recommender import skill_recommender, SCORES as RECOMMENDER_SCORES
+from pagerank import skill_pagerank
+from graph_layout import skill_layout
+from graph_rebuild import graph_edges_for_state, graph_columns, count_rows, parallel_counts, load_counts
+from sampling import job_sample
+from salary_sketches import salary_sketches, cell_for_state, DIMENSIONS as SKETCH_DIMENSIONS
+from dashboard import compute_bundle, PANELS as DASHBOARD_PANELS
+from live_updates import analytics_events, job_delta
+from facet_index import facet_index, to_bitmap, BitmapPagination, FACETS
+from skill_trends import skill_trends, historical_skill_trends, GRANULARITIES as TREND_GRANULARITIES, DIMENSIONS as TREND_DIMENSIONS
+from neo4j_service import get_skill_graph, init_skill_graph, in_memory_graph, neo4j_service, InMemorySkillGraph
+from sample_data import bulk_load_jobs, generate_sample_jobs, get_all_skills, skill_category, SKILLS
 
 logger = logging.getLogger(__name__)
 
+# /api/skill-graph/consistency scans every job, so it is only served when an operator turns it on
+SKILL_GRAPH_CHECK_ENDPOINT = os.environ.get("SKILL_GRAPH_CHECK_ENDPOINT") == "1"
 
-def init_app():
-    init_skill_graph()
+bp = Blueprint('main', __name__, cli_group=None)
+
+
+def init_app(app=None):
+    init_skill_graph(block=False)
+    salary_sketches.on_rebuilt = publish_salary_update
+    if app is not None:
+        init_warmup(app, prepare=warm_skill_graph)
+        init_version_polling(app, reset_derived_structures)
+        init_archiving(app, archive_expired_jobs)
+
+
+def warm_skill_graph():
+    """Fill the in-memory graph from the jobs table; otherwise only /init-data and writes fill it."""
+    if neo4j_service.is_connected() or in_memory_graph.skills:
+        return
+    with primary():
+        load_counts(in_memory_graph, count_rows(db.session.query(*graph_columns()).order_by(Job.id)))
 
 
-@app.route('/')
+@bp.route('/')
+@query_budget(4)
+@read_replica
 def index():
     industry = request.args.get('industry', '')
     location = request.args.get('location', '')
@@ -29,58 +72,41 @@ def index():
     page = request.args.get('page', 1, type=int)
     per_page = 25
     
-    query = Job.query
+    try:
+        salary_min_value = int(salary_min) if salary_min else None
+    except ValueError:
+        salary_min_value = None
+    try:
+        salary_max_value = int(salary_max) if salary_max else None
+    except ValueError:
+        salary_max_value = None
     
+    # the index only sees this worker's writes, so first check for anyone else's
+    jobs_version.check()
+    facet_index.ensure_built(load_facet_rows)
+    restrict = None
     if search:
-        query = query.filter(or_(
+        matches = db.session.query(Job.id).filter(or_(
             Job.job_title.ilike(f'%{search}%'),
             Job.required_skills.ilike(f'%{search}%')
         ))
-    if industry:
-        query = query.filter(Job.industry == industry)
-    if location:
-        query = query.filter(Job.company_location == location)
-    if experience:
-        query = query.filter(Job.experience_level == experience)
-    if job_category:
-        query = query.filter(Job.job_category == job_category)
-    if salary_min:
-        try:
-            query = query.filter(Job.salary_usd >= int(salary_min))
-        except ValueError:
-            pass
-    if salary_max:
-        try:
-            query = query.filter(Job.salary_usd <= int(salary_max))
-        except ValueError:
-            pass
-    if remote_ratio:
-        query = query.filter(Job.remote_ratio == int(remote_ratio))
-    if company_size:
-        query = query.filter(Job.company_size == company_size)
-    
-    jobs = query.order_by(Job.posting_date.desc()).paginate(page=page, per_page=per_page, error_out=False)
-    
-    industries = db.session.query(Job.industry).distinct().order_by(Job.industry).all()
-    locations = db.session.query(Job.company_location).distinct().order_by(Job.company_location).all()
-    categories = db.session.query(Job.job_category).distinct().order_by(Job.job_category).all()
-    
-    salary_range = db.session.query(
-        db.func.min(Job.salary_usd),
-        db.func.max(Job.salary_usd)
-    ).filter(Job.salary_usd.isnot(None)).first()
-    min_salary = salary_range[0] or 0
-    max_salary = salary_range[1] or 500000
+        restrict = to_bitmap([row[0] for row in matches])
+    filters = {'industry': industry, 'location': location, 'experience': experience,
+               'job_category': job_category, 'remote_ratio': remote_ratio, 'company_size': company_size}
+    match, facet_counts = facet_index.query(filters, salary_min_value, salary_max_value, restrict)
+    jobs = BitmapPagination(page=page, per_page=per_page, error_out=False, index=facet_index, bitmap=match)
     
-    total_jobs = Job.query.count()
-    avg_salary = db.session.query(db.func.avg(Job.salary_usd)).scalar() or 0
+    stats = facet_index.stats()
+    min_salary = stats['min_salary'] or 0
+    max_salary = stats['max_salary'] or 500000
     total_skills = Skill.query.count()
     
     return render_template('index.html',
                          jobs=jobs,
-                         industries=[i[0] for i in industries if i[0]],
-                         locations=[l[0] for l in locations if l[0]],
-                         categories=[c[0] for c in categories if c[0]],
+                         industries=stats['values']['industry'],
+                         locations=stats['values']['location'],
+                         categories=stats['values']['job_category'],
+                         facet_counts=facet_counts,
                          selected_industry=industry,
                          selected_location=location,
                          selected_experience=experience,
@@ -92,12 +118,13 @@ def index():
                          min_salary=min_salary,
                          max_salary=max_salary,
                          search=search,
-                         total_jobs=total_jobs,
-                         avg_salary=int(avg_salary),
+                         total_jobs=stats['total_jobs'],
+                         avg_salary=int(stats['avg_salary']),
                          total_skills=total_skills)
 
 
-@app.route('/job/new', methods=['GET', 'POST'])
+@bp.route('/job/new', methods=['GET', 'POST'])
+@query_budget(4)
 def create_job():
     if request.method == 'POST':
         try:
@@ -123,10 +150,10 @@ def create_job():
             db.session.add(job)
             db.session.commit()
             
-            update_skill_graph_for_job(job)
+            job_written(None, job_state(job))
             
             flash('Job created successfully!', 'success')
-            return redirect(url_for('index'))
+            return redirect(url_for('main.index'))
         except Exception as e:
             db.session.rollback()
             flash(f'Error creating job: {str(e)}', 'error')
@@ -136,11 +163,13 @@ def create_job():
     return render_template('job_form.html', job=None, skills=skills, action='Create')
 
 
-@app.route('/job/<int:job_id>/edit', methods=['GET', 'POST'])
+@bp.route('/job/<int:job_id>/edit', methods=['GET', 'POST'])
+@query_budget(4)
 def edit_job(job_id):
     job = Job.query.get_or_404(job_id)
     
     if request.method == 'POST':
+        old_state = job_state(job)
         try:
             job.job_title = request.form['job_title']
             job.salary_usd = int(request.form.get('salary_usd', 0)) if request.form.get('salary_usd') else None
@@ -160,8 +189,11 @@ def edit_job(job_id):
             job.benefits_score = float(request.form.get('benefits_score', 5.0)) if request.form.get('benefits_score') else None
             
             db.session.commit()
+            
+            job_written(old_state, job_state(job))
+            
             flash('Job updated successfully!', 'success')
-            return redirect(url_for('index'))
+            return redirect(url_for('main.index'))
         except Exception as e:
             db.session.rollback()
             flash(f'Error updating job: {str(e)}', 'error')
@@ -171,20 +203,26 @@ def edit_job(job_id):
     return render_template('job_form.html', job=job, skills=skills, action='Update')
 
 
-@app.route('/job/<int:job_id>/delete', methods=['POST'])
+@bp.route('/job/<int:job_id>/delete', methods=['POST'])
+@query_budget(3)
 def delete_job(job_id):
     job = Job.query.get_or_404(job_id)
+    old_state = job_state(job)
     try:
         db.session.delete(job)
         db.session.commit()
+        
+        job_written(old_state, None)
+        
         flash('Job deleted successfully!', 'success')
     except Exception as e:
         db.session.rollback()
         flash(f'Error deleting job: {str(e)}', 'error')
-    return redirect(url_for('index'))
+    return redirect(url_for('main.index'))
 
 
-@app.route('/job/<int:job_id>')
+@bp.route('/job/<int:job_id>')
+@query_budget(2)
 def view_job(job_id):
     job = Job.query.get_or_404(job_id)
     skills = job.get_skills_list()
@@ -195,16 +233,28 @@ def view_job(job_id):
         related = graph.get_related_skills(skill, limit=5)
         if related:
             related_skills[skill] = related
+    pathways = skill_pathways(skills, limit=5)
+    
+    # precomputed by similar_jobs; ordered by the (job_id, rank) index
+    similar = db.session.query(
+        Job.id, Job.job_title, Job.job_category, Job.company_location, Job.salary_usd, SimilarJob.score
+    ).join(SimilarJob, SimilarJob.neighbor_id == Job.id).filter(
+        SimilarJob.job_id == job_id
+    ).order_by(SimilarJob.rank).all()
     
-    return render_template('job_detail.html', job=job, skills=skills, related_skills=related_skills)
+    return render_template('job_detail.html', job=job, skills=skills, related_skills=related_skills,
+                           pathways=pathways, similar_jobs=similar)
 
 
-@app.route('/visualizations')
+@bp.route('/visualizations')
+@query_budget(0)
 def visualizations():
     return render_template('visualizations.html')
 
 
-@app.route('/analytics')
+@bp.route('/analytics')
+@query_budget(1)
+@read_replica
 def analytics():
     categories = db.session.query(Job.job_category).distinct().order_by(Job.job_category).all()
     categories = [c[0] for c in categories if c[0]]
@@ -218,54 +268,62 @@ def analytics():
                          skills_by_category=skills_by_category)
 
 
-@app.route('/api/skill-graph')
+@bp.route('/api/skill-graph')
+@query_budget(1)
+@read_replica
 def api_skill_graph():
     graph = get_skill_graph()
     nodes = graph.get_skill_nodes()
     edges = graph.get_skill_cooccurrences(min_count=1)
     
     skill_counts = {}
-    jobs = Job.query.all()
-    for job in jobs:
-        for skill in job.get_skills_list():
+    for job in project(Job.required_skills):
+        for skill in job.skills:
             skill_counts[skill] = skill_counts.get(skill, 0) + 1
     
     node_list = []
     for skill_name, count in skill_counts.items():
-        category = None
-        for cat, skills in SKILLS.items():
-            if skill_name in skills:
-                category = cat
-                break
         node_list.append({
             "id": skill_name,
             "name": skill_name,
-            "category": category or "Other",
+            "category": skill_category(skill_name),
             "count": count
         })
     
+    skill_layout.ensure_built(load_layout_graph)
+    skill_layout.annotate(node_list)
+    
     return jsonify({
         "nodes": node_list,
         "links": edges
     })
 
 
-@app.route('/api/skill-frequency')
+@bp.route('/api/skill-frequency')
+@query_budget(1)
+@read_replica
+@coalesced
 def api_skill_frequency():
     industry = request.args.get('industry', '')
     experience = request.args.get('experience', '')
     
-    query = Job.query
+    if request.args.get('approx') == '1':
+        if include_archived():
+            return archived_unsupported('approx=1')
+        job_sample.ensure_built(load_sample_rows)
+        return approx_response(*job_sample.skill_frequency(industry or None, experience or None))
+    
+    jobs = job_source(include_archived())
+    conditions = []
     if industry:
-        query = query.filter(Job.industry == industry)
+        conditions.append(jobs.c.industry == industry)
     if experience:
-        query = query.filter(Job.experience_level == experience)
+        conditions.append(jobs.c.experience_level == experience)
     
-    jobs = query.all()
     skill_counts = {}
     
-    for job in jobs:
-        for skill in job.get_skills_list():
+    for job in project(jobs.c.required_skills, where=conditions):
+        for skill in job.skills:
             skill_counts[skill] = skill_counts.get(skill, 0) + 1
     
     sorted_skills = sorted(skill_counts.items(), key=lambda x: x[1], reverse=True)[:20]
@@ -276,18 +334,44 @@ def api_skill_frequency():
     })
 
 
-@app.route('/api/salary-distribution')
+@bp.route('/api/salary-distribution')
+@query_budget(5)
+@read_replica
+@coalesced
 def api_salary_distribution():
     group_by = request.args.get('group_by', 'location')
+    percentiles = request.args.get('percentiles', '')
     
+    if percentiles:
+        if include_archived():
+            return archived_unsupported('percentiles')
+        try:
+            percentile_list = [float(p) for p in percentiles.split(',')]
+        except ValueError:
+            return jsonify({"error": "percentiles must be comma-separated numbers"}), 400
+        if any(p < 0 or p > 100 for p in percentile_list):
+            return jsonify({"error": "percentiles must be between 0 and 100"}), 400
+        if group_by not in SKETCH_DIMENSIONS:
+            group_by = 'category'
+        filters = {dim: request.args.get(dim, '') for dim in SKETCH_DIMENSIONS}
+        data = salary_sketches.query(group_by=group_by, filters=filters, percentiles=percentile_list)
+        return jsonify(sorted(data, key=lambda x: x['avg'], reverse=True))
+    
+    if request.args.get('approx') == '1':
+        if include_archived():
+            return archived_unsupported('approx=1')
+        job_sample.ensure_built(load_sample_rows)
+        return approx_response(*job_sample.salary_distribution(group_by))
+    
+    jobs = job_source(include_archived())
     if group_by == 'location':
         results = db.session.query(
-            Job.company_location,
-            db.func.avg(Job.salary_usd),
-            db.func.min(Job.salary_usd),
-            db.func.max(Job.salary_usd),
-            db.func.count(Job.id)
-        ).filter(Job.salary_usd.isnot(None)).group_by(Job.company_location).all()
+            jobs.c.company_location,
+            db.func.avg(jobs.c.salary_usd),
+            db.func.min(jobs.c.salary_usd),
+            db.func.max(jobs.c.salary_usd),
+            db.func.count(jobs.c.id)
+        ).filter(jobs.c.salary_usd.isnot(None)).group_by(jobs.c.company_location).all()
         
         data = [{
             "label": r[0],
@@ -298,12 +382,12 @@ def api_salary_distribution():
         } for r in results if r[0]]
     else:
         results = db.session.query(
-            Job.job_category,
-            db.func.avg(Job.salary_usd),
-            db.func.min(Job.salary_usd),
-            db.func.max(Job.salary_usd),
-            db.func.count(Job.id)
-        ).filter(Job.salary_usd.isnot(None)).group_by(Job.job_category).all()
+            jobs.c.job_category,
+            db.func.avg(jobs.c.salary_usd),
+            db.func.min(jobs.c.salary_usd),
+            db.func.max(jobs.c.salary_usd),
+            db.func.count(jobs.c.id)
+        ).filter(jobs.c.salary_usd.isnot(None)).group_by(jobs.c.job_category).all()
         
         data = [{
             "label": r[0],
@@ -316,11 +400,21 @@ def api_salary_distribution():
     return jsonify(sorted(data, key=lambda x: x['avg'], reverse=True))
 
 
-@app.route('/api/industry-skills')
+@bp.route('/api/industry-skills')
+@query_budget(1)
+@read_replica
+@coalesced
 def api_industry_skills():
-    results = db.session.query(Job.industry, Job.required_skills).filter(
-        Job.industry.isnot(None),
-        Job.required_skills.isnot(None)
+    if request.args.get('approx') == '1':
+        if include_archived():
+            return archived_unsupported('approx=1')
+        job_sample.ensure_built(load_sample_rows)
+        return approx_response(*job_sample.industry_skills())
+    
+    jobs = job_source(include_archived())
+    results = db.session.query(jobs.c.industry, jobs.c.required_skills).filter(
+        jobs.c.industry.isnot(None),
+        jobs.c.required_skills.isnot(None)
     ).all()
     
     industry_skills = {}
@@ -341,35 +435,105 @@ def api_industry_skills():
     return jsonify(sorted(formatted, key=lambda x: x['industry']))
 
 
-@app.route('/api/skill-trends')
+@bp.route('/api/dashboard-bundle')
+@query_budget(1)
+@read_replica
+@coalesced
+def api_dashboard_bundle():
+    names = [p.strip() for p in request.args.get('panels', ','.join(DASHBOARD_PANELS)).split(',') if p.strip()]
+    unknown = [name for name in names if name not in DASHBOARD_PANELS]
+    if unknown:
+        return jsonify({"error": f"unknown panels: {', '.join(unknown)}; "
+                                 f"choose from {', '.join(DASHBOARD_PANELS)}"}), 400
+    
+    # panel parameters are passed as <panel>.<param>, e.g. skill-frequency.industry=Finance
+    params = {name: {} for name in names}
+    for key, value in request.args.items():
+        name, _, param = key.partition('.')
+        if name in params and param:
+            params[name][param] = value
+    
+    bundle = compute_bundle(params, load_dashboard_rows, load_skill_links)
+    if 'skill-graph' in bundle:
+        skill_layout.ensure_built(load_layout_graph)
+        skill_layout.annotate(bundle['skill-graph']['nodes'])
+    return jsonify(bundle)
+
+
+def include_archived():
+    """Whether the request asks to count archived postings too (include_archived=1)."""
+    return request.args.get('include_archived') == '1'
+
+
+def archived_unsupported(mode):
+    return jsonify({"error": f"include_archived=1 cannot be combined with {mode}, "
+                             f"which only covers active postings"}), 400
+
+
+def approx_response(result, summary):
+    """JSON for an approx=1 view, with the sample behind it described in headers."""
+    response = jsonify(result)
+    response.headers['X-Approx-Sample-Size'] = str(summary["sample_size"])
+    response.headers['X-Approx-Population'] = str(summary["population"])
+    response.headers['X-Approx-Confidence'] = str(summary["confidence"])
+    return response
+
+
+def load_sample_rows():
+    with primary():
+        return list(project(Job.id, Job.industry, Job.experience_level, Job.company_location,
+                            Job.job_category, Job.salary_usd, Job.required_skills))
+
+
+def load_dashboard_rows():
+    return db.session.query(Job.industry, Job.experience_level, Job.company_location,
+                            Job.job_category, Job.required_skills, Job.salary_usd)
+
+
+def load_skill_links():
+    return get_skill_graph().get_skill_cooccurrences(min_count=1)
+
+
+def load_layout_graph():
+    graph = get_skill_graph()
+    return [node["name"] for node in graph.get_skill_nodes()], graph.get_skill_cooccurrences(min_count=1)
+
+
+@bp.route('/api/skill-trends')
+@query_budget(1)
+@read_replica
+@coalesced
 def api_skill_trends():
-    jobs = Job.query.filter(Job.posting_date.isnot(None)).order_by(Job.posting_date).all()
-    
-    monthly_skills = {}
-    for job in jobs:
-        month_key = job.posting_date.strftime('%Y-%m')
-        if month_key not in monthly_skills:
-            monthly_skills[month_key] = {}
-        for skill in job.get_skills_list():
-            monthly_skills[month_key][skill] = monthly_skills[month_key].get(skill, 0) + 1
-    
-    all_skills_count = {}
-    for job in jobs:
-        for skill in job.get_skills_list():
-            all_skills_count[skill] = all_skills_count.get(skill, 0) + 1
-    top_skills = sorted(all_skills_count.items(), key=lambda x: x[1], reverse=True)[:10]
-    skill_names = [s[0] for s in top_skills]
-    
-    months = sorted(monthly_skills.keys())
+    granularity = request.args.get('granularity', 'month')
+    group_by = request.args.get('group_by') or None
+    try:
+        start = request.args.get('start')
+        end = request.args.get('end')
+        start = datetime.strptime(start, '%Y-%m-%d').date() if start else None
+        end = datetime.strptime(end, '%Y-%m-%d').date() if end else None
+        limit = int(request.args.get('limit', 10))
+    except ValueError:
+        return jsonify({"error": "start and end must be YYYY-MM-DD and limit an integer"}), 400
+    if granularity not in TREND_GRANULARITIES:
+        return jsonify({"error": f"granularity must be one of {', '.join(TREND_GRANULARITIES)}"}), 400
+    if group_by is not None and group_by not in TREND_DIMENSIONS:
+        return jsonify({"error": f"group_by must be one of {', '.join(TREND_DIMENSIONS)}"}), 400
+    skills = [s.strip() for s in request.args.get('skills', '').split(',') if s.strip()]
+    filters = {dim: request.args.get(dim, '') for dim in TREND_DIMENSIONS}
+
+    if include_archived():
+        cube, load_rows = historical_skill_trends, load_historical_trend_rows
+    else:
+        cube, load_rows = skill_trends, load_trend_rows
+    cube.ensure_built(load_rows)
+    trends = cube.query(granularity, start, end, filters, skills or None, limit, group_by)
+
     datasets = []
     colors = ['#4f46e5', '#10b981', '#f59e0b', '#ec4899', '#06b6d4', '#8b5cf6', '#ef4444', '#14b8a6', '#f97316', '#6366f1']
     
-    for i, skill in enumerate(skill_names):
-        data = []
-        for month in months:
-            data.append(monthly_skills.get(month, {}).get(skill, 0))
+    for i, (label, data) in enumerate(trends["series"]):
         datasets.append({
-            "label": skill,
+            "label": label,
             "data": data,
             "borderColor": colors[i % len(colors)],
             "backgroundColor": colors[i % len(colors)] + "20",
@@ -378,80 +542,133 @@ def api_skill_trends():
         })
     
     return jsonify({
-        "labels": months,
+        "labels": trends["labels"],
+        "postings": trends["postings"],
+        "granularity": granularity,
         "datasets": datasets
     })
 
 
-@app.route('/api/skill-recommender')
+def load_facet_rows():
+    with primary():
+        return db.session.query(Job.id, Job.posting_date, Job.salary_usd,
+                                *(getattr(Job, column) for _, column in FACETS.values())).all()
+
+
+def load_trend_rows(include_archived=False):
+    jobs = job_source(include_archived)
+    with primary():
+        return db.session.query(jobs.c.posting_date, jobs.c.required_skills, jobs.c.industry,
+                                jobs.c.experience_level, jobs.c.company_location).all()
+
+
+def load_historical_trend_rows():
+    return load_trend_rows(include_archived=True)
+
+
+@bp.route('/api/skill-recommender')
+@query_budget(1)
+@read_replica
 def api_skill_recommender():
     current_skills = request.args.get('skills', '')
     career_goal = request.args.get('career_goal', '')
+    score = request.args.get('score', 'relevance')
     
     if not current_skills:
         return jsonify({"recommendations": [], "message": "Please select your current skills"})
+    if score not in RECOMMENDER_SCORES:
+        return jsonify({"error": f"score must be one of {', '.join(RECOMMENDER_SCORES)}"}), 400
     
     current_skill_list = [s.strip() for s in current_skills.split(',')]
     
-    query = Job.query
-    if career_goal:
-        query = query.filter(Job.job_category == career_goal)
+    skill_recommender.ensure_built(load_recommender_rows)
+    recommendations = skill_recommender.recommend(current_skill_list, career_goal=career_goal,
+                                                  k=10, score=score)
     
-    jobs = query.all()
+    return jsonify({
+        "recommendations": recommendations,
+        # PageRank reaches skills through other skills and roles; only the ones not listed above
+        "pathways": skill_pathways(current_skill_list, limit=5,
+                                   exclude=[r["skill"] for r in recommendations]),
+        "current_skills": current_skill_list,
+        "career_goal": career_goal,
+        "score": score
+    })
+
+
+def load_recommender_rows():
+    with primary():
+        return db.session.query(Job.job_category, Job.required_skills).all()
+
+
+def recommender_loader():
+    """load_recommender_rows for the recommender's background rebuild, which runs outside this context."""
+    app = current_app._get_current_object()
     
-    skill_freq = {}
-    skill_cooccur = {}
+    def load():
+        with app.app_context():
+            return load_recommender_rows()
+    return load
+
+
+@bp.route('/api/skill-pathways')
+@query_budget(0)
+def api_skill_pathways():
+    current_skills = request.args.get('skills', '')
+    limit = request.args.get('limit', 10, type=int)
     
-    for job in jobs:
-        job_skills = job.get_skills_list()
-        has_current = any(s in current_skill_list for s in job_skills)
-        
-        for skill in job_skills:
-            skill_freq[skill] = skill_freq.get(skill, 0) + 1
-            if has_current and skill not in current_skill_list:
-                skill_cooccur[skill] = skill_cooccur.get(skill, 0) + 1
-    
-    recommendations = []
-    for skill, count in skill_cooccur.items():
-        relevance = count / max(skill_freq.get(skill, 1), 1)
-        category = None
-        for cat, cat_skills in SKILLS.items():
-            if skill in cat_skills:
-                category = cat
-                break
-        recommendations.append({
-            "skill": skill,
-            "frequency": count,
-            "relevance": round(relevance * 100, 1),
-            "category": category or "Other"
-        })
+    if not current_skills:
+        return jsonify({"recommendations": [], "message": "Please select your current skills"})
     
-    recommendations = sorted(recommendations, key=lambda x: (x['relevance'], x['frequency']), reverse=True)[:10]
+    current_skill_list = [s.strip() for s in current_skills.split(',')]
+    skill_pagerank.ensure_built(load_graph_edges)
     
     return jsonify({
-        "recommendations": recommendations,
-        "current_skills": current_skill_list,
-        "career_goal": career_goal
+        "recommendations": skill_pagerank.recommend(current_skill_list, limit=limit),
+        "current_skills": current_skill_list
     })
 
 
-@app.route('/api/role-similarity')
+def load_graph_edges():
+    return get_skill_graph().snapshot()
+
+
+def skill_pathways(skills, limit, exclude=()):
+    """Multi-hop PageRank suggestions for a whole skill set, leaving out skills already shown."""
+    skill_pagerank.ensure_built(load_graph_edges)
+    exclude = set(exclude)
+    suggestions = skill_pagerank.recommend(skills, limit=limit + len(exclude))
+    return [s for s in suggestions if s["skill"] not in exclude][:limit]
+
+
+@bp.route('/api/role-similarity')
+@query_budget(2)
+@read_replica
+@coalesced
 def api_role_similarity():
     job_id = request.args.get('job_id', type=int)
     
     if not job_id:
-        categories = db.session.query(Job.job_category).distinct().all()
-        categories = [c[0] for c in categories if c[0]]
+        rows = db.session.query(Job.job_category, Job.required_skills).filter(
+            Job.job_category.isnot(None)
+        ).all()
+        
+        category_skill_sets = {}
+        category_job_counts = {}
+        for cat, skills_str in rows:
+            if not cat:
+                continue
+            cat_skills = category_skill_sets.setdefault(cat, set())
+            category_job_counts[cat] = category_job_counts.get(cat, 0) + 1
+            if skills_str:
+                cat_skills.update(s.strip() for s in skills_str.split(','))
+        categories = list(category_skill_sets.keys())
         
         category_similarities = {}
         for cat in categories:
-            cat_jobs = Job.query.filter(Job.job_category == cat).all()
-            cat_skills = set()
-            for job in cat_jobs:
-                cat_skills.update(job.get_skills_list())
             category_similarities[cat] = {
-                "skills": list(cat_skills),
-                "job_count": len(cat_jobs)
+                "skills": list(category_skill_sets[cat]),
+                "job_count": category_job_counts[cat]
             }
         
         similarity_matrix = []
@@ -478,10 +695,11 @@ def api_role_similarity():
     target_skills = set(target_job.get_skills_list())
     
     similar_jobs = []
-    all_jobs = Job.query.filter(Job.id != job_id).all()
+    all_jobs = project(Job.id, Job.job_title, Job.job_category, Job.company_location,
+                       Job.salary_usd, Job.required_skills, where=[Job.id != job_id])
     
     for job in all_jobs:
-        job_skills = set(job.get_skills_list())
+        job_skills = set(job.skills)
         intersection = len(target_skills & job_skills)
         union = len(target_skills | job_skills)
         similarity = (intersection / union * 100) if union > 0 else 0
@@ -506,15 +724,20 @@ def api_role_similarity():
     })
 
 
-@app.route('/api/industry-comparison')
+@bp.route('/api/industry-comparison')
+@query_budget(2)
+@read_replica
+@coalesced
 def api_industry_comparison():
     industries = db.session.query(Job.industry).distinct().all()
     industries = [i[0] for i in industries if i[0]]
     
-    all_jobs = Job.query.all()
+    all_jobs = list(project(Job.industry, Job.required_skills))
     all_skills = set()
+    jobs_by_industry = {}
     for job in all_jobs:
-        all_skills.update(job.get_skills_list())
+        all_skills.update(job.skills)
+        jobs_by_industry.setdefault(job.industry, []).append(job)
     
     skill_categories = {}
     for skill in all_skills:
@@ -533,11 +756,10 @@ def api_industry_comparison():
     
     industry_data = {}
     for industry in industries:
-        ind_jobs = [j for j in all_jobs if j.industry == industry]
         category_skill_count = {cat: 0 for cat in radar_labels}
         
-        for job in ind_jobs:
-            for skill in job.get_skills_list():
+        for job in jobs_by_industry.get(industry, []):
+            for skill in job.skills:
                 cat = skill_categories.get(skill)
                 if cat and cat in category_skill_count:
                     category_skill_count[cat] += 1
@@ -564,25 +786,58 @@ def api_industry_comparison():
     })
 
 
-@app.route('/api/relationship-graph')
+@bp.route('/api/relationship-graph')
+@query_budget(0)
 def api_relationship_graph():
     node_types = request.args.get('types', 'Skill,Role').split(',')
     min_weight = request.args.get('min_weight', 1, type=int)
     limit = request.args.get('limit', 20, type=int)
     
-    graph = get_skill_graph()
-    
-    if hasattr(graph, 'get_full_graph'):
-        data = graph.get_full_graph(node_types=node_types, min_weight=min_weight, limit_per_type=limit)
-        return jsonify(data)
-    
-    return jsonify({"nodes": [], "links": []})
+    data = get_skill_graph().get_full_graph(node_types=node_types, min_weight=min_weight, limit_per_type=limit)
+    return jsonify(data)
+
+
+@bp.route('/api/analytics-stream')
+@query_budget(0)
+def api_analytics_stream():
+    last_event_id = request.headers.get('Last-Event-ID', type=int)
+    subscriber = analytics_events.subscribe(last_event_id)
+    if subscriber is None:
+        response = jsonify({"error": "Too many live dashboards connected; try again later"})
+        response.status_code = 503
+        response.headers['Retry-After'] = '30'
+        return response
+    return Response(analytics_events.stream(subscriber), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
 
 
-@app.route('/init-data', methods=['POST'])
+@bp.route('/metrics')
+@query_budget(0)
+def metrics():
+    return Response(render_metrics(), mimetype='text/plain; version=0.0.4')
+
+
+@bp.route('/health/live')
+@query_budget(0)
+def health_live():
+    return jsonify({"status": "ok"})
+
+
+@bp.route('/health/ready')
+@query_budget(0)
+def health_ready():
+    response = jsonify(warmup.status())
+    if not warmup.ready:
+        response.status_code = 503
+        response.headers['Retry-After'] = '5'
+    return response
+
+
+@bp.route('/init-data', methods=['POST'])
 def init_data():
     try:
         Job.query.delete()
+        ArchivedJob.query.delete()
         Skill.query.delete()
         in_memory_graph.clear_all()
         
@@ -598,10 +853,18 @@ def init_data():
             db.session.add(job)
         
         db.session.commit()
+        jobs_version.bump()
         
-        jobs = Job.query.all()
-        for job in jobs:
-            update_skill_graph_for_job(job)
+        load_counts(get_skill_graph(), count_rows(db.session.query(*graph_columns()).order_by(Job.id)))
+        skill_recommender.invalidate(recommender_loader())
+        skill_pagerank.invalidate(load_graph_edges)
+        skill_layout.invalidate(load_layout_graph)
+        salary_sketches.rebuild()
+        skill_trends.invalidate()
+        historical_skill_trends.invalidate()
+        facet_index.invalidate()
+        job_sample.invalidate()
+        similar_jobs.enqueue(current_app._get_current_object(), None)
         
         flash(f'Successfully loaded {len(jobs_data)} AI job postings from CSV!', 'success')
     except Exception as e:
@@ -609,45 +872,330 @@ def init_data():
         flash(f'Error initializing data: {str(e)}', 'error')
         logger.error(f"Error initializing data: {e}")
     
-    return redirect(url_for('index'))
+    return redirect(url_for('main.index'))
+
+
+def job_state(job):
+    """Capture the fields derived structures depend on so they can be diffed later."""
+    return {
+        "id": job.id,
+        "job_id": job.job_id,
+        "role": job.job_category or job.job_title,
+        "job_category": job.job_category,
+        "industry": job.industry,
+        "location": job.company_location,
+        "experience_level": job.experience_level,
+        "remote_ratio": job.remote_ratio,
+        "company_size": job.company_size,
+        "salary_usd": job.salary_usd,
+        "posting_date": job.posting_date,
+        "skills": tuple(s for s in job.get_skills_list() if s),
+    }
+
+
+def apply_skill_graph_delta(old_state, new_state, graph=None):
+    """Move the graph from a job's old state to its new one.
+
+    Either state may be None (job created or deleted). Only edges whose
+    counts differ between the two states are touched; backends drop edges
+    whose count reaches zero.
+    """
+    if graph is None:
+        graph = get_skill_graph()
+    
+    old_edges = graph_edges_for_state(old_state)
+    new_edges = graph_edges_for_state(new_state)
+    
+    if new_state:
+        if new_state["role"]:
+            graph.add_role(new_state["role"])
+        if new_state["industry"]:
+            graph.add_industry(new_state["industry"])
+        if new_state["location"]:
+            graph.add_location(new_state["location"])
+        for skill in new_state["skills"]:
+            graph.add_skill(skill, skill_category(skill))
+    
+    for (relationship, source, target), count in (old_edges - new_edges).items():
+        for _ in range(count):
+            if relationship == "REQUIRES":
+                graph.remove_role_skill(source, target)
+            elif relationship == "USES":
+                graph.remove_industry_skill(source, target)
+            elif relationship == "OFFERS":
+                graph.remove_location_role(source, target)
+            else:
+                graph.remove_cooccurrence(source, target, old_state["job_id"])
+    
+    for (relationship, source, target), count in (new_edges - old_edges).items():
+        for _ in range(count):
+            if relationship == "REQUIRES":
+                graph.add_role_skill(source, target)
+            elif relationship == "USES":
+                graph.add_industry_skill(source, target)
+            elif relationship == "OFFERS":
+                graph.add_location_role(source, target)
+            else:
+                graph.add_cooccurrence(source, target, new_state["job_id"])
+
+
+def job_written(old_state, new_state):
+    """Bring derived structures up to date after a job commit.
+
+    old_state is None for a created job and new_state is None for a deleted one.
+    """
+    jobs_version.bump()
+    apply_skill_graph_delta(old_state, new_state)
+    skill_recommender.invalidate(recommender_loader())
+    skill_pagerank.invalidate(load_graph_edges)
+    skill_layout.invalidate(load_layout_graph)
+    salary_sketches.record(old_state, new_state)
+    skill_trends.record(old_state, new_state)
+    historical_skill_trends.record(old_state, new_state)
+    facet_index.record(old_state, new_state)
+    job_sample.record(old_state, new_state)
+    if similarity_changed(old_state, new_state):
+        similar_jobs.enqueue(current_app._get_current_object(), [(new_state or old_state)["id"]])
+    if analytics_events.has_subscribers():
+        publish_analytics_delta(old_state, new_state)
+
+
+def jobs_archived(jobs):
+    """Bring derived structures up to date after a batch of postings moved to jobs_archive.
+
+    Like job_written(state, None) for each posting, except that the
+    historical trend cube keeps counting them, and the salary sketches and
+    similar-jobs lists are updated once for the whole batch. The version
+    bump makes every other worker (or, from `flask archive-expired`, every
+    worker) drop and rebuild its own structures.
+    """
+    jobs_version.bump()
+    states = [job_state(job) for job in jobs]
+    for state in states:
+        apply_skill_graph_delta(state, None)
+        skill_trends.record(state, None)
+        facet_index.record(state, None)
+        job_sample.record(state, None)
+    skill_recommender.invalidate(recommender_loader())
+    skill_pagerank.invalidate(load_graph_edges)
+    skill_layout.invalidate(load_layout_graph)
+    cells = {cell_for_state(state) for state in states if state["salary_usd"] is not None}
+    if cells:
+        salary_sketches.rebuild(cells)
+        publish_salary_update(cells)
+    similar_jobs.enqueue(current_app._get_current_object(), [state["id"] for state in states])
+    if analytics_events.has_subscribers():
+        for state in states:
+            publish_analytics_delta(state, None)
+
+
+def archive_expired_jobs(before=None, batch_size=ARCHIVE_BATCH_SIZE):
+    """Move expired postings to jobs_archive and update this process's derived structures."""
+    return archive_expired(before, batch_size, on_archived=jobs_archived)
+
+
+def reset_derived_structures():
+    """Drop this worker's derived structures after job writes made elsewhere; they rebuild on next use.
+
+    Live dashboards on this worker never saw those writes as deltas, so
+    they are told to reload: at once with Neo4j, otherwise once the
+    in-memory graph has been recounted.
+    """
+    skill_recommender.invalidate(recommender_loader())
+    skill_trends.invalidate()
+    historical_skill_trends.invalidate()
+    facet_index.invalidate()
+    job_sample.invalidate()
+    similar_jobs.invalidate()
+    if neo4j_service.is_connected():
+        skill_pagerank.invalidate(load_graph_edges)
+        skill_layout.invalidate(load_layout_graph)
+        publish_resync()
+    else:
+        schedule_skill_graph_reload(current_app._get_current_object())
+
+
+def publish_resync():
+    if analytics_events.has_subscribers():
+        analytics_events.publish("resync", {})
+
+
+_graph_reload_lock = threading.Lock()
+_graph_reload_pending = threading.Event()
+
+
+def schedule_skill_graph_reload(app):
+    """Recount the in-memory graph from the jobs table on a background thread, once per burst of calls."""
+    _graph_reload_pending.set()
+    if _graph_reload_lock.acquire(blocking=False):
+        threading.Thread(target=_reload_skill_graph, args=(app,), name="skill-graph-reload", daemon=True).start()
+
+
+def _reload_skill_graph(app):
+    try:
+        while _graph_reload_pending.is_set():
+            _graph_reload_pending.clear()
+            with app.app_context(), primary():
+                try:
+                    load_counts(in_memory_graph, count_rows(db.session.query(*graph_columns()).order_by(Job.id)))
+                except Exception as e:
+                    logger.error(f"Error reloading the skill graph: {e}")
+                finally:
+                    db.session.remove()
+                skill_pagerank.invalidate(load_graph_edges)
+                skill_layout.invalidate(load_layout_graph)
+            publish_resync()
+    finally:
+        _graph_reload_lock.release()
+
+
+def similarity_changed(old_state, new_state):
+    """Whether a write can move the job in anyone's similar-jobs list."""
+    if old_state is None or new_state is None:
+        return True
+    return any(old_state[f] != new_state[f] for f in ("skills", "salary_usd", "location"))
+
+
+def publish_analytics_delta(old_state, new_state):
+    """Push chart deltas to live dashboards; salary aggregates follow from publish_salary_update()."""
+    analytics_events.publish("delta", job_delta(old_state, new_state))
+
+
+def publish_salary_update(keys):
+    """Push the salary aggregates of the groups in rebuilt sketch cells, read from memory."""
+    if not analytics_events.has_subscribers():
+        return
+    # cell keys are (location, category, experience, industry)
+    analytics_events.publish("salary", {
+        group_by: salary_sketches.summaries(group_by, {key[index] for key in keys if key[index]})
+        for group_by, index in (('location', 0), ('category', 1))
+    })
 
 
 def update_skill_graph_for_job(job):
-    skills = job.get_skills_list()
-    graph = get_skill_graph()
+    apply_skill_graph_delta(None, job_state(job))
+
+
+def check_skill_graph_consistency(graph=None):
+    """Compare the live graph (default: the active backend) against a full rebuild from the jobs table.
+
+    The rebuild is an InMemorySkillGraph bulk-loaded from the graph columns
+    of every job, the same counts a fresh load uses, so the live graph's
+    create, edit and delete deltas are checked against it. Returns a list of (relationship, source, target, live_count, rebuilt_count)
+    tuples for every edge that disagrees; an empty list means consistent.
+    """
+    rebuilt = InMemorySkillGraph()
+    load_counts(rebuilt, count_rows(db.session.query(*graph_columns()).order_by(Job.id)))
     
-    role = job.job_category or job.job_title
-    industry = job.industry
-    location = job.company_location
+    live_edges = (graph or get_skill_graph()).snapshot()
+    rebuilt_edges = rebuilt.snapshot()
+    mismatches = []
+    for key in sorted(set(live_edges) | set(rebuilt_edges)):
+        live_count = live_edges.get(key, 0)
+        rebuilt_count = rebuilt_edges.get(key, 0)
+        if live_count != rebuilt_count:
+            mismatches.append(key + (live_count, rebuilt_count))
+    return mismatches
+
+
+@bp.route('/api/skill-graph/consistency')
+@query_budget(1)
+def api_skill_graph_consistency():
+    """Check this worker's live graph, e.g. the in-memory one, against a full rebuild."""
+    if not SKILL_GRAPH_CHECK_ENDPOINT:
+        return jsonify({"error": "Set SKILL_GRAPH_CHECK_ENDPOINT=1 to enable this check"}), 404
+    mismatches = check_skill_graph_consistency()
+    return jsonify({
+        "backend": "neo4j" if neo4j_service.is_connected() else "in-memory",
+        "consistent": not mismatches,
+        "mismatches": [{"relationship": relationship, "source": source, "target": target,
+                        "live": live_count, "rebuilt": rebuilt_count}
+                       for relationship, source, target, live_count, rebuilt_count in mismatches],
+    })
+
+
+@bp.cli.command('check-graph')
+def check_graph_command():
+    """Verify the skill graph matches a full rebuild from the jobs table."""
+    init_skill_graph()
+    if not neo4j_service.is_connected():
+        print("The in-memory graph lives in each web worker; with SKILL_GRAPH_CHECK_ENDPOINT=1, "
+              "GET /api/skill-graph/consistency on a worker to check it")
+        return
+    mismatches = check_skill_graph_consistency()
+    for relationship, source, target, live_count, rebuilt_count in mismatches:
+        print(f"{relationship} {source} -> {target}: live={live_count} rebuilt={rebuilt_count}")
+    print(f"{len(mismatches)} mismatched edges")
+
+
+@bp.cli.command('load-synthetic')
+@click.argument('count', type=int)
+@click.option('--seed', default=0, help='Random seed; the same seed yields the same rows.')
+@click.option('--batch-size', default=5000)
+def load_synthetic_command(count, seed, batch_size):
+    """Bulk insert COUNT synthetic jobs fitted to the bundled CSV."""
+    from synthetic_data import generate_synthetic_jobs
+    start = time.perf_counter()
+    jobs = generate_synthetic_jobs(count, seed=seed, job_id_prefix=f"SYN{seed}")
+    total = bulk_load_jobs(jobs, batch_size=batch_size)
+    elapsed = time.perf_counter() - start
+    print(f"Loaded {total} jobs in {elapsed:.1f}s ({total / elapsed:.0f} jobs/s)")
+
+
+@bp.cli.command('rebuild-graph')
+@click.option('--workers', type=int, default=None, help='Counting processes (default: one per core).')
+@click.option('--chunks-per-worker', default=4, help='Id ranges per process, to even out skewed ranges.')
+@click.option('--scaling', is_flag=True, help='Also time the counting phase with 1, 2, 4, ... workers.')
+def rebuild_graph_command(workers, chunks_per_worker, scaling):
+    """Rebuild the skill graph from the jobs table with a process pool."""
+    from sqlalchemy import func
+    init_skill_graph()
+    low, high = db.session.query(func.min(Job.id), func.max(Job.id)).one()
+    if low is None:
+        print("No jobs to count")
+        return
+    database_url = db.engine.url.render_as_string(hide_password=False)
     
-    if hasattr(graph, 'add_role') and role:
-        graph.add_role(role)
-    if hasattr(graph, 'add_industry') and industry:
-        graph.add_industry(industry)
-    if hasattr(graph, 'add_location') and location:
-        graph.add_location(location)
+    if scaling:
+        most = workers or os.cpu_count() or 1
+        baseline = None
+        for n in sorted({min(2 ** i, most) for i in range(most.bit_length() + 1)}):
+            counts, timings = parallel_counts(database_url, low, high, n, chunks_per_worker)
+            seconds = timings["count_seconds"] + timings["merge_seconds"]
+            baseline = baseline or seconds
+            print(f"{n:3d} workers: {counts.jobs / seconds:9.0f} jobs/s ({baseline / seconds:.1f}x)")
     
-    for skill in skills:
-        category = None
-        for cat, cat_skills in SKILLS.items():
-            if skill in cat_skills:
-                category = cat
-                break
-        if hasattr(graph, 'add_skill'):
-            graph.add_skill(skill, category or "Other")
-        elif hasattr(graph, 'create_skill_node'):
-            graph.create_skill_node(skill, category)
-        
-        if hasattr(graph, 'add_role_skill') and role:
-            graph.add_role_skill(role, skill)
-        if hasattr(graph, 'add_industry_skill') and industry:
-            graph.add_industry_skill(industry, skill)
-    
-    if hasattr(graph, 'add_location_role') and location and role:
-        graph.add_location_role(location, role)
-    
-    for skill1, skill2 in combinations(skills, 2):
-        if hasattr(graph, 'add_cooccurrence'):
-            graph.add_cooccurrence(skill1, skill2, job.job_id)
-        elif hasattr(graph, 'create_skill_cooccurrence'):
-            graph.create_skill_cooccurrence(skill1, skill2, job.job_id)
+    start = time.perf_counter()
+    counts, timings = parallel_counts(database_url, low, high, workers, chunks_per_worker)
+    if neo4j_service.is_connected():
+        graph, target = neo4j_service, "Neo4j"
+    else:
+        # the in-memory graph lives in the web process; this only measures the load step
+        graph, target = InMemorySkillGraph(), "a scratch in-memory graph"
+    load_seconds = load_counts(graph, counts)
+    elapsed = time.perf_counter() - start
+    print(f"Counted {counts.jobs} jobs with {timings['workers']} workers over {timings['chunks']} id ranges "
+          f"in {timings['count_seconds']:.2f}s ({counts.jobs / timings['count_seconds']:.0f} jobs/s)")
+    print(f"Merged {len(counts.edges)} edges in {timings['merge_seconds']:.2f}s, "
+          f"loaded into {target} in {load_seconds:.2f}s")
+    print(f"Rebuilt in {elapsed:.2f}s ({counts.jobs / elapsed:.0f} jobs/s)")
+
+
+@bp.cli.command('build-similar-jobs')
+def build_similar_jobs_command():
+    """Recompute the stored similar-jobs list of every posting."""
+    count, seconds = rebuild_similar_jobs()
+    print(f"Stored similar jobs for {count} postings in {seconds:.1f}s ({count / seconds:.0f} jobs/s)")
+
+
+@bp.cli.command('archive-expired')
+@click.option('--before', type=click.DateTime(formats=['%Y-%m-%d']), default=None,
+              help='Archive postings whose application deadline is before this date (default: today).')
+@click.option('--batch-size', default=ARCHIVE_BATCH_SIZE)
+def archive_expired_command(before, batch_size):
+    """Move postings whose application deadline has passed to the jobs_archive table."""
+    init_skill_graph()
+    start = time.perf_counter()
+    total = archive_expired_jobs(before.date() if before else None, batch_size)
+    similar_jobs.join()
+    print(f"Archived {total} expired postings in {time.perf_counter() - start:.1f}s")
@@ -0,0 +1,344 @@
+"""Mergeable salary percentile sketches.
+
+One t-digest is kept per (location, category, experience level, industry)
+cell, so any filter combination is answered by merging the matching cells.
+New jobs are added to their cell directly. Edits and deletes cannot be
+subtracted from a t-digest, and a cached digest may miss other workers'
+writes, so a job write only marks its cells stale. A background thread then
+rebuilds them from the jobs table, which also keeps the SQL off the request
+path; a read that finds a cell still stale rebuilds it first. Cells are
+persisted in the salary_sketches table and each worker re-reads rows updated
+since its last sync before answering. A rebuild locks the cells' rows before
+it reads the jobs table (FOR UPDATE, where supported), so concurrent
+rebuilds in several workers cannot store an older result over a newer one.
+Bulk loaders that bypass job_written() call mark_stale() for the cells they
+touched. Once the thread has rebuilt a batch it calls on_rebuilt(keys), e.g.
+to push the fresh aggregates to live dashboards from memory. Sketch reads always use the primary so a lagging replica cannot
+hide rows from that sync.
+"""
+import json
+import math
+import logging
+import threading
+from bisect import bisect_left
+from datetime import datetime
+
+from flask import current_app
+from sqlalchemy import func, insert, tuple_, update
+
+from app import db
+from models import Job, SalarySketch
+from replica import primary
+
+logger = logging.getLogger(__name__)
+
+COMPRESSION = 100
+KEY_CHUNK = 1000
+DIMENSIONS = {
+    "location": "company_location",
+    "category": "job_category",
+    "experience": "experience_level",
+    "industry": "industry",
+}
+
+
+class TDigest:
+    """Merging t-digest (Dunning) with the k1 arcsine scale function."""
+
+    def __init__(self, compression=COMPRESSION):
+        self.compression = compression
+        self.means = []
+        self.weights = []
+        self._buffer = []
+        self.count = 0
+        self.total = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def add(self, value, weight=1):
+        self._buffer.append((value, weight))
+        self.count += weight
+        self.total += value * weight
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+        if len(self._buffer) > self.compression * 5:
+            self.compress()
+
+    def merge(self, other):
+        other.compress()
+        self._buffer.extend(zip(other.means, other.weights))
+        self.count += other.count
+        self.total += other.total
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        if len(self._buffer) > self.compression * 5:
+            self.compress()
+        return self
+
+    def _k(self, q):
+        return self.compression / (2 * math.pi) * math.asin(2 * q - 1)
+
+    def _k_inverse(self, k):
+        return (math.sin(k * 2 * math.pi / self.compression) + 1) / 2
+
+    def compress(self):
+        if not self._buffer:
+            return
+        points = sorted(list(zip(self.means, self.weights)) + self._buffer)
+        self._buffer = []
+        total = sum(w for _, w in points)
+        means, weights = [], []
+        q0 = 0.0
+        q_limit = self._k_inverse(self._k(q0) + 1)
+        mean, weight = points[0]
+        for next_mean, next_weight in points[1:]:
+            if q0 + (weight + next_weight) / total <= q_limit:
+                weight += next_weight
+                mean += (next_mean - mean) * next_weight / weight
+            else:
+                means.append(mean)
+                weights.append(weight)
+                q0 += weight / total
+                q_limit = self._k_inverse(min(self._k(q0) + 1, self.compression / 4))
+                mean, weight = next_mean, next_weight
+        means.append(mean)
+        weights.append(weight)
+        self.means, self.weights = means, weights
+
+    def quantile(self, q):
+        self.compress()
+        if not self.count:
+            return None
+        if len(self.means) == 1:
+            return self.means[0]
+        target = q * self.count
+        centers = []
+        cumulative = 0
+        for w in self.weights:
+            centers.append(cumulative + w / 2)
+            cumulative += w
+        if target <= centers[0]:
+            return self.min + (self.means[0] - self.min) * target / centers[0]
+        if target >= centers[-1]:
+            tail = self.count - centers[-1]
+            return self.means[-1] + (self.max - self.means[-1]) * (target - centers[-1]) / tail if tail else self.max
+        i = bisect_left(centers, target)
+        left, right = centers[i - 1], centers[i]
+        return self.means[i - 1] + (self.means[i] - self.means[i - 1]) * (target - left) / (right - left)
+
+    def to_dict(self):
+        self.compress()
+        return {"means": self.means, "weights": self.weights, "count": self.count,
+                "total": self.total, "min": self.min, "max": self.max}
+
+    @classmethod
+    def from_dict(cls, data, compression=COMPRESSION):
+        digest = cls(compression)
+        digest.means = data["means"]
+        digest.weights = data["weights"]
+        digest.count = data["count"]
+        digest.total = data["total"]
+        digest.min = data["min"]
+        digest.max = data["max"]
+        return digest
+
+
+def cell_for_state(state):
+    return (state["location"] or "", state["job_category"] or "",
+            state["experience_level"] or "", state["industry"] or "")
+
+
+def cell_for_job(job):
+    """The cell of a job dict keyed by column name, as passed to bulk_load_jobs()."""
+    return tuple(job.get(column) or "" for column in DIMENSIONS.values())
+
+
+class SalarySketchStore:
+    def __init__(self):
+        self.cells = {}
+        self.stale = set()
+        self._last_sync = None
+        self._lock = threading.RLock()
+        self._pending = set()
+        self._queue_lock = threading.Lock()
+        self._thread = None
+        self.on_rebuilt = None
+
+    @staticmethod
+    def _stored_ids(keys, for_update=False):
+        """{key: row id} of the stored cells among `keys`, optionally locking their rows."""
+        keys = list(keys)
+        existing = {}
+        for start in range(0, len(keys), KEY_CHUNK):
+            query = SalarySketch.query.filter(
+                tuple_(SalarySketch.company_location, SalarySketch.job_category,
+                       SalarySketch.experience_level, SalarySketch.industry).in_(keys[start:start + KEY_CHUNK]))
+            if for_update:
+                query = query.with_for_update()
+            existing.update(((r.company_location, r.job_category, r.experience_level, r.industry), r.id)
+                            for r in query)
+        return existing
+
+    def _persist(self, keys, stale=False, replace_all=False, existing=None):
+        now = datetime.utcnow()
+        if replace_all:
+            existing = {}
+        elif existing is None:
+            existing = self._stored_ids(keys)
+        updates, inserts = [], []
+        for key in keys:
+            digest = self.cells.get(key) or TDigest()
+            values = {"data": json.dumps(digest.to_dict()), "stale": stale, "updated_at": now}
+            if key in existing:
+                updates.append({"id": existing[key], **values})
+            else:
+                inserts.append(dict(zip(("company_location", "job_category", "experience_level", "industry"), key),
+                                    **values))
+        if updates:
+            db.session.execute(update(SalarySketch), updates)
+        if inserts:
+            db.session.execute(insert(SalarySketch), inserts)
+        db.session.commit()
+        if replace_all:
+            self._last_sync = now
+
+    def sync(self):
+        """Pick up cells written by this or any other worker since the last sync."""
+        query = SalarySketch.query
+        if self._last_sync is not None:
+            query = query.filter(SalarySketch.updated_at > self._last_sync)
+        for row in query:
+            key = (row.company_location, row.job_category, row.experience_level, row.industry)
+            self.cells[key] = TDigest.from_dict(json.loads(row.data))
+            if row.stale:
+                self.stale.add(key)
+            else:
+                self.stale.discard(key)
+            if self._last_sync is None or row.updated_at > self._last_sync:
+                self._last_sync = row.updated_at
+        if self._last_sync is None:
+            self._last_sync = datetime.utcnow()
+
+    def rebuild(self, keys=None):
+        """Recompute cells from the jobs table: all of them, or only the given keys."""
+        columns = (Job.company_location, Job.job_category, Job.experience_level, Job.industry)
+        with self._lock:
+            # lock the stored rows first, so the jobs read below sees every write committed before
+            existing = self._stored_ids(keys, for_update=True) if keys is not None else None
+            query = db.session.query(*columns, Job.salary_usd).filter(Job.salary_usd.isnot(None))
+            if keys is not None:
+                query = query.filter(tuple_(*(func.coalesce(c, "") for c in columns)).in_(list(keys)))
+            cells = {key: TDigest() for key in keys} if keys is not None else {}
+            for location, category, experience, industry, salary in query:
+                key = (location or "", category or "", experience or "", industry or "")
+                cells.setdefault(key, TDigest()).add(salary)
+            if keys is None:
+                SalarySketch.query.delete()
+                self.cells = {}
+            self.cells.update(cells)
+            self.stale.difference_update(cells)
+            self._persist(list(cells), replace_all=keys is None, existing=existing)
+
+    def mark_stale(self, keys):
+        """Flag cells stale for every worker, e.g. after a bulk load that bypassed record()."""
+        keys = set(keys)
+        # with nothing stored yet, the first read rebuilds every cell anyway
+        if not keys or db.session.query(SalarySketch.id).first() is None:
+            return
+        with self._lock:
+            self.stale.update(keys)
+            self._persist(list(keys), stale=True)
+
+    def ensure_loaded(self):
+        """Load persisted cells on first use; returns True if they had to be rebuilt."""
+        if self._last_sync is not None:
+            return False
+        self.sync()
+        if not self.cells:
+            self.rebuild()
+            return True
+        return False
+
+    def record(self, old_state, new_state):
+        """Mark the cells a job write touches stale and queue their rebuild; runs no SQL."""
+        keys = {cell_for_state(s) for s in (old_state, new_state) if s is not None}
+        self.stale.update(keys)
+        with self._queue_lock:
+            self._pending.update(keys)
+            if self._thread and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._run, args=(current_app._get_current_object(),),
+                                            name="salary-sketches", daemon=True)
+            self._thread.start()
+
+    def _run(self, app):
+        with app.app_context(), primary():
+            while True:
+                with self._queue_lock:
+                    keys, self._pending = self._pending, set()
+                    if not keys:
+                        self._thread = None
+                        return
+                try:
+                    self.rebuild(keys)
+                except Exception as e:
+                    db.session.rollback()
+                    self.stale.update(keys)
+                    logger.error(f"Error rebuilding salary sketches: {e}")
+                    continue
+                finally:
+                    db.session.remove()
+                if self.on_rebuilt is not None:
+                    try:
+                        self.on_rebuilt(keys)
+                    except Exception as e:
+                        logger.error(f"Error publishing rebuilt salary sketches: {e}")
+
+    def join(self, timeout=None):
+        thread = self._thread
+        if thread:
+            thread.join(timeout)
+
+    def query(self, group_by="location", filters=None, percentiles=(50,)):
+        """Merge matching cells per group and read percentiles from the merged digest."""
+        group_index = list(DIMENSIONS).index(group_by)
+        filter_values = [(list(DIMENSIONS).index(dim), value) for dim, value in (filters or {}).items() if value]
+        with self._lock, primary():
+            if not self.ensure_loaded():
+                self.sync()
+            if self.stale:
+                self.rebuild(set(self.stale))
+            groups = {}
+            for key, digest in self.cells.items():
+                if not digest.count or any(key[i] != value for i, value in filter_values):
+                    continue
+                groups.setdefault(key[group_index], TDigest()).merge(digest)
+
+        data = []
+        for label, digest in groups.items():
+            if not label:
+                continue
+            data.append({
+                "label": label,
+                "avg": round(digest.total / digest.count),
+                "min": digest.min,
+                "max": digest.max,
+                "count": digest.count,
+                "percentiles": {f"p{p:g}": round(digest.quantile(p / 100)) for p in percentiles},
+            })
+        return data
+
+    def summaries(self, group_by, labels):
+        """{label: avg/min/max/count, or None if empty} from the cells held in memory; runs no SQL."""
+        group_index = list(DIMENSIONS).index(group_by)
+        groups = dict.fromkeys(labels)
+        with self._lock:
+            for key, digest in self.cells.items():
+                if digest.count and key[group_index] in groups:
+                    merged = groups[key[group_index]] = groups[key[group_index]] or TDigest()
+                    merged.merge(digest)
+        return {label: digest and {"avg": round(digest.total / digest.count), "min": digest.min,
+                                   "max": digest.max, "count": digest.count}
+                for label, digest in groups.items()}
+
+salary_sketches = SalarySketchStore()
@@ -0,0 +1,327 @@
+"""Stratified reservoir samples of jobs for approximate analytics.
+
+The `approx=1` mode of the skill frequency, salary distribution and
+industry skills views reads a sample instead of the jobs table. Jobs are
+stratified by industry: each stratum keeps its exact job count and a
+uniform reservoir of up to APPROX_SAMPLE_SIZE of its jobs. The sample is
+built with one scan (reservoir sampling, Algorithm R) and then kept in sync
+from job_written(). Inserts and deletes use random pairing (Gemulla, Lehner
+and Haas), so a reservoir remains a uniform sample of its stratum without
+rescans. Deletes can shrink a reservoir, though. Once one falls below
+APPROX_MIN_FILL of its target while its stratum is larger, the sample is
+rebuilt on the next read.
+
+Totals are estimated per stratum as N_h times the sample mean. Averages
+are estimated as ratios of two totals. Both come with a normal-approximation
+confidence interval (APPROX_CONFIDENCE, default 95%) that includes the
+finite population correction, so a stratum sampled in full contributes no
+error. Like the other derived structures, the sample is per process.
+"""
+import math
+import os
+import random
+import threading
+from bisect import bisect_left, insort
+from collections import Counter, defaultdict, namedtuple
+from statistics import NormalDist
+
+APPROX_SAMPLE_SIZE = int(os.environ.get("APPROX_SAMPLE_SIZE", 1000))
+APPROX_CONFIDENCE = float(os.environ.get("APPROX_CONFIDENCE", 0.95))
+APPROX_MIN_FILL = 0.5
+
+SampledJob = namedtuple("SampledJob", "id skills experience location category salary")
+
+
+def sampled_job(state):
+    """A SampledJob from a routes.job_state() dict."""
+    return SampledJob(state["id"], state["skills"], state["experience_level"], state["location"],
+                      state["job_category"], state["salary_usd"])
+
+
+class Stratum:
+    """Exact job count and a uniform reservoir for one industry.
+
+    The sums the estimators need are kept current as rows enter and leave
+    the reservoir, so queries do not walk its rows: skill mentions per
+    experience level, and per (field, location or category) the sampled
+    postings with a salary, their salary sum and sum of squares, and the
+    sampled salaries in order for the minimum and maximum.
+    """
+    __slots__ = ("population", "rows", "positions", "deleted_inside", "deleted_outside", "skills", "salaries",
+                 "salary_values")
+
+    def __init__(self):
+        self.population = 0
+        self.rows = []
+        self.positions = {}
+        # deletions not yet compensated by inserts, from inside and outside the reservoir
+        self.deleted_inside = 0
+        self.deleted_outside = 0
+        self.skills = defaultdict(Counter)
+        self.salaries = defaultdict(lambda: [0, 0, 0])
+        self.salary_values = defaultdict(list)
+
+    def _tally(self, row, sign):
+        counts = self.skills[row.experience]
+        for skill in row.skills:
+            counts[skill] += sign
+        if row.salary is None:
+            return
+        for field, label in (("location", row.location), ("category", row.category)):
+            if label:
+                cell = self.salaries[field, label]
+                cell[0] += sign
+                cell[1] += sign * row.salary
+                cell[2] += sign * row.salary * row.salary
+                values = self.salary_values[field, label]
+                if sign > 0:
+                    insort(values, row.salary)
+                else:
+                    del values[bisect_left(values, row.salary)]
+
+    def _append(self, row):
+        self.positions[row.id] = len(self.rows)
+        self.rows.append(row)
+        self._tally(row, 1)
+
+    def insert(self, row, target, rng):
+        self.population += 1
+        pending = self.deleted_inside + self.deleted_outside
+        if pending:
+            if rng.random() < self.deleted_inside / pending:
+                self._append(row)
+                self.deleted_inside -= 1
+            else:
+                self.deleted_outside -= 1
+        elif len(self.rows) < target:
+            self._append(row)
+        elif rng.random() < target / self.population:
+            slot = rng.randrange(len(self.rows))
+            self._tally(self.rows[slot], -1)
+            del self.positions[self.rows[slot].id]
+            self.rows[slot] = row
+            self.positions[row.id] = slot
+            self._tally(row, 1)
+
+    def delete(self, job_id):
+        self.population -= 1
+        slot = self.positions.pop(job_id, None)
+        if slot is None:
+            self.deleted_outside += 1
+            return
+        self._tally(self.rows[slot], -1)
+        last = self.rows.pop()
+        if slot < len(self.rows):
+            self.rows[slot] = last
+            self.positions[last.id] = slot
+        self.deleted_inside += 1
+
+    def update(self, row):
+        slot = self.positions.get(row.id)
+        if slot is not None:
+            self._tally(self.rows[slot], -1)
+            self.rows[slot] = row
+            self._tally(row, 1)
+
+    def skill_counts(self, experience=None):
+        if experience:
+            return self.skills.get(experience, Counter())
+        counts = Counter()
+        for by_skill in self.skills.values():
+            counts.update(by_skill)
+        return counts
+
+    def weight(self):
+        """(N_h, n_h, N_h^2 (1 - n_h/N_h) / n_h), the scale of a total and of its variance."""
+        n = len(self.rows)
+        return self.population, n, self.population ** 2 * (1 - n / self.population) / n
+
+
+class Estimate:
+    """A stratified total accumulated from per-stratum sums of y and y^2."""
+    __slots__ = ("total", "variance", "observed")
+
+    def __init__(self):
+        self.total = 0.0
+        self.variance = 0.0
+        self.observed = 0.0
+
+    def add(self, stratum, s1, s2):
+        population, n, scale = stratum.weight()
+        self.total += population * s1 / n
+        self.observed += s1
+        if n > 1:
+            self.variance += scale * max(0.0, s2 - s1 * s1 / n) / (n - 1)
+
+    def interval(self, z, ceiling=math.inf):
+        """(estimate, low, high); never below what the sample itself contains."""
+        margin = z * math.sqrt(self.variance)
+        return (self.total, max(self.observed, self.total - margin), min(ceiling, self.total + margin))
+
+
+def z_score(confidence=APPROX_CONFIDENCE):
+    return NormalDist().inv_cdf(0.5 + confidence / 2)
+
+
+class JobSample:
+    def __init__(self, size=APPROX_SAMPLE_SIZE, seed=None):
+        self.size = size
+        self.strata = defaultdict(Stratum)
+        self._rng = random.Random(seed)
+        self._built = False
+        self._lock = threading.RLock()
+
+    def build(self, rows):
+        """Build from projection rows with id, industry, experience_level, company_location,
+        job_category, salary_usd and required_skills."""
+        strata = defaultdict(Stratum)
+        for row in rows:
+            job = SampledJob(row.id, tuple(s for s in row.skills if s), row.experience_level,
+                             row.company_location, row.job_category, row.salary_usd)
+            strata[row.industry].insert(job, self.size, self._rng)
+        with self._lock:
+            self.strata = strata
+            self._built = True
+
+    def invalidate(self):
+        self._built = False
+
+    def ensure_built(self, load_rows):
+        if self._built:
+            return
+        with self._lock:
+            if not self._built:
+                self.build(load_rows())
+
+    def record(self, old_state, new_state):
+        """Apply one job write; skipped until the sample is first built."""
+        with self._lock:
+            if not self._built:
+                return
+            if old_state and new_state and old_state["industry"] == new_state["industry"]:
+                self.strata[new_state["industry"]].update(sampled_job(new_state))
+                return
+            if old_state:
+                stratum = self.strata[old_state["industry"]]
+                stratum.delete(old_state["id"])
+                if stratum.population > len(stratum.rows) and len(stratum.rows) < self.size * APPROX_MIN_FILL:
+                    self._built = False
+                if not stratum.population:
+                    del self.strata[old_state["industry"]]
+            if new_state:
+                self.strata[new_state["industry"]].insert(sampled_job(new_state), self.size, self._rng)
+
+    def _sampled(self, industry=None):
+        if industry:
+            strata = [self.strata[industry]] if industry in self.strata else []
+        else:
+            strata = self.strata.values()
+        return [s for s in strata if s.rows]
+
+    @staticmethod
+    def _summary(strata):
+        return {
+            "sample_size": sum(len(s.rows) for s in strata),
+            "population": sum(s.population for s in strata),
+            "confidence": APPROX_CONFIDENCE,
+        }
+
+    def skill_frequency(self, industry=None, experience=None, limit=20):
+        """Estimated postings per skill, top `limit`, like /api/skill-frequency.
+
+        Returns (result, summary of the strata read).
+        """
+        z = z_score()
+        with self._lock:
+            strata = self._sampled(industry)
+            estimates = defaultdict(Estimate)
+            for stratum in strata:
+                for skill, count in stratum.skill_counts(experience).items():
+                    # a skill is listed at most once per job in practice, so y^2 == y
+                    if count > 0:
+                        estimates[skill].add(stratum, count, count)
+            summary = self._summary(strata)
+        ceiling = summary["population"]
+        ranked = sorted(((skill, e.interval(z, ceiling)) for skill, e in estimates.items()),
+                        key=lambda item: item[1][0], reverse=True)[:limit]
+        return {
+            "labels": [skill for skill, _ in ranked],
+            "data": [round(total) for _, (total, _, _) in ranked],
+            "data_ci": [[math.floor(low), math.ceil(high)] for _, (_, low, high) in ranked],
+        }, summary
+
+    def industry_skills(self, limit=5):
+        """Estimated top skills per industry, like /api/industry-skills; returns (result, summary)."""
+        z = z_score()
+        formatted = []
+        with self._lock:
+            for industry, stratum in self.strata.items():
+                if not industry or not stratum.rows:
+                    continue
+                skills = []
+                for skill, count in stratum.skill_counts().items():
+                    if count <= 0:
+                        continue
+                    estimate = Estimate()
+                    estimate.add(stratum, count, count)
+                    skills.append((skill, estimate.interval(z, stratum.population)))
+                skills.sort(key=lambda item: item[1][0], reverse=True)
+                formatted.append({
+                    "industry": industry,
+                    "skills": [{"name": skill, "count": round(total), "count_ci": [math.floor(low), math.ceil(high)]}
+                               for skill, (total, low, high) in skills[:limit]],
+                })
+            summary = self._summary(self._sampled())
+        return sorted(formatted, key=lambda x: x["industry"]), summary
+
+    def salary_distribution(self, group_by="location"):
+        """Estimated salary count and average per location or category, like /api/salary-distribution.
+
+        min and max are the extremes seen in the sample. Returns (result, summary).
+        """
+        z = z_score()
+        field = "location" if group_by == "location" else "category"
+        groups = defaultdict(lambda: {"strata": [], "min": None, "max": None})
+        with self._lock:
+            strata = self._sampled()
+            for stratum in strata:
+                for (cell_field, label), cell in stratum.salaries.items():
+                    if cell_field != field or cell[0] <= 0:
+                        continue
+                    values = stratum.salary_values[cell_field, label]
+                    group = groups[label]
+                    group["strata"].append((stratum, *cell))
+                    group["min"] = values[0] if group["min"] is None else min(group["min"], values[0])
+                    group["max"] = values[-1] if group["max"] is None else max(group["max"], values[-1])
+            summary = self._summary(strata)
+
+        data = []
+        for label, group in groups.items():
+            count, salary = Estimate(), Estimate()
+            for stratum, x, y, yy in group["strata"]:
+                count.add(stratum, x, x)
+                salary.add(stratum, y, yy)
+            average = salary.total / count.total
+            # ratio estimator: linearized residuals d = y - R x, summed per stratum
+            variance = 0.0
+            for stratum, x, y, yy in group["strata"]:
+                _, n, scale = stratum.weight()
+                if n > 1:
+                    d1 = y - average * x
+                    d2 = yy - 2 * average * y + average * average * x
+                    variance += scale * max(0.0, d2 - d1 * d1 / n) / (n - 1)
+            margin = z * math.sqrt(variance) / count.total
+            total, low, high = count.interval(z, summary["population"])
+            data.append({
+                "label": label,
+                "avg": round(average),
+                "avg_ci": [round(average - margin), round(average + margin)],
+                "min": group["min"],
+                "max": group["max"],
+                "count": round(total),
+                "count_ci": [math.floor(low), math.ceil(high)],
+            })
+        return sorted(data, key=lambda x: x["avg"], reverse=True), summary
+
+
+job_sample = JobSample()
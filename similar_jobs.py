@@ -0,0 +1,324 @@
+"""Precomputed "similar jobs" lists for the job detail page.
+
+A job's similarity to another is a weighted sum of skill Jaccard
+(SKILL_WEIGHT), salary band proximity (SALARY_WEIGHT: 1 in the same
+SALARY_BAND-wide band, 0.5 in an adjacent one) and same company location
+(LOCATION_WEIGHT). Only jobs sharing at least one skill are candidates. The
+top SIMILAR_JOBS_K neighbours of every job are stored in the similar_jobs
+table, so the detail page reads its list with one indexed query.
+
+Scores are computed with numpy over a dense job x skill matrix, a block of
+rows at a time. After a job write, refresh() recomputes only the lists the
+change can touch: the written job's own list, lists that contained it, and
+lists whose current k-th score it now beats. The score is symmetric, so the
+written job's row of scores answers the last question for every job at
+once, and only the jobs sharing a skill with it need their k-th score read.
+Writes are queued and processed on a background thread, which keeps the
+vectors resident and patches the written jobs' rows in place. Writes
+handled by other workers reach it through invalidate() (see
+data_versions), which makes the next refresh reload every job.
+"""
+import logging
+import os
+import threading
+import time
+
+from sqlalchemy import delete, func, insert, select
+
+from app import db
+from models import Job, SimilarJob
+from projections import project
+from replica import primary
+
+logger = logging.getLogger(__name__)
+
+SIMILAR_JOBS_K = int(os.environ.get("SIMILAR_JOBS_K", 10))
+SKILL_WEIGHT = 0.6
+SALARY_WEIGHT = 0.25
+LOCATION_WEIGHT = 0.15
+SALARY_BAND = 25000
+# rows per scoring block are chosen so one block holds about this many scores
+BLOCK_SCORES = 500_000
+ID_CHUNK = 500
+
+
+class JobVectors:
+    """The fields similarity reads, for every job, as arrays indexed by row."""
+
+    def __init__(self, rows):
+        import numpy as np
+        self.skill_columns, self.location_codes = {}, {}
+        ids, bands, locations = [], [], []
+        positions, indices = [], []
+        for row in rows:
+            ids.append(row.id)
+            columns, band, location = self._encode(row)
+            positions.extend([len(ids) - 1] * len(columns))
+            indices.extend(columns)
+            bands.append(band)
+            locations.append(location)
+        self.ids = np.array(ids, dtype=np.int64)
+        self.row = {job_id: i for i, job_id in enumerate(ids)}
+        # dense: the skill vocabulary is small, and BLAS beats sparse products at this density
+        self.skills = np.zeros((len(ids), len(self.skill_columns)), dtype=np.float32)
+        self.skills[positions, indices] = 1
+        self.sizes = self.skills.sum(axis=1)
+        # a missing band is NaN, which is never within one band of anything
+        self.bands = np.array(bands, dtype=np.float32)
+        self.locations = np.array(locations, dtype=np.int32)
+
+    def _encode(self, row):
+        """(skill columns, salary band, location code) for a row, growing the vocabularies as needed."""
+        import numpy as np
+        columns = [self.skill_columns.setdefault(skill, len(self.skill_columns))
+                   for skill in {skill for skill in row.skills if skill}]
+        band = np.nan if row.salary_usd is None else row.salary_usd // SALARY_BAND
+        location = row.company_location
+        code = -1 if not location else self.location_codes.setdefault(location, len(self.location_codes))
+        return columns, band, code
+
+    def patch(self, rows, removed=()):
+        """Overwrite or append the jobs in `rows` and drop the ids in `removed`."""
+        import numpy as np
+        gone = [self.row[job_id] for job_id in removed if job_id in self.row]
+        if gone:
+            self.ids = np.delete(self.ids, gone)
+            self.skills = np.delete(self.skills, gone, axis=0)
+            self.sizes = np.delete(self.sizes, gone)
+            self.bands = np.delete(self.bands, gone)
+            self.locations = np.delete(self.locations, gone)
+            self.row = {int(job_id): i for i, job_id in enumerate(self.ids)}
+
+        encoded = [(row.id, self._encode(row)) for row in rows]
+        width = len(self.skill_columns)
+        if width > self.skills.shape[1]:
+            grown = np.zeros((len(self.ids), width), dtype=np.float32)
+            grown[:, :self.skills.shape[1]] = self.skills
+            self.skills = grown
+        added = [job_id for job_id, _ in encoded if job_id not in self.row]
+        if added:
+            count = len(added)
+            self.row.update((job_id, len(self.ids) + i) for i, job_id in enumerate(added))
+            self.ids = np.concatenate([self.ids, np.array(added, dtype=np.int64)])
+            self.skills = np.vstack([self.skills, np.zeros((count, width), dtype=np.float32)])
+            self.sizes = np.concatenate([self.sizes, np.zeros(count, dtype=self.sizes.dtype)])
+            self.bands = np.concatenate([self.bands, np.full(count, np.nan, dtype=np.float32)])
+            self.locations = np.concatenate([self.locations, np.full(count, -1, dtype=np.int32)])
+        for job_id, (columns, band, location) in encoded:
+            r = self.row[job_id]
+            self.skills[r] = 0
+            self.skills[r, columns] = 1
+            self.sizes[r] = len(columns)
+            self.bands[r] = band
+            self.locations[r] = location
+
+    def scores(self, rows):
+        """len(rows) x all-jobs similarity matrix; negative where no skill is shared."""
+        import numpy as np
+        shared = self.skills[rows] @ self.skills.T
+        # union is at least 1 wherever shared is, and other entries end up negative
+        union = np.maximum(self.sizes[rows][:, None] + self.sizes[None, :] - shared, 1)
+        score = shared / union
+        score *= SKILL_WEIGHT
+
+        # 1 in the same band, 0.5 in an adjacent one, 0 otherwise (fmax drops the NaN of a missing band)
+        gap = np.abs(self.bands[rows][:, None] - self.bands[None, :])
+        score += np.fmax(2 - gap, 0) * (SALARY_WEIGHT / 2)
+
+        # -2 on the row side so two missing locations never match
+        locations = np.where(self.locations[rows] < 0, -2, self.locations[rows])
+        score += (locations[:, None] == self.locations[None, :]) * np.float32(LOCATION_WEIGHT)
+
+        # rounded so equal scores reached by different sums tie exactly and fall back to id order
+        np.round(score, 6, out=score)
+        # arithmetic rather than a masked assignment, which is slow on a scattered mask
+        score -= (shared == 0) * np.float32(2)
+        score[np.arange(len(rows)), rows] = -1
+        return score
+
+    def block_size(self):
+        return max(1, BLOCK_SCORES // max(len(self.ids), 1))
+
+    def top_k(self, rows, k=SIMILAR_JOBS_K):
+        """{job id: [(neighbour id, score), ...]} for the given rows, best first, ties by id."""
+        import numpy as np
+        result = {}
+        step = self.block_size()
+        for start in range(0, len(rows), step):
+            block = np.asarray(rows[start:start + step])
+            score = self.scores(block)
+            wanted = min(k, score.shape[1])
+            if wanted == 0:
+                result.update((int(self.ids[r]), []) for r in block)
+                continue
+            # argpartition cuts ties at the k-th score arbitrarily, so keep every tied column
+            kth = -np.partition(-score, wanted - 1, axis=1)[:, wanted - 1]
+            for i, r in enumerate(block):
+                # a positive score means a shared skill
+                columns = np.flatnonzero((score[i] >= kth[i]) & (score[i] > 0))
+                columns = columns[np.lexsort((self.ids[columns], -score[i, columns]))][:k]
+                result[int(self.ids[r])] = [(int(self.ids[c]), round(float(score[i, c]), 6)) for c in columns]
+        return result
+
+
+VECTOR_COLUMNS = (Job.id, Job.required_skills, Job.salary_usd, Job.company_location)
+
+
+def load_vectors():
+    with primary():
+        return JobVectors(project(*VECTOR_COLUMNS, order_by=[Job.id]))
+
+
+def patch_vectors(vectors, job_ids):
+    """Reread job_ids into resident vectors; ids no longer in the jobs table are dropped."""
+    with primary():
+        rows = [row for chunk in chunks(job_ids) for row in project(*VECTOR_COLUMNS, where=[Job.id.in_(chunk)])]
+    found = {row.id for row in rows}
+    vectors.patch(rows, removed=[job_id for job_id in job_ids if job_id not in found])
+
+
+def chunks(ids):
+    ids = list(ids)
+    for start in range(0, len(ids), ID_CHUNK):
+        yield ids[start:start + ID_CHUNK]
+
+
+def store_lists(lists, remove=(), replace_all=False):
+    """Replace the stored lists of lists' keys and drop those of `remove` (or every list)."""
+    if replace_all:
+        db.session.execute(delete(SimilarJob))
+    else:
+        for chunk in chunks(set(lists) | set(remove)):
+            db.session.execute(delete(SimilarJob).where(SimilarJob.job_id.in_(chunk)))
+    rows = [{"job_id": job_id, "neighbor_id": neighbor_id, "rank": rank, "score": score}
+            for job_id, neighbors in lists.items()
+            for rank, (neighbor_id, score) in enumerate(neighbors)]
+    for start in range(0, len(rows), 5000):
+        db.session.execute(insert(SimilarJob), rows[start:start + 5000])
+    db.session.commit()
+
+
+def rebuild_all(k=SIMILAR_JOBS_K):
+    """Recompute every list; returns (jobs, seconds)."""
+    start = time.perf_counter()
+    vectors = load_vectors()
+    lists = vectors.top_k(list(range(len(vectors.ids))), k)
+    store_lists(lists, replace_all=True)
+    return len(lists), time.perf_counter() - start
+
+
+def refresh(job_ids, k=SIMILAR_JOBS_K, vectors=None):
+    """Recompute the lists a write to job_ids can change; returns the number recomputed.
+
+    `vectors` are resident vectors to patch with the written jobs; without
+    them every job is loaded.
+    """
+    import numpy as np
+    job_ids = list(job_ids)
+    if vectors is None:
+        vectors = load_vectors()
+    else:
+        patch_vectors(vectors, job_ids)
+
+    present = [vectors.row[job_id] for job_id in job_ids if job_id in vectors.row]
+    # scores are symmetric, so the written jobs' rows say whose lists they can enter:
+    # those of jobs sharing a skill with them (a positive score)
+    scores, candidates = [], set()
+    step = vectors.block_size()
+    for start in range(0, len(present), step):
+        score = vectors.scores(np.asarray(present[start:start + step]))
+        shares = (score > 0).any(axis=0)
+        scores.append((score, shares))
+        candidates.update(int(job_id) for job_id in vectors.ids[shares])
+
+    with primary():
+        containing = set(db.session.scalars(
+            select(SimilarJob.job_id).where(SimilarJob.neighbor_id.in_(job_ids))))
+        thresholds = {}
+        for chunk in chunks(candidates):
+            thresholds.update(db.session.execute(
+                select(SimilarJob.job_id, func.min(SimilarJob.score))
+                .where(SimilarJob.job_id.in_(chunk))
+                .group_by(SimilarJob.job_id).having(func.count() >= k)).all())
+
+    affected = {int(vectors.ids[r]) for r in present}
+    affected.update(job_id for job_id in containing if job_id in vectors.row)
+    for score, shares in scores:
+        columns = np.flatnonzero(shares)
+        # a list with fewer than k entries admits any candidate
+        kth = np.array([thresholds.get(int(job_id), -np.inf) for job_id in vectors.ids[columns]])
+        admitted = ((score[:, columns] > 0) & (score[:, columns] >= kth[None, :] - 1e-6)).any(axis=0)
+        affected.update(int(job_id) for job_id in vectors.ids[columns[admitted]])
+
+    lists = vectors.top_k([vectors.row[job_id] for job_id in sorted(affected)], k)
+    store_lists(lists, remove=[job_id for job_id in job_ids if job_id not in vectors.row])
+    return len(lists)
+
+
+class SimilarJobsRefresher:
+    """Queue of written job ids, drained by a background thread.
+
+    enqueue(app, None) asks for a full rebuild instead (e.g. after /init-data).
+    The thread keeps the job vectors between refreshes; invalidate() makes
+    it reload them.
+    """
+
+    def __init__(self):
+        self._pending = set()
+        self._rebuild = False
+        self._reload = False
+        self._vectors = None
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def invalidate(self):
+        with self._lock:
+            self._reload = True
+
+    def enqueue(self, app, job_ids):
+        with self._lock:
+            if job_ids is None:
+                self._rebuild = True
+            else:
+                self._pending.update(job_ids)
+            if self._thread and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._run, args=(app,), name="similar-jobs", daemon=True)
+            self._thread.start()
+
+    def _run(self, app):
+        with app.app_context():
+            while True:
+                with self._lock:
+                    job_ids, self._pending = self._pending, set()
+                    rebuild, self._rebuild = self._rebuild, False
+                    reload, self._reload = self._reload, False
+                    if not job_ids and not rebuild:
+                        self._thread = None
+                        return
+                if rebuild or reload:
+                    self._vectors = None
+                try:
+                    if rebuild:
+                        count, seconds = rebuild_all()
+                        logger.info(f"Rebuilt similar job lists for {count} jobs in {seconds:.1f}s")
+                    else:
+                        if self._vectors is None:
+                            self._vectors = load_vectors()
+                        count = refresh(job_ids, vectors=self._vectors)
+                        logger.debug(f"Refreshed {count} similar job lists for {len(job_ids)} written jobs")
+                except Exception as e:
+                    # a half-applied patch cannot be trusted
+                    self._vectors = None
+                    db.session.rollback()
+                    logger.error(f"Error refreshing similar jobs: {e}")
+                finally:
+                    db.session.remove()
+
+    def join(self, timeout=None):
+        thread = self._thread
+        if thread:
+            thread.join(timeout)
+
+
+similar_jobs = SimilarJobsRefresher()
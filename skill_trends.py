@@ -0,0 +1,207 @@
+"""Rollup cube of skill mentions for the skill trends chart.
+
+Counts are kept per (time bucket, skill, industry, experience level,
+location). The finest level is the posting day; week and month buckets are
+rolled up from days and quarters from months, and every level is kept
+materialized so a slice at any granularity reads only the cells in its
+date range. Each level maps bucket -> {(skill, industry, experience,
+location): count}, with the buckets in a sorted list for range lookups. A
+skill of None counts the postings themselves, so slices can report how many
+postings they cover. The cube is built with one scan of the jobs table and
+then kept current from job_written() deltas, so queries never scan jobs.
+historical_skill_trends also counts the postings moved to jobs_archive, for
+include_archived=1; it is only built once something asks for it. Like the
+in-memory skill graph, both cubes are per process.
+"""
+import threading
+from bisect import bisect_left, bisect_right, insort
+from collections import Counter
+from datetime import date, datetime, timedelta
+
+GRANULARITIES = ("day", "week", "month", "quarter")
+DIMENSIONS = {"industry": 1, "experience": 2, "location": 3}
+
+
+def week_start(day):
+    return day - timedelta(days=day.weekday())
+
+
+def month_start(day):
+    return day.replace(day=1)
+
+
+def quarter_start(day):
+    return date(day.year, (day.month - 1) // 3 * 3 + 1, 1)
+
+
+# each level is derived from the level named in the tuple
+ROLLUPS = {
+    "week": ("day", week_start),
+    "month": ("day", month_start),
+    "quarter": ("month", quarter_start),
+}
+
+
+def bucket_label(bucket, granularity):
+    if granularity == "week":
+        year, week, _ = bucket.isocalendar()
+        return f"{year}-W{week:02d}"
+    if granularity == "month":
+        return bucket.strftime('%Y-%m')
+    if granularity == "quarter":
+        return f"{bucket.year}-Q{(bucket.month - 1) // 3 + 1}"
+    return bucket.isoformat()
+
+
+def cells_for_state(state):
+    """Cube cells one job contributes to: a postings cell plus one per skill."""
+    if state is None or state.get("posting_date") is None:
+        return Counter()
+    rest = (state["industry"] or "", state["experience_level"] or "", state["location"] or "")
+    cells = Counter({(None,) + rest: 1})
+    for skill in set(state["skills"]):
+        cells[(skill,) + rest] += 1
+    return cells
+
+
+class SkillTrendCube:
+    def __init__(self):
+        self.levels = {g: {} for g in GRANULARITIES}
+        self.buckets = {g: [] for g in GRANULARITIES}
+        self._built = False
+        self._lock = threading.RLock()
+
+    def _add(self, granularity, bucket, cells):
+        level = self.levels[granularity]
+        if bucket not in level:
+            level[bucket] = Counter()
+            insort(self.buckets[granularity], bucket)
+        counts = level[bucket]
+        counts.update(cells)
+        # only the touched keys can have dropped to zero
+        for key in [k for k in cells if counts[k] <= 0]:
+            del counts[key]
+        if not counts:
+            del level[bucket]
+            buckets = self.buckets[granularity]
+            del buckets[bisect_left(buckets, bucket)]
+
+    def build(self, rows):
+        """Build from (posting_date, required_skills, industry, experience_level, location) rows."""
+        days = {}
+        for posting_date, skills_str, industry, experience, location in rows:
+            if posting_date is None:
+                continue
+            state = {
+                "posting_date": posting_date,
+                "skills": [s.strip() for s in (skills_str or "").split(",") if s.strip()],
+                "industry": industry,
+                "experience_level": experience,
+                "location": location,
+            }
+            days.setdefault(posting_date, Counter()).update(cells_for_state(state))
+        with self._lock:
+            self.levels = {g: {} for g in GRANULARITIES}
+            self.levels["day"] = days
+            for granularity, (finer, to_bucket) in ROLLUPS.items():
+                level = self.levels[granularity]
+                for bucket, cells in self.levels[finer].items():
+                    level.setdefault(to_bucket(bucket), Counter()).update(cells)
+            self.buckets = {g: sorted(level) for g, level in self.levels.items()}
+            self._built = True
+
+    def invalidate(self):
+        self._built = False
+
+    def ensure_built(self, load_rows):
+        if self._built:
+            return
+        with self._lock:
+            if not self._built:
+                self.build(load_rows())
+
+    def record(self, old_state, new_state):
+        """Apply one job write; skipped until the cube is first built."""
+        with self._lock:
+            if not self._built:
+                return
+            for state, sign in ((old_state, -1), (new_state, 1)):
+                cells = cells_for_state(state)
+                if not cells:
+                    continue
+                if sign < 0:
+                    cells = Counter({k: -v for k, v in cells.items()})
+                day = state["posting_date"]
+                if isinstance(day, datetime):
+                    day = day.date()
+                self._add("day", day, cells)
+                for granularity in ROLLUPS:
+                    self._add(granularity, self.bucket_for(day, granularity), cells)
+
+    @staticmethod
+    def bucket_for(day, granularity):
+        while granularity != "day":
+            finer, to_bucket = ROLLUPS[granularity]
+            day = to_bucket(day)
+            granularity = finer
+        return day
+
+    def query(self, granularity="month", start=None, end=None, filters=None, skills=None,
+              limit=10, group_by=None):
+        """Slice the cube.
+
+        Without group_by, returns one series per skill: the requested skills,
+        or the `limit` most mentioned in the slice. With group_by (a key of
+        DIMENSIONS) the slice drills down instead: one series per value of
+        that dimension, counting mentions of the requested skills (or
+        postings when no skills are given).
+        """
+        filter_values = [(DIMENSIONS[dim], value) for dim, value in (filters or {}).items() if value]
+        skill_set = set(skills) if skills else None
+        group_index = DIMENSIONS[group_by] if group_by else None
+        with self._lock:
+            buckets = self.buckets[granularity]
+            lo = 0 if start is None else bisect_left(buckets, self.bucket_for(start, granularity))
+            hi = len(buckets) if end is None else bisect_right(buckets, end)
+            selected = buckets[lo:hi]
+            series = {}
+            postings = []
+            for bucket in selected:
+                per_series = Counter()
+                total = 0
+                for key, count in self.levels[granularity][bucket].items():
+                    if any(key[i] != value for i, value in filter_values):
+                        continue
+                    skill = key[0]
+                    if skill is None:
+                        total += count
+                        if group_index is not None and skill_set is None:
+                            per_series[key[group_index]] += count
+                    elif group_index is not None:
+                        if skill_set is not None and skill in skill_set:
+                            per_series[key[group_index]] += count
+                    elif skill_set is None or skill in skill_set:
+                        per_series[skill] += count
+                series[bucket] = per_series
+                postings.append(total)
+
+        # buckets with no matching postings are dropped, as the legacy chart did
+        kept = [i for i, total in enumerate(postings) if total]
+        selected = [selected[i] for i in kept]
+        postings = [postings[i] for i in kept]
+        totals = Counter()
+        for bucket in selected:
+            totals.update(series[bucket])
+        if skill_set is not None and group_index is None:
+            names = [s for s in skills if s in totals]
+        else:
+            names = [name for name, _ in sorted(totals.items(), key=lambda x: (-x[1], x[0]))[:limit]]
+        return {
+            "labels": [bucket_label(b, granularity) for b in selected],
+            "postings": postings,
+            "series": [(name, [series[b].get(name, 0) for b in selected]) for name in names],
+        }
+
+
+skill_trends = SkillTrendCube()
+historical_skill_trends = SkillTrendCube()
@@ -8,18 +8,23 @@ const CATEGORY_COLORS = {
     'Other': '#6b7280'
 };
 
+const CHART_COLORS = [
+    '#4f46e5', '#10b981', '#f59e0b', '#ec4899', '#06b6d4',
+    '#8b5cf6', '#ef4444', '#14b8a6', '#f97316', '#6366f1'
+];
+
 let skillChart = null;
 let salaryChart = null;
-let simulation = null;
+let salaryData = null;
 let tooltip = null;
+let graphData = null;
+let graphView = null;
 
 document.addEventListener('DOMContentLoaded', function() {
     initTooltip();
-    loadSkillGraph();
-    loadSkillFrequencyChart();
-    loadSalaryDistributionChart();
-    loadIndustryFilters();
+    loadDashboard();
     setupEventListeners();
+    subscribeToAnalytics();
 });
 
 function initTooltip() {
@@ -35,43 +40,78 @@ function initTooltip() {
 
 function setupEventListeners() {
     document.getElementById('reset-graph').addEventListener('click', resetGraph);
+    document.getElementById('graph-color-by').addEventListener('change', recolorGraph);
     document.getElementById('skill-industry-filter').addEventListener('change', loadSkillFrequencyChart);
     document.getElementById('skill-experience-filter').addEventListener('change', loadSkillFrequencyChart);
     document.getElementById('salary-group-filter').addEventListener('change', loadSalaryDistributionChart);
 }
 
-async function loadIndustryFilters() {
-    try {
-        const response = await fetch('/api/industry-skills');
-        const data = await response.json();
-        const select = document.getElementById('skill-industry-filter');
-        data.forEach(item => {
-            const option = document.createElement('option');
-            option.value = item.industry;
-            option.textContent = item.industry;
-            select.appendChild(option);
+// Fetch several panels from /api/dashboard-bundle in one request.
+// params maps a panel name to its parameters, sent as panel.param=value.
+async function fetchPanels(panels, params = {}) {
+    const query = new URLSearchParams({ panels: panels.join(',') });
+    Object.entries(params).forEach(([panel, values]) => {
+        Object.entries(values).forEach(([key, value]) => {
+            if (value) query.append(`${panel}.${key}`, value);
         });
+    });
+    const response = await fetch(`/api/dashboard-bundle?${query}`);
+    return response.json();
+}
+
+function skillFrequencyParams() {
+    return {
+        industry: document.getElementById('skill-industry-filter').value,
+        experience: document.getElementById('skill-experience-filter').value
+    };
+}
+
+function salaryDistributionParams() {
+    return { group_by: document.getElementById('salary-group-filter').value };
+}
+
+async function loadDashboard() {
+    try {
+        const data = await fetchPanels(
+            ['skill-graph', 'skill-frequency', 'salary-distribution', 'industry-skills'],
+            {
+                'skill-frequency': skillFrequencyParams(),
+                'salary-distribution': salaryDistributionParams()
+            }
+        );
+        renderIndustryFilters(data['industry-skills']);
+        renderSkillGraph(data['skill-graph']);
+        renderSkillFrequencyChart(data['skill-frequency']);
+        renderSalaryDistributionChart(data['salary-distribution']);
     } catch (error) {
-        console.error('Error loading industries:', error);
+        console.error('Error loading dashboard:', error);
+        document.getElementById('skill-graph').innerHTML = '<div class="d-flex align-items-center justify-content-center h-100 text-muted">Error loading skill graph</div>';
     }
 }
 
-async function loadSkillGraph() {
+function renderIndustryFilters(data) {
+    const select = document.getElementById('skill-industry-filter');
+    const selected = select.value;
+    select.querySelectorAll('option:not([value=""])').forEach(option => option.remove());
+    data.forEach(item => {
+        const option = document.createElement('option');
+        option.value = item.industry;
+        option.textContent = item.industry;
+        select.appendChild(option);
+    });
+    select.value = selected;
+}
+
+function renderSkillGraph(data) {
+    graphData = data;
+    graphView = null;
     const container = document.getElementById('skill-graph');
     const width = container.clientWidth;
     const height = 500;
 
     container.innerHTML = '';
 
-    if (simulation) {
-        simulation.stop();
-        simulation = null;
-    }
-
     try {
-        const response = await fetch('/api/skill-graph');
-        const data = await response.json();
-
         if (!data.nodes || data.nodes.length === 0) {
             container.innerHTML = '<div class="d-flex align-items-center justify-content-center h-100 text-muted"><div class="text-center"><p>No skill data available</p><p class="small">Load sample data to see the skill graph</p></div></div>';
             return;
@@ -110,11 +150,7 @@ async function loadSkillGraph() {
                 weight: l.weight
             }));
 
-        simulation = d3.forceSimulation(data.nodes)
-            .force('link', d3.forceLink(links).id(d => d.id).distance(80))
-            .force('charge', d3.forceManyBody().strength(-150))
-            .force('center', d3.forceCenter(width / 2, height / 2))
-            .force('collision', d3.forceCollide().radius(d => nodeScale(d.count) + 5));
+        placeNodes(data.nodes, links, nodeMap, width, height);
 
         const link = g.append('g')
             .selectAll('line')
@@ -129,11 +165,11 @@ async function loadSkillGraph() {
             .data(data.nodes)
             .join('circle')
             .attr('r', d => nodeScale(d.count))
-            .attr('fill', d => CATEGORY_COLORS[d.category] || CATEGORY_COLORS['Other'])
+            .attr('fill', nodeColor)
             .attr('stroke', '#fff')
             .attr('stroke-width', 2)
             .style('cursor', 'pointer')
-            .call(drag(simulation));
+            .call(dragNode());
 
         const labels = g.append('g')
             .selectAll('text')
@@ -156,6 +192,7 @@ async function loadSkillGraph() {
             tooltip.html(`
                 <strong>${d.name}</strong><br>
                 Category: ${d.category}<br>
+                ${d.cluster !== undefined ? `Cluster: ${d.cluster + 1}<br>` : ''}
                 Jobs: ${d.count}
             `)
             .style('left', (event.pageX + 10) + 'px')
@@ -173,30 +210,71 @@ async function loadSkillGraph() {
             highlightConnections(d, data, node, link, labels);
         });
 
-        simulation.on('tick', () => {
-            link
-                .attr('x1', d => d.source.x)
-                .attr('y1', d => d.source.y)
-                .attr('x2', d => d.target.x)
-                .attr('y2', d => d.target.y);
-
-            node
-                .attr('cx', d => d.x)
-                .attr('cy', d => d.y);
-
-            labels
-                .attr('x', d => d.x)
-                .attr('y', d => d.y);
-        });
-
+        graphView = { node, link, labels, links, nodeMap, nodeScale, linkScale, width, height };
+        positionGraph();
         renderLegend();
 
     } catch (error) {
-        console.error('Error loading skill graph:', error);
+        console.error('Error rendering skill graph:', error);
         container.innerHTML = '<div class="d-flex align-items-center justify-content-center h-100 text-muted">Error loading skill graph</div>';
     }
 }
 
+// The server lays the graph out in the unit square; scale it to the svg.
+// Nodes it has not placed yet (e.g. added by a live update) start at the
+// centre of their placed neighbours.
+function placeNodes(nodes, links, nodeMap, width, height) {
+    const padding = 40;
+    nodes.forEach(n => {
+        if (n.x === undefined) return;
+        n.px = padding + n.x * (width - 2 * padding);
+        n.py = padding + n.y * (height - 2 * padding);
+    });
+    nodes.forEach(n => {
+        if (n.x !== undefined) return;
+        const placed = links
+            .filter(l => l.source === n.id || l.target === n.id)
+            .map(l => nodeMap.get(l.source === n.id ? l.target : l.source))
+            .filter(other => other.x !== undefined);
+        n.px = placed.length ? d3.mean(placed, o => o.px) + 15 : width / 2;
+        n.py = placed.length ? d3.mean(placed, o => o.py) + 15 : height / 2;
+    });
+}
+
+function positionGraph() {
+    const { node, link, labels, nodeMap } = graphView;
+    link
+        .attr('x1', d => nodeMap.get(d.source).px)
+        .attr('y1', d => nodeMap.get(d.source).py)
+        .attr('x2', d => nodeMap.get(d.target).px)
+        .attr('y2', d => nodeMap.get(d.target).py);
+
+    node
+        .attr('cx', d => d.px)
+        .attr('cy', d => d.py);
+
+    labels
+        .attr('x', d => d.px)
+        .attr('y', d => d.py);
+}
+
+function nodeColor(d) {
+    if (graphColorBy() === 'cluster') {
+        return d.cluster !== undefined ? CHART_COLORS[d.cluster % CHART_COLORS.length] : CATEGORY_COLORS['Other'];
+    }
+    return CATEGORY_COLORS[d.category] || CATEGORY_COLORS['Other'];
+}
+
+function graphColorBy() {
+    return document.getElementById('graph-color-by').value;
+}
+
+function recolorGraph() {
+    if (!graphView) return;
+    graphView.node.attr('fill', nodeColor);
+    renderLegend();
+}
+
 function highlightConnections(selectedNode, data, nodeSelection, linkSelection, labelSelection) {
     const connectedNodes = new Set([selectedNode.id]);
     
@@ -243,8 +321,10 @@ function resetGraph() {
         .duration(300)
         .style('opacity', 1);
 
-    if (simulation) {
-        simulation.alpha(0.3).restart();
+    if (graphView) {
+        // undo any dragging
+        placeNodes(graphData.nodes, graphView.links, graphView.nodeMap, graphView.width, graphView.height);
+        positionGraph();
     }
 }
 
@@ -252,55 +332,51 @@ function renderLegend() {
     const legendContainer = document.getElementById('graph-legend');
     legendContainer.innerHTML = '';
 
-    Object.entries(CATEGORY_COLORS).forEach(([category, color]) => {
-        if (category !== 'Other') {
-            const item = document.createElement('div');
-            item.className = 'legend-item';
-            item.innerHTML = `
-                <div class="legend-color" style="background-color: ${color}"></div>
-                <span>${category}</span>
-            `;
-            legendContainer.appendChild(item);
-        }
-    });
-}
-
-function drag(simulation) {
-    function dragstarted(event) {
-        if (!event.active) simulation.alphaTarget(0.3).restart();
-        event.subject.fx = event.subject.x;
-        event.subject.fy = event.subject.y;
-    }
-
-    function dragged(event) {
-        event.subject.fx = event.x;
-        event.subject.fy = event.y;
+    let entries;
+    if (graphColorBy() === 'cluster' && graphData) {
+        // label each community with its most frequent skills
+        const clusters = d3.groups(graphData.nodes.filter(n => n.cluster !== undefined), n => n.cluster)
+            .sort((a, b) => a[0] - b[0]);
+        entries = clusters.map(([cluster, members]) => [
+            members.sort((a, b) => b.count - a.count).slice(0, 3).map(n => n.name).join(', '),
+            CHART_COLORS[cluster % CHART_COLORS.length]
+        ]);
+    } else {
+        entries = Object.entries(CATEGORY_COLORS).filter(([category]) => category !== 'Other');
     }
 
-    function dragended(event) {
-        if (!event.active) simulation.alphaTarget(0);
-        event.subject.fx = null;
-        event.subject.fy = null;
-    }
+    entries.forEach(([label, color]) => {
+        const item = document.createElement('div');
+        item.className = 'legend-item';
+        item.innerHTML = `
+            <div class="legend-color" style="background-color: ${color}"></div>
+            <span>${label}</span>
+        `;
+        legendContainer.appendChild(item);
+    });
+}
 
+function dragNode() {
     return d3.drag()
-        .on('start', dragstarted)
-        .on('drag', dragged)
-        .on('end', dragended);
+        .subject((event, d) => ({ x: d.px, y: d.py, node: d }))
+        .on('drag', (event) => {
+            event.subject.node.px = event.x;
+            event.subject.node.py = event.y;
+            positionGraph();
+        });
 }
 
 async function loadSkillFrequencyChart() {
-    const industry = document.getElementById('skill-industry-filter').value;
-    const experience = document.getElementById('skill-experience-filter').value;
-
     try {
-        const params = new URLSearchParams();
-        if (industry) params.append('industry', industry);
-        if (experience) params.append('experience', experience);
-
-        const response = await fetch(`/api/skill-frequency?${params}`);
-        const data = await response.json();
+        const data = await fetchPanels(['skill-frequency'], { 'skill-frequency': skillFrequencyParams() });
+        renderSkillFrequencyChart(data['skill-frequency']);
+    } catch (error) {
+        console.error('Error loading skill frequency:', error);
+    }
+}
 
+function renderSkillFrequencyChart(data) {
+    try {
         const ctx = document.getElementById('skill-chart').getContext('2d');
 
         if (skillChart) {
@@ -352,17 +428,22 @@ async function loadSkillFrequencyChart() {
             }
         });
     } catch (error) {
-        console.error('Error loading skill frequency:', error);
+        console.error('Error rendering skill frequency:', error);
     }
 }
 
 async function loadSalaryDistributionChart() {
-    const groupBy = document.getElementById('salary-group-filter').value;
-
     try {
-        const response = await fetch(`/api/salary-distribution?group_by=${groupBy}`);
-        const data = await response.json();
+        const data = await fetchPanels(['salary-distribution'], { 'salary-distribution': salaryDistributionParams() });
+        renderSalaryDistributionChart(data['salary-distribution']);
+    } catch (error) {
+        console.error('Error loading salary distribution:', error);
+    }
+}
 
+function renderSalaryDistributionChart(data) {
+    salaryData = data;
+    try {
         const ctx = document.getElementById('salary-chart').getContext('2d');
 
         if (salaryChart) {
@@ -370,11 +451,6 @@ async function loadSalaryDistributionChart() {
             salaryChart = null;
         }
 
-        const colors = [
-            '#4f46e5', '#10b981', '#f59e0b', '#ec4899', '#06b6d4',
-            '#8b5cf6', '#ef4444', '#14b8a6', '#f97316', '#6366f1'
-        ];
-
         salaryChart = new Chart(ctx, {
             type: 'bar',
             data: {
@@ -382,7 +458,7 @@ async function loadSalaryDistributionChart() {
                 datasets: [{
                     label: 'Average Salary (USD)',
                     data: data.map(d => d.avg),
-                    backgroundColor: colors.slice(0, data.length),
+                    backgroundColor: CHART_COLORS.slice(0, data.length),
                     borderRadius: 6,
                     barThickness: 40
                 }]
@@ -432,6 +508,105 @@ async function loadSalaryDistributionChart() {
             }
         });
     } catch (error) {
-        console.error('Error loading salary distribution:', error);
+        console.error('Error rendering salary distribution:', error);
+    }
+}
+
+// Live updates: /api/analytics-stream sends a "delta" event after every job
+// create, edit or delete, a "salary" event once the server has recomputed the
+// touched salary groups, and "resync" when this page missed events.
+function subscribeToAnalytics() {
+    if (!window.EventSource) return;
+    const source = new EventSource('/api/analytics-stream');
+    source.addEventListener('delta', event => {
+        const delta = JSON.parse(event.data);
+        patchSkillGraph(delta);
+        patchSkillFrequencyChart(delta);
+    });
+    source.addEventListener('salary', event => patchSalaryDistributionChart(JSON.parse(event.data)));
+    source.addEventListener('resync', () => loadDashboard());
+}
+
+function patchSkillGraph(delta) {
+    if (!graphData) return;
+    let structural = false;
+
+    const nodes = new Map(graphData.nodes.map(n => [n.id, n]));
+    Object.entries(delta.skills).forEach(([skill, change]) => {
+        const node = nodes.get(skill);
+        if (node) {
+            node.count += change;
+            if (node.count <= 0) structural = true;
+        } else if (change > 0) {
+            graphData.nodes.push({ id: skill, name: skill, category: delta.categories[skill] || 'Other', count: change });
+            structural = true;
+        }
+    });
+
+    const links = new Map(graphData.links.map(l => [`${l.source}|${l.target}`, l]));
+    delta.edges.forEach(edge => {
+        const link = links.get(`${edge.source}|${edge.target}`);
+        if (link) {
+            link.weight += edge.delta;
+            if (link.weight <= 0) structural = true;
+        } else if (edge.delta > 0) {
+            graphData.links.push({ source: edge.source, target: edge.target, weight: edge.delta });
+            structural = true;
+        }
+    });
+
+    if (structural || !graphView) {
+        // nodes keep the server's x/y; new ones are placed next to their neighbours
+        graphData.nodes = graphData.nodes.filter(n => n.count > 0);
+        graphData.links = graphData.links.filter(l => l.weight > 0);
+        renderSkillGraph(graphData);
+        return;
     }
+
+    graphView.links.forEach(l => {
+        const source = l.source.id || l.source;
+        const target = l.target.id || l.target;
+        l.weight = links.get(`${source}|${target}`).weight;
+    });
+    graphView.node.attr('r', d => graphView.nodeScale(d.count));
+    graphView.link.attr('stroke-width', d => graphView.linkScale(d.weight));
+}
+
+function patchSkillFrequencyChart(delta) {
+    if (!skillChart) return;
+    const { industry, experience } = skillFrequencyParams();
+    const counts = new Map(skillChart.data.labels.map((label, i) => [label, skillChart.data.datasets[0].data[i]]));
+
+    // only skills already in the top 20 are tracked; the next reload picks up newcomers
+    delta.jobs.forEach(job => {
+        if ((industry && job.industry !== industry) || (experience && job.experience !== experience)) return;
+        job.skills.forEach(skill => {
+            if (counts.has(skill)) counts.set(skill, counts.get(skill) + job.sign);
+        });
+    });
+
+    const sorted = [...counts.entries()].sort((a, b) => b[1] - a[1]);
+    skillChart.data.labels = sorted.map(s => s[0]);
+    skillChart.data.datasets[0].data = sorted.map(s => s[1]);
+    skillChart.update();
+}
+
+function patchSalaryDistributionChart(salary) {
+    if (!salaryChart || !salaryData) return;
+    const groupBy = salaryDistributionParams().group_by === 'location' ? 'location' : 'category';
+    const updates = salary[groupBy];
+    if (!Object.keys(updates).length) return;
+
+    const items = salaryData.filter(item => !(item.label in updates));
+    Object.entries(updates).forEach(([label, stats]) => {
+        if (stats) items.push({ label, ...stats });
+    });
+    items.sort((a, b) => b.avg - a.avg);
+
+    // the tooltip callback reads salaryData, so update it in place
+    salaryData.splice(0, salaryData.length, ...items);
+    salaryChart.data.labels = salaryData.map(d => d.label);
+    salaryChart.data.datasets[0].data = salaryData.map(d => d.avg);
+    salaryChart.data.datasets[0].backgroundColor = CHART_COLORS.slice(0, salaryData.length);
+    salaryChart.update();
 }
@@ -0,0 +1,184 @@
+"""Synthetic job postings fitted to the bundled CSV.
+
+The CSV only holds ~15k rows, which is too small to reproduce scaling
+problems. SyntheticJobGenerator learns the marginal and joint distributions
+from it and emits any number of rows in seeded, vectorized blocks shaped
+like load_jobs_from_csv() output, ready for bulk_load_jobs(). Each block of
+BLOCK_SIZE rows has its own random stream seeded with (seed, block number)
+and is always drawn in full, so a row depends only on the seed and its
+index: the first rows of a small load match those of a large one.
+"""
+import numpy as np
+import pandas as pd
+
+from sample_data import CSV_FILE_PATH, get_job_category_from_title
+
+MIN_GROUP_SIZE = 30
+BLOCK_SIZE = 1000
+
+
+def _categorical(series):
+    counts = series.value_counts()
+    return counts.index.to_numpy(), (counts / counts.sum()).to_numpy()
+
+
+class SyntheticJobGenerator:
+    def __init__(self, df):
+        df = df.dropna(subset=["job_title", "required_skills", "posting_date"]).copy()
+        df["posting_date"] = pd.to_datetime(df["posting_date"])
+        df["application_deadline"] = pd.to_datetime(df["application_deadline"])
+        skill_lists = df["required_skills"].str.split(",").apply(lambda skills: [s.strip() for s in skills if s.strip()])
+
+        self.titles, self.title_p = _categorical(df["job_title"])
+        self.title_categories = np.array([get_job_category_from_title(t) for t in self.titles], dtype=object)
+        self.industries, self.industry_p = _categorical(df["industry"])
+        self.experience_levels, self.experience_p = _categorical(df["experience_level"])
+        self.locations, self.location_p = _categorical(df["company_location"])
+        self.residences, self.residence_p = _categorical(df["employee_residence"])
+        self.residence_same_p = float((df["company_location"] == df["employee_residence"]).mean())
+        self.employment_types, self.employment_p = _categorical(df["employment_type"])
+        self.company_sizes, self.company_size_p = _categorical(df["company_size"])
+        self.remote_ratios, self.remote_p = _categorical(df["remote_ratio"])
+        self.educations, self.education_p = _categorical(df["education_required"])
+        self.benefits_scores = df["benefits_score"].dropna().to_numpy()
+        self.description_lengths = df["job_description_length"].dropna().astype(int).to_numpy()
+        self.deadline_days = (df["application_deadline"] - df["posting_date"]).dt.days.dropna().astype(int).to_numpy()
+
+        # title -> skills: per-title skill probabilities and skill-count distribution
+        self.skills = np.array(sorted({s for skills in skill_lists for s in skills}), dtype=object)
+        skill_index = {s: i for i, s in enumerate(self.skills)}
+        self.title_skill_logp = np.full((len(self.titles), len(self.skills)), -np.inf)
+        self.skill_counts = {}
+        title_index = {t: i for i, t in enumerate(self.titles)}
+        for title, group in skill_lists.groupby(df["job_title"]):
+            counts = np.zeros(len(self.skills))
+            for skills in group:
+                for skill in skills:
+                    counts[skill_index[skill]] += 1
+            with np.errstate(divide="ignore"):
+                self.title_skill_logp[title_index[title]] = np.log(counts / counts.sum())
+            self.skill_counts[title_index[title]] = _categorical(group.str.len())
+
+        # experience level -> years of experience
+        self.years_by_experience = {
+            level: _categorical(group.dropna())
+            for level, group in df["years_experience"].groupby(df["experience_level"])
+        }
+
+        # industry (x experience level) -> log-normal salary
+        log_salary = np.log(df["salary_usd"].where(df["salary_usd"] > 0))
+        self.salary_by_industry = {
+            industry: (group.mean(), group.std())
+            for industry, group in log_salary.groupby(df["industry"])
+        }
+        self.salary_by_industry_experience = {
+            key: (group.mean(), group.std())
+            for key, group in log_salary.groupby([df["industry"], df["experience_level"]])
+            if group.count() >= MIN_GROUP_SIZE
+        }
+
+        # location -> currency, and currency -> exchange rate for salary_local
+        self.currency_by_location = {
+            location: _categorical(group)
+            for location, group in df["salary_currency"].groupby(df["company_location"])
+        }
+        rates = (df["salary_local"] / df["salary_usd"]).groupby(df["salary_currency"]).median()
+        self.currency_rates = rates.to_dict()
+
+        # posting-date seasonality by month of year, over the observed years
+        self.month_p = df["posting_date"].dt.month.value_counts().reindex(range(1, 13), fill_value=0).to_numpy(dtype=float)
+        self.month_p /= self.month_p.sum()
+        self.first_year = int(df["posting_date"].dt.year.min())
+        self.last_year = int(df["posting_date"].dt.year.max())
+
+    @classmethod
+    def from_csv(cls, path=CSV_FILE_PATH):
+        return cls(pd.read_csv(path))
+
+    def _sample_skills(self, rng, title_idx):
+        skills = np.empty(len(title_idx), dtype=object)
+        for t in np.unique(title_idx):
+            rows = np.flatnonzero(title_idx == t)
+            # Gumbel top-k: draws k distinct skills with probabilities proportional to p
+            keys = self.title_skill_logp[t] + rng.gumbel(size=(len(rows), len(self.skills)))
+            order = np.argsort(-keys, axis=1)
+            values, p = self.skill_counts[t]
+            ks = rng.choice(values, size=len(rows), p=p)
+            names = self.skills[order]
+            skills[rows] = [", ".join(names[i, :k]) for i, k in enumerate(ks)]
+        return skills
+
+    def _sample_grouped(self, rng, keys, table, default=None):
+        out = np.empty(len(keys), dtype=object)
+        for key in np.unique(keys):
+            rows = np.flatnonzero(keys == key)
+            values, p = table.get(key, default)
+            out[rows] = rng.choice(values, size=len(rows), p=p)
+        return out
+
+    def _sample_salaries(self, rng, industries, experience):
+        mu = np.empty(len(industries))
+        sigma = np.empty(len(industries))
+        for industry, level in set(zip(industries.tolist(), experience.tolist())):
+            rows = (industries == industry) & (experience == level)
+            params = self.salary_by_industry_experience.get((industry, level), self.salary_by_industry[industry])
+            mu[rows], sigma[rows] = params
+        return np.rint(np.exp(rng.normal(mu, sigma))).astype(int)
+
+    def _sample_dates(self, rng, n, first_year, last_year):
+        years = rng.integers(first_year, last_year + 1, size=n)
+        months = rng.choice(np.arange(1, 13), size=n, p=self.month_p)
+        month_starts = (years - 1970) * 12 + (months - 1)
+        starts = month_starts.astype("datetime64[M]").astype("datetime64[D]")
+        ends = (month_starts + 1).astype("datetime64[M]").astype("datetime64[D]")
+        offsets = (rng.random(n) * (ends - starts).astype(int)).astype(int)
+        return starts + offsets.astype("timedelta64[D]")
+
+    def generate_batch(self, rng, n, start_index=0, job_id_prefix="SYN", first_year=None, last_year=None):
+        title_idx = rng.choice(len(self.titles), size=n, p=self.title_p)
+        industries = rng.choice(self.industries, size=n, p=self.industry_p)
+        experience = rng.choice(self.experience_levels, size=n, p=self.experience_p)
+        locations = rng.choice(self.locations, size=n, p=self.location_p)
+        residences = np.where(rng.random(n) < self.residence_same_p, locations,
+                              rng.choice(self.residences, size=n, p=self.residence_p))
+        currencies = self._sample_grouped(rng, locations, self.currency_by_location)
+        salary_usd = self._sample_salaries(rng, industries, experience)
+        rates = np.array([self.currency_rates.get(c, 1.0) for c in currencies.tolist()])
+        posting_dates = self._sample_dates(rng, n, first_year or self.first_year, last_year or self.last_year)
+        deadlines = posting_dates + rng.choice(self.deadline_days, size=n).astype("timedelta64[D]")
+
+        columns = {
+            "job_id": [f"{job_id_prefix}-{i:08d}" for i in range(start_index, start_index + n)],
+            "job_title": self.titles[title_idx].tolist(),
+            "salary_usd": salary_usd.tolist(),
+            "salary_currency": currencies.tolist(),
+            "salary_local": np.round(salary_usd * rates, 2).tolist(),
+            "experience_level": experience.tolist(),
+            "employment_type": rng.choice(self.employment_types, size=n, p=self.employment_p).tolist(),
+            "job_category": self.title_categories[title_idx].tolist(),
+            "company_location": locations.tolist(),
+            "company_size": rng.choice(self.company_sizes, size=n, p=self.company_size_p).tolist(),
+            "employee_residence": residences.tolist(),
+            "remote_ratio": rng.choice(self.remote_ratios, size=n, p=self.remote_p).tolist(),
+            "required_skills": self._sample_skills(rng, title_idx).tolist(),
+            "education_required": rng.choice(self.educations, size=n, p=self.education_p).tolist(),
+            "years_experience": self._sample_grouped(rng, experience, self.years_by_experience).astype(int).tolist(),
+            "industry": industries.tolist(),
+            "posting_date": posting_dates.astype(object).tolist(),
+            "application_deadline": deadlines.astype(object).tolist(),
+            "job_description_length": rng.choice(self.description_lengths, size=n).tolist(),
+            "benefits_score": rng.choice(self.benefits_scores, size=n).tolist(),
+        }
+        keys = list(columns)
+        return [dict(zip(keys, row)) for row in zip(*columns.values())]
+
+    def generate(self, num_jobs, seed=0, job_id_prefix="SYN", first_year=None, last_year=None):
+        """Yield num_jobs job dicts; row i is the same for a given seed whatever num_jobs is."""
+        for block, start in enumerate(range(0, num_jobs, BLOCK_SIZE)):
+            rng = np.random.default_rng([seed, block])
+            rows = self.generate_batch(rng, BLOCK_SIZE, start, job_id_prefix, first_year, last_year)
+            yield from rows[:num_jobs - start]
+
+
+def generate_synthetic_jobs(num_jobs, seed=0, **kwargs):
+    return SyntheticJobGenerator.from_csv().generate(num_jobs, seed=seed, **kwargs)
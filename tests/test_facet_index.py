@@ -0,0 +1,144 @@
+"""FacetIndex matches, facet counts and pages must agree with filtering the jobs directly."""
+from datetime import date
+
+import pytest
+
+from facet_index import FACETS, FacetIndex, to_positions
+
+
+def job(job_id, salary, industry="Finance", location="Germany", experience="MI", category="Data Science",
+        remote_ratio=50, company_size="M", posted=date(2025, 1, 15)):
+    return {"id": job_id, "salary_usd": salary, "posting_date": posted, "industry": industry,
+            "location": location, "experience_level": experience, "job_category": category,
+            "remote_ratio": remote_ratio, "company_size": company_size}
+
+
+JOBS = [
+    job(1, 90000),
+    job(2, 100000, industry="Technology", posted=date(2025, 3, 1)),
+    job(3, 105000, location="France", experience="SE"),
+    job(4, 119999, industry="Technology", location="France", posted=None),
+    job(5, 120000, industry="Retail", remote_ratio=0, posted=date(2024, 12, 31)),
+    job(6, None, industry="Technology", category="Analytics"),
+    job(7, 150000, location="United States", experience="SE", posted=date(2025, 3, 1)),
+]
+
+
+def row(state):
+    return (state["id"], state["posting_date"], state["salary_usd"],
+            *(state[key] for key, _ in FACETS.values()))
+
+
+@pytest.fixture
+def index():
+    index = FacetIndex()
+    index.build([row(state) for state in JOBS])
+    return index
+
+
+def expected(jobs, filters, salary_min=None, salary_max=None):
+    """The ids and disjunctive counts, by filtering the job dicts."""
+    def keep(state, skip=None):
+        salary = state["salary_usd"]
+        if salary_min is not None and (salary is None or salary < salary_min):
+            return False
+        if salary_max is not None and (salary is None or salary > salary_max):
+            return False
+        return all(str(state[FACETS[facet][0]]) == value
+                   for facet, value in filters.items() if value and facet != skip)
+
+    ids = sorted(state["id"] for state in jobs if keep(state))
+    counts = {facet: {} for facet in FACETS}
+    for facet, (key, _) in FACETS.items():
+        for state in jobs:
+            value = str(state[key])
+            counts[facet].setdefault(value, 0)
+            counts[facet][value] += keep(state, skip=facet)
+    return ids, counts
+
+
+def check(index, jobs, filters, salary_min=None, salary_max=None):
+    match, counts = index.query(filters, salary_min, salary_max)
+    ids, expected_counts = expected(jobs, filters, salary_min, salary_max)
+    assert to_positions(match).tolist() == ids
+    assert counts == expected_counts
+
+
+@pytest.mark.parametrize("filters", [
+    {},
+    {"industry": "Technology"},
+    {"industry": "Technology", "location": "France"},
+    {"experience": "SE", "remote_ratio": "50"},
+    {"industry": "Mining"},
+])
+def test_query_matches_and_disjunctive_counts(index, filters):
+    check(index, JOBS, filters)
+
+
+def test_disjunctive_counts_ignore_their_own_filter(index):
+    _, counts = index.query({"industry": "Technology", "location": "France"})
+    # industry counts apply only the location filter, and the other way round
+    assert counts["industry"] == {"Finance": 1, "Technology": 1, "Retail": 0}
+    assert counts["location"] == {"Germany": 2, "France": 1, "United States": 0}
+    assert counts["experience"] == {"MI": 1, "SE": 0}
+
+
+@pytest.mark.parametrize("salary_min, salary_max", [
+    (100000, 120000),  # both bounds on bucket edges
+    (100001, 119999),  # inside the edge buckets, so exact salaries decide
+    (105000, 105000),
+    (None, 105000),
+    (119999, None),
+    (130000, 140000),  # a bucket with no jobs
+])
+def test_salary_edge_buckets(index, salary_min, salary_max):
+    check(index, JOBS, {}, salary_min, salary_max)
+    check(index, JOBS, {"industry": "Technology"}, salary_min, salary_max)
+
+
+def test_salary_range_skips_jobs_without_salary(index):
+    match, _ = index.query({}, salary_min=0)
+    assert 6 not in to_positions(match).tolist()
+    assert index.salary_bitmap().bit_count() == len(JOBS) - 1
+
+
+def test_record_edit_and_delete(index):
+    jobs = list(JOBS)
+    # an edit moves the job to other facet values and another salary bucket
+    edited = dict(jobs[0], industry="Retail", location="France", salary_usd=121000, posting_date=date(2025, 4, 1))
+    index.record(jobs[0], edited)
+    jobs[0] = edited
+    check(index, jobs, {"industry": "Retail"}, 120000, 121000)
+    check(index, jobs, {"location": "Germany"})
+
+    # deleting the only Analytics job drops the value; its position clears everywhere
+    index.record(jobs[5], None)
+    del jobs[5]
+    check(index, jobs, {})
+    assert "Analytics" not in index.values["job_category"]
+    assert index.stats()["total_jobs"] == len(jobs)
+
+    created = job(12, 99999, industry="Energy", experience="EN", posted=date(2025, 5, 1))
+    index.record(None, created)
+    jobs.append(created)
+    check(index, jobs, {"industry": "Energy"}, 90000, 99999)
+    assert index.page_ids(index.all, 1, 1) == [12]
+
+
+def test_record_before_build_is_skipped():
+    index = FacetIndex()
+    index.record(None, JOBS[0])
+    assert index.all == 0
+    index.ensure_built(lambda: [row(state) for state in JOBS])
+    assert index.all.bit_count() == len(JOBS)
+
+
+def test_page_ids_newest_first(index):
+    # equal dates order by id, highest first; undated 4 is last
+    order = [7, 2, 6, 3, 1, 5, 4]
+    assert index.page_ids(index.all, 1, 3) == order[:3]
+    assert index.page_ids(index.all, 2, 3) == order[3:6]
+    assert index.page_ids(index.all, 3, 3) == order[6:]
+    assert index.page_ids(index.all, 4, 3) == []
+    match, _ = index.query({"industry": "Technology"})
+    assert index.page_ids(match, 1, 10) == [2, 6, 4]
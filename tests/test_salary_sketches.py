@@ -0,0 +1,75 @@
+"""TDigest quantiles must track the exact percentiles, through merges and storage round trips."""
+import json
+import random
+from bisect import bisect_left
+
+import numpy as np
+import pytest
+
+from salary_sketches import TDigest
+
+QUANTILES = [0.01, 0.1, 0.25, 0.5, 0.75, 0.9, 0.99]
+
+
+@pytest.fixture
+def salaries():
+    rng = random.Random(7)
+    return [round(rng.lognormvariate(11.5, 0.4)) for _ in range(20000)]
+
+
+def digest_of(values):
+    digest = TDigest()
+    for value in values:
+        digest.add(value)
+    return digest
+
+
+def assert_tracks(digest, values):
+    ordered = sorted(values)
+    for q in QUANTILES:
+        estimate = digest.quantile(q)
+        # values are sparse in the right tail, so a tiny rank error there moves the salary most
+        assert estimate == pytest.approx(np.percentile(values, q * 100), rel=0.02)
+        # the rank of the estimate is what the digest bounds
+        assert abs(bisect_left(ordered, estimate) / len(ordered) - q) < 0.005
+
+
+def test_quantiles_match_exact_percentiles(salaries):
+    digest = digest_of(salaries)
+    assert_tracks(digest, salaries)
+    assert digest.quantile(0) == min(salaries)
+    assert digest.quantile(1) == max(salaries)
+    assert digest.count == len(salaries)
+    assert len(digest.means) < len(salaries) // 50
+
+
+def test_small_and_empty_digests():
+    assert TDigest().quantile(0.5) is None
+    assert digest_of([120000]).quantile(0.9) == 120000
+    digest = digest_of([100000, 200000])
+    assert 100000 <= digest.quantile(0.5) <= 200000
+
+
+def test_merge_matches_the_whole(salaries):
+    parts = [digest_of(salaries[i::4]) for i in range(4)]
+    merged = TDigest()
+    for part in parts:
+        merged.merge(part)
+    assert merged.count == len(salaries)
+    assert merged.total == sum(salaries)
+    assert (merged.min, merged.max) == (min(salaries), max(salaries))
+    assert_tracks(merged, salaries)
+
+
+def test_from_dict_round_trip(salaries):
+    digest = digest_of(salaries)
+    restored = TDigest.from_dict(json.loads(json.dumps(digest.to_dict())))
+    assert restored.to_dict() == digest.to_dict()
+    assert [restored.quantile(q) for q in QUANTILES] == [digest.quantile(q) for q in QUANTILES]
+
+    # stored cells are merged into group digests and keep taking new salaries
+    half = len(salaries) // 2
+    stored = TDigest.from_dict(json.loads(json.dumps(digest_of(salaries[:half]).to_dict())))
+    for value in salaries[half:]:
+        stored.add(value)
+    assert_tracks(TDigest().merge(stored), salaries)
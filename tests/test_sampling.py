@@ -0,0 +1,183 @@
+"""Random-pairing reservoirs must stay uniform and in sync, and intervals must cover the truth."""
+import random
+from collections import Counter, defaultdict, namedtuple
+
+import pytest
+
+from sampling import APPROX_MIN_FILL, JobSample, SampledJob, Stratum
+
+Row = namedtuple("Row", "id industry experience_level company_location job_category salary_usd skills")
+
+SKILLS = ["Python", "SQL", "Spark", "AWS", "Tableau"]
+
+
+def make_rows(count, industries=("Finance", "Retail"), seed=0):
+    rng = random.Random(seed)
+    return [Row(i, industries[i % len(industries)], rng.choice(["EN", "MI", "SE"]),
+                rng.choice(["Germany", "France"]), rng.choice(["Analytics", "Data Science"]),
+                rng.randrange(60000, 200000, 1000), tuple(rng.sample(SKILLS, rng.randint(1, 3))))
+            for i in range(1, count + 1)]
+
+
+def sampled(row):
+    return SampledJob(row.id, row.skills, row.experience_level, row.company_location, row.job_category,
+                      row.salary_usd)
+
+
+def state(row, **changes):
+    row = row._replace(**changes)
+    return {"id": row.id, "industry": row.industry, "skills": row.skills, "experience_level": row.experience_level,
+            "location": row.company_location, "job_category": row.job_category, "salary_usd": row.salary_usd}
+
+
+def assert_consistent(stratum, live, target):
+    """Reservoir rows are live, indexed, at most target, and the running sums match the rows."""
+    assert stratum.population == len(live)
+    assert len(stratum.rows) <= target
+    assert {row.id for row in stratum.rows} <= set(live)
+    assert stratum.positions == {row.id: slot for slot, row in enumerate(stratum.rows)}
+    assert stratum.deleted_inside >= 0 and stratum.deleted_outside >= 0
+
+    fresh = Stratum()
+    for row in stratum.rows:
+        fresh._tally(row, 1)
+    assert {e: +c for e, c in stratum.skills.items() if +c} == {e: +c for e, c in fresh.skills.items() if +c}
+    assert {k: v for k, v in stratum.salaries.items() if v[0]} == dict(fresh.salaries)
+    assert {k: v for k, v in stratum.salary_values.items() if v} == dict(fresh.salary_values)
+
+
+def test_random_pairing_keeps_the_reservoir_in_sync():
+    rng = random.Random(1)
+    stratum, live, target = Stratum(), {}, 20
+    rows = iter(make_rows(2000, industries=("Finance",)))
+    for _ in range(300):
+        row = next(rows)
+        stratum.insert(sampled(row), target, rng)
+        live[row.id] = row
+    for step in range(1000):
+        if live and rng.random() < 0.5:
+            job_id = rng.choice(list(live))
+            stratum.delete(job_id)
+            del live[job_id]
+        else:
+            row = next(rows)
+            stratum.insert(sampled(row), target, rng)
+            live[row.id] = row
+        if step % 50 == 0:
+            assert_consistent(stratum, live, target)
+    assert_consistent(stratum, live, target)
+
+
+def test_inserts_refill_after_deletes():
+    rng = random.Random(2)
+    stratum, target = Stratum(), 10
+    rows = make_rows(100, industries=("Finance",))
+    for row in rows[:50]:
+        stratum.insert(sampled(row), target, rng)
+    inside = [row.id for row in stratum.rows][:4]
+    for job_id in inside:
+        stratum.delete(job_id)
+    assert len(stratum.rows) == target - 4
+    assert stratum.deleted_inside == 4
+    # every delete is paired with a later insert, so the reservoir is back to full
+    for row in rows[50:54]:
+        stratum.insert(sampled(row), target, rng)
+    assert stratum.deleted_inside == stratum.deleted_outside == 0
+    assert len(stratum.rows) == target
+
+
+def test_random_pairing_stays_uniform():
+    """After deletes and pairing inserts, every live job is equally likely to be sampled."""
+    rows = make_rows(40, industries=("Finance",))
+    target, trials = 8, 4000
+    hits = Counter()
+    for trial in range(trials):
+        rng = random.Random(trial)
+        stratum = Stratum()
+        for row in rows[:30]:
+            stratum.insert(sampled(row), target, rng)
+        for job_id in range(1, 16):
+            stratum.delete(job_id)
+        for row in rows[30:]:
+            stratum.insert(sampled(row), target, rng)
+        hits.update(row.id for row in stratum.rows)
+    live = [row.id for row in rows[15:]]
+    # pairing leaves 5 deletes uncompensated, so the reservoir is not always full
+    expected = sum(hits.values()) / len(live)
+    assert set(hits) <= set(live)
+    for job_id in live:
+        assert abs(hits[job_id] - expected) < 0.15 * expected
+
+
+def test_record_moves_jobs_between_strata():
+    rows = make_rows(40)
+    sample = JobSample(size=5, seed=3)
+    sample.build(rows)
+    moved = rows[0]
+    sample.record(state(moved), state(moved, industry="Energy"))
+    assert sample.strata[moved.industry].population == 19
+    assert [row.id for row in sample.strata["Energy"].rows] == [moved.id]
+    sample.record(state(moved, industry="Energy"), None)
+    assert "Energy" not in sample.strata
+
+    # an edit within the stratum replaces the sampled row in place
+    kept = next(row for row in rows if row.id in sample.strata["Retail"].positions)
+    sample.record(state(kept), state(kept, salary_usd=999000))
+    assert max(sample.strata["Retail"].salary_values["location", kept.company_location]) == 999000
+
+
+def test_deletes_below_min_fill_mark_the_sample_for_rebuild():
+    rows = make_rows(40, industries=("Finance",))
+    sample = JobSample(size=10, seed=4)
+    sample.build(rows)
+    stratum = sample.strata["Finance"]
+    while len(stratum.rows) >= 10 * APPROX_MIN_FILL:
+        sample.record(state(rows[stratum.rows[0].id - 1]), None)
+    assert not sample._built
+
+
+def exact_salaries(rows, group_by="location"):
+    field = "company_location" if group_by == "location" else "job_category"
+    groups = defaultdict(list)
+    for row in rows:
+        groups[getattr(row, field)].append(row.salary_usd)
+    return {label: (len(values), sum(values) / len(values)) for label, values in groups.items()}
+
+
+def test_full_population_strata_have_zero_width():
+    rows = make_rows(60)
+    sample = JobSample(size=100, seed=5)
+    sample.build(rows)
+    exact = exact_salaries(rows)
+    data, summary = sample.salary_distribution("location")
+    assert summary["sample_size"] == summary["population"] == len(rows)
+    for group in data:
+        count, average = exact[group["label"]]
+        assert group["count"] == count and group["count_ci"] == [count, count]
+        assert group["avg"] == round(average) and group["avg_ci"] == [round(average)] * 2
+
+    frequency, _ = sample.skill_frequency()
+    for total, (low, high) in zip(frequency["data"], frequency["data_ci"]):
+        assert low == total == high
+
+
+@pytest.mark.parametrize("view", ["count", "avg", "skills"])
+def test_intervals_cover_the_truth(view):
+    rows = make_rows(3000, industries=("Finance", "Retail", "Technology"), seed=6)
+    true_salaries = exact_salaries(rows)
+    true_skills = Counter(skill for row in rows for skill in row.skills)
+    trials, covered = 200, 0
+    for trial in range(trials):
+        sample = JobSample(size=60, seed=trial)
+        sample.build(rows)
+        if view == "skills":
+            result, _ = sample.skill_frequency()
+            low, high = result["data_ci"][result["labels"].index("Python")]
+            covered += low <= true_skills["Python"] <= high
+            continue
+        group = next(g for g in sample.salary_distribution("location")[0] if g["label"] == "Germany")
+        low, high = group[f"{view}_ci"]
+        truth = true_salaries["Germany"][0 if view == "count" else 1]
+        covered += low <= truth <= high
+    # nominal 95%; allow for the normal approximation and the finite number of trials
+    assert 0.9 <= covered / trials <= 0.99
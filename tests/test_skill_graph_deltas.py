@@ -0,0 +1,96 @@
+"""The in-memory skill graph's incremental deltas must match a full rebuild."""
+import pytest
+
+import routes
+
+from app import create_app, db
+from models import Job
+from neo4j_service import in_memory_graph
+from routes import check_skill_graph_consistency
+from salary_sketches import salary_sketches
+from similar_jobs import similar_jobs
+
+JOBS = [
+    {"job_title": "Data Scientist", "job_category": "Data Science", "industry": "Finance",
+     "company_location": "Germany", "required_skills": "Python, SQL, Statistics"},
+    {"job_title": "ML Engineer", "job_category": "Machine Learning", "industry": "Technology",
+     "company_location": "United States", "required_skills": "Python, PyTorch, Docker"},
+    {"job_title": "Data Analyst", "job_category": "Analytics", "industry": "Finance",
+     "company_location": "Germany", "required_skills": "SQL, Tableau, Python"},
+    {"job_title": "Data Engineer", "job_category": "Data Engineering", "industry": "Retail",
+     "company_location": "France", "required_skills": "Spark, SQL, AWS"},
+]
+
+
+def job_form(**fields):
+    form = {"salary_usd": "120000", "experience_level": "MI", "company_size": "M",
+            "remote_ratio": "50", "posting_date": "2025-01-15"}
+    form.update(fields)
+    return form
+
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    monkeypatch.setenv("DATABASE_URL", f"sqlite:///{tmp_path / 'jobs.db'}")
+    app = create_app({"SECRET_KEY": "test", "TESTING": True})
+    with app.app_context():
+        db.create_all()
+    in_memory_graph.clear_all()
+    yield app
+    similar_jobs.join()
+    salary_sketches.join()
+    in_memory_graph.clear_all()
+
+
+def job_ids(app):
+    with app.app_context():
+        return [job_id for (job_id,) in db.session.query(Job.id).order_by(Job.id)]
+
+
+def mismatches(app):
+    with app.app_context():
+        return check_skill_graph_consistency(in_memory_graph)
+
+
+def test_create_edit_delete_match_rebuild(app):
+    client = app.test_client()
+    for fields in JOBS:
+        client.post("/job/new", data=job_form(**fields))
+    ids = job_ids(app)
+    assert len(ids) == len(JOBS)
+    assert in_memory_graph.snapshot()
+    assert mismatches(app) == []
+
+    # new skills, a dropped shared skill, and a different role, industry and location
+    client.post(f"/job/{ids[0]}/edit", data=job_form(**dict(
+        JOBS[0], job_category="Machine Learning", industry="Technology", company_location="France",
+        required_skills="Python, PyTorch, Kubernetes")))
+    assert mismatches(app) == []
+    # fields that are not graph edges only; the graph must not move
+    before = in_memory_graph.snapshot()
+    client.post(f"/job/{ids[1]}/edit", data=job_form(**dict(JOBS[1], salary_usd="150000")))
+    assert in_memory_graph.snapshot() == before
+    assert mismatches(app) == []
+
+    client.post(f"/job/{ids[2]}/delete")
+    assert mismatches(app) == []
+    for job_id in ids:
+        client.post(f"/job/{job_id}/delete")
+    assert job_ids(app) == []
+    assert in_memory_graph.snapshot() == {}
+
+
+def test_consistency_endpoint_reports_drift(app, monkeypatch):
+    client = app.test_client()
+    for fields in JOBS:
+        client.post("/job/new", data=job_form(**fields))
+    assert client.get("/api/skill-graph/consistency").status_code == 404
+
+    monkeypatch.setattr(routes, "SKILL_GRAPH_CHECK_ENDPOINT", True)
+    assert client.get("/api/skill-graph/consistency").get_json()["consistent"]
+
+    in_memory_graph.add_role_skill("Data Science", "Tableau")
+    body = client.get("/api/skill-graph/consistency").get_json()
+    assert body["backend"] == "in-memory"
+    assert body["mismatches"] == [{"relationship": "REQUIRES", "source": "Data Science", "target": "Tableau",
+                                   "live": 1, "rebuilt": 0}]
@@ -0,0 +1,172 @@
+"""Warm-up of the hot analytics responses after start, and readiness.
+
+The facet index, trend cube, recommender, PageRank, graph layout and the
+SQL behind the analytics views are all built on first use, so the first
+requests after a deploy are slow. init_warmup() starts a warm-up on the
+app's first request, which is normally the load balancer's first
+/health/ready probe. The warm-up runs `prepare` (e.g. filling the in-memory
+skill graph) and then GETs every warm-up path through the app's test
+client on WARMUP_WORKERS threads. That builds the same structures a real
+request would build.
+
+Paths come from WARMUP_PATHS (comma-separated) or DEFAULT_WARMUP_PATHS. If
+WARMUP_ACCESS_LOG names an access log, they also include the
+WARMUP_LEARNED_PATHS most frequent successful GETs of warmable routes near
+its end. The instance is ready once every path has answered or
+WARMUP_SECONDS have passed, whichever comes first. Warm-up is per process,
+like the structures it builds.
+
+Only serving processes warm up: the gunicorn post_fork hook in
+gunicorn.conf.py and `python main.py` call enable_warmup(). Anything else
+that imports main (CLI commands, test clients, benchmarks) is ready at once
+without it. WARMUP=1 forces it on everywhere and WARMUP=0 turns it off
+everywhere.
+"""
+import logging
+import os
+import re
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, wait
+from urllib.parse import urlsplit
+
+logger = logging.getLogger(__name__)
+
+WARMUP_SETTING = os.environ.get("WARMUP", "")
+WARMUP_SECONDS = float(os.environ.get("WARMUP_SECONDS", 60))
+WARMUP_WORKERS = int(os.environ.get("WARMUP_WORKERS", 4))
+WARMUP_ACCESS_LOG = os.environ.get("WARMUP_ACCESS_LOG")
+WARMUP_LEARNED_PATHS = int(os.environ.get("WARMUP_LEARNED_PATHS", 20))
+ACCESS_LOG_TAIL_BYTES = 4 * 1024 * 1024
+
+DEFAULT_WARMUP_PATHS = (
+    "/",
+    "/api/dashboard-bundle",
+    "/api/skill-graph",
+    "/api/skill-frequency",
+    "/api/salary-distribution",
+    "/api/salary-distribution?group_by=category",
+    "/api/industry-skills",
+    "/api/skill-trends",
+    "/api/role-similarity",
+    "/api/industry-comparison",
+    "/api/skill-pathways?skills=Python",
+    "/api/skill-recommender?skills=Python",
+)
+WARMABLE_ROUTES = {urlsplit(path).path for path in DEFAULT_WARMUP_PATHS}
+
+_ACCESS_LOG_LINE = re.compile(r'"GET (\S+) HTTP/[\d.]+" 200 ')
+
+
+def learned_paths(log_path, limit=WARMUP_LEARNED_PATHS):
+    """The most frequent successful GETs of warmable routes near the end of an access log."""
+    try:
+        with open(log_path, "rb") as handle:
+            handle.seek(0, os.SEEK_END)
+            handle.seek(max(0, handle.tell() - ACCESS_LOG_TAIL_BYTES))
+            tail = handle.read().decode("utf-8", errors="replace")
+    except OSError as e:
+        logger.warning(f"Could not read warm-up access log {log_path}: {e}")
+        return []
+    counts = Counter(match.group(1) for match in _ACCESS_LOG_LINE.finditer(tail)
+                     if urlsplit(match.group(1)).path in WARMABLE_ROUTES)
+    return [path for path, _ in counts.most_common(limit)]
+
+
+def warmup_paths():
+    configured = os.environ.get("WARMUP_PATHS")
+    paths = [p.strip() for p in configured.split(",") if p.strip()] if configured else list(DEFAULT_WARMUP_PATHS)
+    if WARMUP_ACCESS_LOG:
+        paths.extend(learned_paths(WARMUP_ACCESS_LOG))
+    return list(dict.fromkeys(paths))
+
+
+class Warmup:
+    """Runs the warm-up once per process and reports its progress."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._started = None
+        self._finished = None
+        self._results = {}
+        self._pending = []
+        self.enabled = WARMUP_SETTING == "1"
+
+    def enable(self):
+        """Warm up on the first request; called by serving entry points, overridden by WARMUP=0."""
+        if WARMUP_SETTING != "0":
+            self.enabled = True
+
+    def start(self, app, prepare=None):
+        if self._started is not None:
+            return
+        with self._lock:
+            if self._started is not None:
+                return
+            self._started = time.time()
+            if not self.enabled:
+                self._finished = self._started
+                return
+        threading.Thread(target=self._run, args=(app, prepare), name="warmup", daemon=True).start()
+
+    def _run(self, app, prepare):
+        deadline = time.monotonic() + WARMUP_SECONDS
+        try:
+            if prepare is not None:
+                with app.app_context():
+                    prepare()
+            paths = warmup_paths()
+            with self._lock:
+                self._pending = paths
+            pool = ThreadPoolExecutor(max_workers=WARMUP_WORKERS, thread_name_prefix="warmup")
+            futures = [pool.submit(self._fetch, app, path) for path in paths]
+            wait(futures, timeout=max(0.0, deadline - time.monotonic()))
+            pool.shutdown(wait=False, cancel_futures=True)
+        except Exception as e:
+            logger.error(f"Warm-up failed: {e}")
+        with self._lock:
+            self._finished = time.time()
+            unfinished = [path for path in self._pending if path not in self._results]
+        if unfinished:
+            logger.warning(f"Warm-up budget of {WARMUP_SECONDS:.0f}s ran out with these still pending: {', '.join(unfinished)}")
+        logger.info(f"Warm-up finished in {self._finished - self._started:.1f}s; ready")
+
+    def _fetch(self, app, path):
+        start = time.perf_counter()
+        try:
+            status = app.test_client().get(path).status_code
+        except Exception as e:
+            logger.warning(f"Warm-up request {path} failed: {e}")
+            status = None
+        with self._lock:
+            self._results[path] = (status, time.perf_counter() - start)
+
+    @property
+    def ready(self):
+        return self._finished is not None
+
+    def status(self):
+        with self._lock:
+            results = dict(self._results)
+            pending = [path for path in self._pending if path not in results]
+            started, finished = self._started, self._finished
+        return {
+            "status": "ready" if finished is not None else "warming",
+            "warmup_seconds": round((finished or time.time()) - started, 3) if started else 0.0,
+            "warmed": {path: {"status": status, "seconds": round(seconds, 3)}
+                       for path, (status, seconds) in results.items()},
+            "pending": pending,
+        }
+
+
+warmup = Warmup()
+
+
+def enable_warmup():
+    warmup.enable()
+
+
+def init_warmup(app, prepare=None):
+    """Start the warm-up with the app's first request."""
+    app.before_request(lambda: warmup.start(app, prepare))